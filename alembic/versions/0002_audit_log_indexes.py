@@ -0,0 +1,196 @@
+"""audit log indexes: BRIN on ts, composite (column, ts) for /logs filters
+
+Revision ID: 0002_audit_log_indexes
+Revises: 0001_gwapi_initial
+Create Date: 2026-10-19
+
+`http_logs` carried six single-column B-tree indexes (ts, endpoint, method,
+status, user_name, request_id), all maintained on every insert, while `/logs`,
+`/logs/stats` and `/logs/export` always combine a time range with at most one
+other column. This revision replaces them with:
+
+- a BRIN index on `ts` (rows arrive in time order, so a few pages of block
+  ranges cover any window; ordered paging uses the `(ts, id)` primary key);
+- composite B-trees `(endpoint, ts)`, `(user_name, ts)` and `(status, ts)`;
+- `request_id` stays as is (request lookups and the `has_db_logs` semi-join).
+
+`db_logs` gets the same BRIN on `ts` plus `(function_name, ts)` for the DB-call
+stats. Single-column B-trees are found through the catalog rather than by name,
+so indexes that kept their legacy names after the 0001 relocation are replaced
+too.
+
+A plain ``CREATE INDEX`` on a partitioned parent would hold a SHARE lock on
+every partition (blocking audit writes) for the whole build, and this revision
+runs on the auto-migrate startup path. Instead each index is created ``ON
+ONLY`` the parent (catalog-only), built per partition with ``CREATE INDEX
+CONCURRENTLY`` outside the migration transaction, and attached with ``ALTER
+INDEX ... ATTACH PARTITION``; the parent index turns valid once every
+partition's index is attached. Partitions created later get the index from the
+parent. An interrupted run is resumed: invalid leftovers of a failed concurrent
+build are dropped and rebuilt, finished ones are reused.
+"""
+
+from alembic import context, op
+from sqlalchemy import text
+
+revision = "0002_audit_log_indexes"
+down_revision = "0001_gwapi_initial"
+branch_labels = None
+depends_on = None
+
+SCHEMA = "gwapi"
+HTTP_LOG_TABLE = "http_logs"
+DB_LOG_TABLE = "db_logs"
+# Single-column B-trees superseded by this revision, per table.
+REPLACED_COLUMNS = {
+    HTTP_LOG_TABLE: ("ts", "endpoint", "method", "status", "user_name"),
+    DB_LOG_TABLE: ("ts",),
+}
+BRIN_PAGES_PER_RANGE = 32
+MAX_IDENTIFIER_LENGTH = 63
+
+
+def _drop_single_column_btrees_sql(schema: str, table: str, columns: tuple[str, ...]) -> str:
+    names = ", ".join(f"'{column}'" for column in columns)
+    return f"""
+    DO $$
+    DECLARE
+        idx record;
+    BEGIN
+        FOR idx IN
+            SELECT ic.relname AS name
+            FROM pg_index i
+            JOIN pg_class ic ON ic.oid = i.indexrelid
+            JOIN pg_class t ON t.oid = i.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            JOIN pg_am am ON am.oid = ic.relam
+            JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = i.indkey[0]
+            WHERE n.nspname = '{schema}'
+              AND t.relname = '{table}'
+              AND am.amname = 'btree'
+              AND i.indnatts = 1
+              AND NOT i.indisprimary
+              AND NOT i.indisunique
+              AND a.attname IN ({names})
+        LOOP
+            EXECUTE format('DROP INDEX {schema}.%I', idx.name);
+        END LOOP;
+    END $$;
+    """
+
+
+def _index_definitions() -> list[tuple[str, str, str]]:
+    """(table, index name, ``USING ...`` clause) of every index this revision creates."""
+    definitions = [
+        (table, f"{table}_ts_brin", f"USING brin (ts) WITH (pages_per_range = {BRIN_PAGES_PER_RANGE})")
+        for table in (HTTP_LOG_TABLE, DB_LOG_TABLE)
+    ]
+    for table, name, columns in (
+        (HTTP_LOG_TABLE, "http_logs_endpoint_ts_idx", "endpoint, ts DESC"),
+        (HTTP_LOG_TABLE, "http_logs_user_ts_idx", "user_name, ts DESC"),
+        (HTTP_LOG_TABLE, "http_logs_status_ts_idx", "status, ts DESC"),
+        (DB_LOG_TABLE, "db_logs_function_ts_idx", "function_name, ts DESC"),
+    ):
+        definitions.append((table, name, f"USING btree ({columns})"))
+    return definitions
+
+
+def _partitions(schema: str, table: str) -> list[tuple[str, str]]:
+    """(schema, name) of the partitions attached to `schema.table`."""
+    rows = op.get_bind().execute(
+        text(
+            """
+            SELECT cn.nspname, c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_namespace cn ON cn.oid = c.relnamespace
+            JOIN pg_class p ON p.oid = i.inhparent
+            JOIN pg_namespace pn ON pn.oid = p.relnamespace
+            WHERE pn.nspname = :schema AND p.relname = :table
+            ORDER BY c.relname
+            """
+        ),
+        {"schema": schema, "table": table},
+    )
+    return [(row[0], row[1]) for row in rows]
+
+
+def _index_valid(schema: str, name: str) -> bool | None:
+    """Whether index `schema.name` is valid; None when it does not exist."""
+    return op.get_bind().scalar(
+        text(
+            """
+            SELECT i.indisvalid
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = :schema AND c.relname = :name
+            """
+        ),
+        {"schema": schema, "name": name},
+    )
+
+
+def _has_attached_index(parent_index: str, partition: str) -> bool:
+    """Whether `partition` already has an index attached to `parent_index` (both qualified names)."""
+    return bool(
+        op.get_bind().scalar(
+            text(
+                """
+                SELECT EXISTS (
+                    SELECT 1
+                    FROM pg_inherits i
+                    JOIN pg_index x ON x.indexrelid = i.inhrelid
+                    WHERE i.inhparent = to_regclass(:parent_index) AND x.indrelid = to_regclass(:partition)
+                )
+                """
+            ),
+            {"parent_index": parent_index, "partition": partition},
+        )
+    )
+
+
+def _create_partitioned_index(schema: str, table: str, name: str, using: str) -> None:
+    partitions = [] if context.is_offline_mode() else _partitions(schema, table)
+    if not partitions:
+        # Nothing to lock (or no catalog to read offline): a plain build is instant.
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {schema}.{table} {using}")
+        return
+    op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {schema}.{table} {using}")
+    suffix = name.removeprefix(f"{table}_")
+    with op.get_context().autocommit_block():
+        for part_schema, partition in partitions:
+            if _has_attached_index(f"{schema}.{name}", f'{part_schema}."{partition}"'):
+                continue
+            part_index = f"{partition}_{suffix}"[:MAX_IDENTIFIER_LENGTH]
+            valid = _index_valid(part_schema, part_index)
+            if valid is False:
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {part_schema}."{part_index}"')
+            if not valid:
+                op.execute(f'CREATE INDEX CONCURRENTLY "{part_index}" ON {part_schema}."{partition}" {using}')
+            op.execute(f'ALTER INDEX {schema}.{name} ATTACH PARTITION {part_schema}."{part_index}"')
+
+
+def upgrade() -> None:
+    for table, columns in REPLACED_COLUMNS.items():
+        op.execute(_drop_single_column_btrees_sql(SCHEMA, table, columns))
+    for table, name, using in _index_definitions():
+        _create_partitioned_index(SCHEMA, table, name, using)
+
+
+def downgrade() -> None:
+    for name in (
+        "http_logs_ts_brin",
+        "http_logs_endpoint_ts_idx",
+        "http_logs_user_ts_idx",
+        "http_logs_status_ts_idx",
+        "db_logs_ts_brin",
+        "db_logs_function_ts_idx",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {SCHEMA}.{name}")
+    op.execute(f"CREATE INDEX IF NOT EXISTS http_logs_ts_idx ON {SCHEMA}.{HTTP_LOG_TABLE} (ts DESC)")
+    op.execute(f"CREATE INDEX IF NOT EXISTS http_logs_endpoint_idx ON {SCHEMA}.{HTTP_LOG_TABLE} (endpoint)")
+    op.execute(f"CREATE INDEX IF NOT EXISTS http_logs_method_idx ON {SCHEMA}.{HTTP_LOG_TABLE} (method)")
+    op.execute(f"CREATE INDEX IF NOT EXISTS http_logs_status_idx ON {SCHEMA}.{HTTP_LOG_TABLE} (status)")
+    op.execute(f"CREATE INDEX IF NOT EXISTS http_logs_user_idx ON {SCHEMA}.{HTTP_LOG_TABLE} (user_name)")
+    op.execute(f"CREATE INDEX IF NOT EXISTS db_logs_ts_idx ON {SCHEMA}.{DB_LOG_TABLE} (ts DESC)")
@@ -0,0 +1,71 @@
+"""audit log payloads: lz4 TOAST compression
+
+Revision ID: 0003_audit_log_lz4
+Revises: 0002_audit_log_indexes
+Create Date: 2026-10-19
+
+Captured bodies (`http_logs.request_body` / `response_body`) and procedure
+output (`db_logs.response_json`, `sql_text`) are most of the bytes in the log
+partitions. This revision switches those columns from the default `pglz` to
+`lz4` TOAST compression to cut the CPU spent compressing and decompressing them:
+lz4 is several times faster, while its ratio on JSON text is about the same as
+pglz or slightly worse, so it saves no disk. Compression happens inside
+Postgres, so every read path (`/logs`, `/logs/export`, retention archives)
+keeps returning plain text.
+
+TOAST only compresses values once a row exceeds about 2 KB
+(`TOAST_TUPLE_THRESHOLD`). With the default `LOG_DB_MAX_BODY_BYTES=2048` most
+captured bodies stay below it and are stored uncompressed whatever the method;
+the change mainly affects large `response_json` / `sql_text` values and
+deployments that raise the body cap.
+
+`SET COMPRESSION` on the partitioned parents cascades to existing partitions and
+is inherited by new ones. Only rows written afterwards are compressed with lz4;
+existing values stay as they are until their partition is dropped. Servers
+older than PostgreSQL 14, or built without lz4, are left on `pglz` (a NOTICE is
+raised) so the revision never blocks an upgrade.
+"""
+
+from alembic import op
+
+revision = "0003_audit_log_lz4"
+down_revision = "0002_audit_log_indexes"
+branch_labels = None
+depends_on = None
+
+SCHEMA = "gwapi"
+# Payload columns per audit table.
+COMPRESSED_COLUMNS = {
+    "http_logs": ("request_body", "response_body"),
+    "db_logs": ("sql_text", "response_json"),
+}
+
+
+def _set_compression_sql(schema: str, method: str) -> str:
+    statements = "\n".join(
+        f"EXECUTE 'ALTER TABLE {schema}.{table} ALTER COLUMN {column} SET COMPRESSION {method}';"
+        for table, columns in COMPRESSED_COLUMNS.items()
+        for column in columns
+    )
+    return f"""
+    DO $$
+    BEGIN
+        IF current_setting('server_version_num')::int < 140000
+           OR NOT EXISTS (
+               SELECT 1 FROM pg_settings
+               WHERE name = 'default_toast_compression' AND '{method}' = ANY (enumvals)
+           ) THEN
+            RAISE NOTICE 'TOAST compression {method} is not available; audit log payloads keep the default';
+            RETURN;
+        END IF;
+        {statements}
+    END $$;
+    """
+
+
+def upgrade() -> None:
+    op.execute(_set_compression_sql(SCHEMA, "lz4"))
+
+
+def downgrade() -> None:
+    op.execute(_set_compression_sql(SCHEMA, "pglz"))
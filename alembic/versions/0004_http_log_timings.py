@@ -0,0 +1,33 @@
+"""audit log: per-request phase timings
+
+Revision ID: 0004_http_log_timings
+Revises: 0003_audit_log_lz4
+Create Date: 2026-10-19
+
+Adds `http_logs.timings` (jsonb): the Server-Timing breakdown of each request
+(auth, schema, pool, role, db, version, validate, app, serialize and total, in
+milliseconds; see `app/utils/server_timing.py`). The column is nullable without
+a default, so adding it only touches the catalog, and the partitioned parent
+propagates it to every existing and future partition.
+"""
+
+from alembic import op
+
+revision = "0004_http_log_timings"
+down_revision = "0003_audit_log_lz4"
+branch_labels = None
+depends_on = None
+
+SCHEMA = "gwapi"
+
+
+def _add_timings_sql(schema: str) -> str:
+    return f"ALTER TABLE {schema}.http_logs ADD COLUMN IF NOT EXISTS timings jsonb"
+
+
+def upgrade() -> None:
+    op.execute(_add_timings_sql(SCHEMA))
+
+
+def downgrade() -> None:
+    op.execute(f"ALTER TABLE {SCHEMA}.http_logs DROP COLUMN IF EXISTS timings")
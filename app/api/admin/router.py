@@ -7,10 +7,11 @@ or (at your option) any later version.
 
 from fastapi import FastAPI
 
-from app.api.admin import tenants, users
+from app.api.admin import routing, tenants, users
 
 
 def register_admin(admin_app: FastAPI) -> None:
     """Include platform-admin routers on the admin sub-app."""
     admin_app.include_router(tenants.router)
     admin_app.include_router(users.router)
+    admin_app.include_router(routing.router)
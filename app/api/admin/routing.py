@@ -0,0 +1,37 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+
+from fastapi import APIRouter, Request
+
+from app.api.admin.tenants import _audit_log, _registry
+from app.schemas.admin import RoutingCacheInvalidateOut
+from app.services.admin.tenant_service import TenantService
+from app.utils.cache_generation import routing_generations
+from app.utils.network_points import network_point_cache
+from app.utils.routing_matrix import matrix_cache
+
+router = APIRouter(tags=["Admin - Routing"])
+
+
+@router.post(
+    "/tenants/{tid}/routing/cache/invalidate",
+    description=(
+        "Drop cached routing network point sets and cost matrices for a tenant. Counts are for this worker; "
+        "the other workers on the host drop theirs on their next lookup."
+    ),
+    response_model=RoutingCacheInvalidateOut,
+)
+async def invalidate_routing_cache(tid: str, request: Request):
+    TenantService(_registry()).get_tenant_record(tid)
+    routing_generations.bump(tid)
+    result = RoutingCacheInvalidateOut(
+        tenant=tid,
+        point_sets=network_point_cache.invalidate(tid),
+        matrices=matrix_cache.invalidate(tid),
+    )
+    _audit_log(request, "routing_cache_invalidate", tid=tid, **result.model_dump(exclude={"tenant"}))
+    return result
@@ -17,6 +17,7 @@ from app.core.exceptions import (
     DatabaseUnavailableError,
     InvalidParametersError,
     ProcedureError,
+    RoutingProviderError,
     db_unavailable_payload,
 )
 from app.services.admin.tenant_service import TenantServiceError
@@ -58,7 +59,7 @@ async def tenant_service_error_handler(_request: Request, exc: TenantServiceErro
 
 async def runtime_error_handler(_request: Request, exc: RuntimeError) -> JSONResponse:
     detail = str(exc)
-    status = 502 if "Routing provider" in detail else 500
+    status = 502 if isinstance(exc, RoutingProviderError) or "Routing provider" in detail else 500
     return JSONResponse(status_code=status, content={"detail": detail})
 
 
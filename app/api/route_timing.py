@@ -0,0 +1,70 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+
+import functools
+import inspect
+from collections.abc import Callable
+from typing import Any
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.utils.server_timing import PHASE_TIMER_CTX, phase
+from app.utils.tracing import span
+
+
+def _timed_endpoint(call: Callable[..., Any]) -> Callable[..., Any]:
+    """Run the endpoint as phase ``app`` (and span); whatever the handler does afterwards is ``serialize``."""
+    span_name = f"endpoint {call.__name__}"
+
+    def _switch_to_serialize() -> None:
+        timer = PHASE_TIMER_CTX.get()
+        if timer is not None:
+            timer.switch("serialize")
+
+    if inspect.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def timed_async(*args, **kwargs):
+            with phase("app"), span(span_name):
+                result = await call(*args, **kwargs)
+            _switch_to_serialize()
+            return result
+
+        return timed_async
+
+    @functools.wraps(call)
+    def timed_sync(*args, **kwargs):
+        with phase("app"), span(span_name):
+            result = call(*args, **kwargs)
+        _switch_to_serialize()
+        return result
+
+    return timed_sync
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that splits the handler into ``validate`` (dependencies and request
+    validation), ``app`` (the endpoint) and ``serialize`` (response model and JSON
+    encoding) for Server-Timing. Streaming (generator) endpoints are only timed as
+    a whole under ``validate``.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        dependant = self.dependant
+        if not (dependant.is_gen_callable or dependant.is_async_gen_callable):
+            # Signature analysis is done; only the callable FastAPI invokes is wrapped.
+            dependant.call = _timed_endpoint(dependant.call)
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            with phase("validate"):
+                return await handler(request)
+
+        return timed_handler
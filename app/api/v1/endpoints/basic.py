@@ -11,6 +11,7 @@ from typing import Literal, Optional
 from fastapi import APIRouter, HTTPException, Query
 
 from app.api.deps import CommonsDep, get_service_context
+from app.api.route_timing import TimedRoute
 from app.schemas.basic.basic_models import (
     GetArcAuditValuesResponse,
     GetFeatureChangesResponse,
@@ -23,7 +24,7 @@ from app.schemas.basic.basic_models import (
 from app.schemas.common import CoordinatesModel
 from app.services.basic_service import BasicService
 
-router = APIRouter(prefix="/basic", tags=["Basic"])
+router = APIRouter(prefix="/basic", tags=["Basic"], route_class=TimedRoute)
 
 
 @router.get(
@@ -10,10 +10,11 @@ from typing import List, Union
 from fastapi import APIRouter, Body
 
 from app.api.deps import CommonsDep, get_service_context
+from app.api.route_timing import TimedRoute
 from app.schemas.crm.crm_models import HydrometerCreate, HydrometerResponse, HydrometerUpdate
 from app.services.crm_service import CrmService
 
-router = APIRouter(prefix="/crm", tags=["CRM"])
+router = APIRouter(prefix="/crm", tags=["CRM"], route_class=TimedRoute)
 
 
 @router.post(
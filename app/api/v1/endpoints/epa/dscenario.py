@@ -10,6 +10,7 @@ from typing import Any, Dict, List, Optional, Union
 from fastapi import APIRouter, Body, Path, Query
 
 from app.api.deps import CommonsDep, get_service_context
+from app.api.route_timing import TimedRoute
 from app.schemas.basic.basic_models import GetListResponse
 from app.schemas.epa.dscenario_models import (
     DscenarioCreateRequest,
@@ -18,7 +19,7 @@ from app.schemas.epa.dscenario_models import (
 )
 from app.services.epa.dscenario_service import DscenarioService
 
-router = APIRouter(prefix="/epa", tags=["EPA - Dscenario"])
+router = APIRouter(prefix="/epa", tags=["EPA - Dscenario"], route_class=TimedRoute)
 
 
 @router.post(
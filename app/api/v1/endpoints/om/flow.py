@@ -10,11 +10,12 @@ from typing import Literal, Optional
 from fastapi import APIRouter, Body
 
 from app.api.deps import CommonsDep, get_service_context
+from app.api.route_timing import TimedRoute
 from app.schemas.common import CoordinatesModel
 from app.schemas.om.flow_models import FlowResponse
 from app.services.om.flow_service import FlowService
 
-router = APIRouter(prefix="/om", tags=["OM - Flow"])
+router = APIRouter(prefix="/om", tags=["OM - Flow"], route_class=TimedRoute)
 
 
 @router.post(
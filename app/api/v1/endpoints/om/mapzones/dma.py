@@ -15,9 +15,10 @@ from app.schemas.om.dma_models import (
 )
 from app.schemas.om.mapzone_models import GetMacrodmasResponse
 from app.api.deps import CommonsDep, get_service_context
+from app.api.route_timing import TimedRoute
 from app.services.om.dma_service import DmaService
 
-router = APIRouter(prefix="/om", tags=["OM - District Metered Areas"])
+router = APIRouter(prefix="/om", tags=["OM - District Metered Areas"], route_class=TimedRoute)
 
 
 @router.get(
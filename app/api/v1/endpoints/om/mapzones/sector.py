@@ -8,10 +8,11 @@ or (at your option) any later version.
 from fastapi import APIRouter
 
 from app.api.deps import CommonsDep, get_service_context
+from app.api.route_timing import TimedRoute
 from app.schemas.om.mapzone_models import GetMacrosectorsResponse, GetSectorsResponse
 from app.services.om.mapzones_service import MapzonesService
 
-router = APIRouter(prefix="/om", tags=["OM - Mapzones"])
+router = APIRouter(prefix="/om", tags=["OM - Mapzones"], route_class=TimedRoute)
 
 
 @router.get(
@@ -10,6 +10,7 @@ from typing import Optional
 from fastapi import APIRouter, Body, Path, Query
 
 from app.api.deps import CommonsDep, get_service_context
+from app.api.route_timing import TimedRoute
 from app.schemas.basic.basic_models import GetListResponse
 from app.schemas.common import CoordinatesModel
 from app.schemas.om.mincut_models import (
@@ -27,7 +28,7 @@ from app.schemas.om.mincut_models import (
 )
 from app.services.om.mincut_service import MincutService
 
-router = APIRouter(prefix="/om", tags=["OM - Mincut"])
+router = APIRouter(prefix="/om", tags=["OM - Mincut"], route_class=TimedRoute)
 
 
 @router.get(
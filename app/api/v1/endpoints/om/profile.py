@@ -10,10 +10,11 @@ from typing import List, Optional
 from fastapi import APIRouter, Body
 
 from app.api.deps import CommonsDep, get_service_context
+from app.api.route_timing import TimedRoute
 from app.schemas.om.profile_models import ProfileResponse
 from app.services.om.profile_service import ProfileService
 
-router = APIRouter(prefix="/om", tags=["OM - Profile"])
+router = APIRouter(prefix="/om", tags=["OM - Profile"], route_class=TimedRoute)
 
 
 @router.post(
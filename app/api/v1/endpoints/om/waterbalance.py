@@ -8,10 +8,11 @@ or (at your option) any later version.
 from fastapi import APIRouter, Query
 
 from app.api.deps import CommonsDep, get_service_context
+from app.api.route_timing import TimedRoute
 from app.schemas.om.waterbalance_models import GetWaterbalanceResponse
 from app.services.om.waterbalance_service import WaterbalanceService
 
-router = APIRouter(prefix="/om", tags=["OM - Water Balance"])
+router = APIRouter(prefix="/om", tags=["OM - Water Balance"], route_class=TimedRoute)
 
 
 @router.get(
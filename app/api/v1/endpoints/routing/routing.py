@@ -10,13 +10,14 @@ from typing import Literal, Optional
 from fastapi import APIRouter, Query
 
 from app.api.deps import CommonsDep, get_service_context
+from app.api.route_timing import TimedRoute
 from app.schemas.routing.routing_models import (
     GetObjectOptimalPathOrderResponse,
     GetObjectParameterOrderResponse,
 )
 from app.services.routing_service import RoutingService
 
-router = APIRouter(prefix="/routing", tags=["OM - Routing"])
+router = APIRouter(prefix="/routing", tags=["OM - Routing"], route_class=TimedRoute)
 
 
 @router.get(
@@ -104,10 +105,24 @@ async def get_object_optimal_path_order(
         title="Language",
         description="Language for the response",
     ),
+    geometry_format: Literal["geojson", "polyline6"] = Query(
+        "geojson",
+        alias="geometryFormat",
+        title="Geometry format",
+        description="'geojson' returns the path as a FeatureCollection; 'polyline6' returns encoded leg shapes",
+    ),
 ):
     ctx = get_service_context(commons)
     return await RoutingService(ctx).get_object_optimal_path_order(
-        object_type, mapzone_type, mapzone_id, initial_point, final_point, transport_mode, units, language
+        object_type,
+        mapzone_type,
+        mapzone_id,
+        initial_point,
+        final_point,
+        transport_mode,
+        units,
+        language,
+        geometry_format=geometry_format,
     )
 
 
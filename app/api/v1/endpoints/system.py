@@ -7,10 +7,12 @@ or (at your option) any later version.
 
 from datetime import datetime
 from pathlib import Path
+from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 
+from app.api.route_timing import TimedRoute
 from app.auth import verify_admin
 from app.core.config import global_settings
 from app.core.constants import STATIC_PREFIX
@@ -20,7 +22,7 @@ from app.utils.rate_limit import create_rate_limiter
 _LOGS_UI_PATH = Path("app/static/logs.html")
 _LOGS_UI_HTML = _LOGS_UI_PATH.read_text(encoding="utf-8").replace("__STATIC_PREFIX__", STATIC_PREFIX)
 
-router = APIRouter(tags=["System"])
+router = APIRouter(tags=["System"], route_class=TimedRoute)
 
 schema_rate_limiter = create_rate_limiter(
     max_requests=global_settings.rate_limit_default_max_requests,
@@ -58,7 +60,8 @@ async def get_logs(
     user: str | None = Query(default=None),
     request_id: str | None = Query(default=None),
     limit: int = Query(default=100, ge=1, le=1000),
-    offset: int = Query(default=0, ge=0),
+    offset: int = Query(default=0, ge=0, description="Deprecated: use `cursor`. Ignored when `cursor` is set."),
+    cursor: str | None = Query(default=None, description="`next_cursor` from the previous page."),
 ):
     return await SystemService(_tenant(request)).get_logs(
         from_=from_,
@@ -70,9 +73,124 @@ async def get_logs(
         request_id=request_id,
         limit=limit,
         offset=offset,
+        cursor=cursor,
     )
 
 
+@router.get(
+    "/logs/export",
+    description=(
+        "Stream HTTP request logs (oldest first) as NDJSON or CSV for a time window "
+        "(default: last 24 hours). Rows are read through a server-side cursor, so large ranges are not buffered."
+    ),
+    dependencies=[Depends(verify_admin)],
+)
+async def export_logs(
+    request: Request,
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    from_: datetime | None = Query(default=None, alias="from"),
+    to: datetime | None = Query(default=None, alias="to"),
+    endpoint: str | None = Query(default=None),
+    method: str | None = Query(default=None),
+    status: int | None = Query(default=None),
+    user: str | None = Query(default=None),
+):
+    tenant = _tenant(request)
+    stream = SystemService(tenant).export_logs(
+        fmt=fmt, from_=from_, to=to, endpoint=endpoint, method=method, status=status, user=user
+    )
+    # Runs the query before headers go out, so DB errors still map to 503/500 responses.
+    await anext(stream)
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"{tenant.id}-http-logs.{fmt}"
+    return StreamingResponse(
+        stream, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get(
+    "/logs/stats",
+    description=(
+        "Latency analytics over HTTP request logs: p50/p90/p99/max `duration_ms`, counts and 5xx rate "
+        "grouped by endpoint, method, status or user within a time window (default: last 24 hours)."
+    ),
+    dependencies=[Depends(verify_admin)],
+)
+async def get_log_stats(
+    request: Request,
+    from_: datetime | None = Query(default=None, alias="from"),
+    to: datetime | None = Query(default=None, alias="to"),
+    group_by: Literal["endpoint", "method", "status", "user"] = Query(default="endpoint"),
+    endpoint: str | None = Query(default=None),
+    method: str | None = Query(default=None),
+    status: int | None = Query(default=None),
+    user: str | None = Query(default=None),
+    sort: Literal["p99", "p90", "p50", "max_ms", "count", "error_rate"] = Query(default="p99"),
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    return await SystemService(_tenant(request)).get_log_stats(
+        from_=from_,
+        to=to,
+        group_by=group_by,
+        endpoint=endpoint,
+        method=method,
+        status=status,
+        user=user,
+        sort=sort,
+        limit=limit,
+    )
+
+
+@router.get(
+    "/logs/db/stats",
+    description=(
+        "Latency analytics over database call logs: p50/p90/p99/max `duration_ms`, counts and failure rate "
+        "grouped by function, schema or status within a time window (default: last 24 hours)."
+    ),
+    dependencies=[Depends(verify_admin)],
+)
+async def get_db_log_stats(
+    request: Request,
+    from_: datetime | None = Query(default=None, alias="from"),
+    to: datetime | None = Query(default=None, alias="to"),
+    group_by: Literal["function", "schema", "status"] = Query(default="function"),
+    function_name: str | None = Query(default=None),
+    schema_name: str | None = Query(default=None),
+    sort: Literal["p99", "p90", "p50", "max_ms", "count", "error_rate"] = Query(default="p99"),
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    return await SystemService(_tenant(request)).get_db_log_stats(
+        from_=from_,
+        to=to,
+        group_by=group_by,
+        function_name=function_name,
+        schema_name=schema_name,
+        sort=sort,
+        limit=limit,
+    )
+
+
+@router.get(
+    "/db/statements",
+    description=(
+        "Diff two `pg_stat_statements` snapshots of the tenant database taken `window` seconds apart and rank "
+        "the statements by total time, calls, shared-buffer reads or temp I/O. Each statement names the function "
+        "it calls and, when found, the API-side latency of that function from the database call logs. "
+        "The request stays open for the whole window, so it is capped at 60 s (common proxy timeouts); for longer "
+        "windows use `giswater-api db statements snapshot` and `db statements diff --since`. "
+        "404 when the extension is not installed."
+    ),
+    dependencies=[Depends(verify_admin)],
+)
+async def get_statement_stats(
+    request: Request,
+    window: int = Query(default=30, ge=1, le=60, description="Seconds between the two snapshots (max 60)."),
+    sort: Literal["total_time", "calls", "shared_blks_read", "temp_blks"] = Query(default="total_time"),
+    limit: int = Query(default=20, ge=1, le=200),
+):
+    return await SystemService(_tenant(request)).get_statement_stats(window_seconds=window, sort=sort, limit=limit)
+
+
 @router.get(
     "/logs/db",
     description="Return database-level logs linked to a specific API request.",
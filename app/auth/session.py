@@ -17,6 +17,8 @@ from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi_keycloak import FastAPIKeycloak
 
 from ..core.config import global_settings
+from ..utils.server_timing import phase
+from ..utils.tracing import SPAN_KIND_CLIENT, span, trace_headers
 from .users import verify_credentials
 from .schemas import ApiUser
 
@@ -63,7 +65,12 @@ async def get_current_user(
     request: Request,
     credentials: Optional[HTTPBasicCredentials] = Depends(_basic),
 ) -> ApiUser:
-    """Resolve the authenticated tenant API user."""
+    """Resolve the authenticated tenant API user (Server-Timing phase ``auth``)."""
+    with phase("auth"), span("auth"):
+        return await _resolve_user(request, credentials)
+
+
+async def _resolve_user(request: Request, credentials: Optional[HTTPBasicCredentials]) -> ApiUser:
     tenant = getattr(request.state, "tenant", None)
     if tenant is None:
         return ApiUser.anonymous()
@@ -79,7 +86,8 @@ async def get_current_user(
         if not auth.lower().startswith("bearer "):
             raise HTTPException(status_code=401, detail="Missing bearer token")
         token = auth.split(" ", 1)[1].strip()
-        return verify_token(token, tenant.idp)
+        with span("keycloak.verify_token"):
+            return verify_token(token, tenant.idp)
 
     if auth_mode == "basic":
         if credentials is None:
@@ -134,8 +142,9 @@ async def _platform_jwks() -> dict:
             f"{global_settings.platform_keycloak_realm}/protocol/openid-connect/certs"
         )
         async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
+            with span("keycloak.jwks", {"http.request.method": "GET", "url.full": url}, kind=SPAN_KIND_CLIENT):
+                resp = await client.get(url, headers=trace_headers())
+                resp.raise_for_status()
             jwks = resp.json()
         _platform_jwks_cache[cache_key] = (now, jwks)
         return jwks
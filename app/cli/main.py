@@ -7,6 +7,10 @@ or (at your option) any later version.
 
 from __future__ import annotations
 
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
 import click
 
 from app.cli.bootstrap import (
@@ -17,14 +21,20 @@ from app.cli.bootstrap import (
     run_service,
     tenants_dir_from_ctx,
 )
-from app.db.migrate import get_current_revision, history, run_alembic_upgrade
+from app.db.migrate import get_current_revision, history, migration_targets, run_alembic_upgrade
+from app.db.retention import apply_log_retention
+from app.db.statements import STATEMENT_SORT_KEYS, StatementSnapshot
 from app.schemas.crm.crm_models import HydrometerCreate
 from app.services.admin.tenant_service import TenantService
 from app.services.admin.user_service import GwapiUserService
 from app.services.crm_service import CrmService
+from app.services.replay_service import parse_speed, replay_requests
 from app.services.system_service import SystemService
 
 
+REPLAY_DEFAULT_WINDOW = timedelta(hours=1)
+
+
 @click.group()
 @click.option("--tenants-dir", type=click.Path(exists=True, file_okay=False), default=None, help="Tenants config dir")
 @click.pass_context
@@ -137,9 +147,10 @@ def db_upgrade(ctx: click.Context, tenant: str | None, all_tenants: bool) -> Non
     async def _run():
         results = []
         for t in await _db_targets(ctx, tenant, all_tenants):
-            await run_alembic_upgrade(t.db_manager)
-            revision = await get_current_revision(t.db_manager.database_url)
-            results.append({"tenant": t.id, "revision": revision})
+            for db in migration_targets(t.db_manager):
+                await run_alembic_upgrade(db)
+                revision = await get_current_revision(db.database_url)
+                results.append({"tenant": t.id, "database": db.dbname, "revision": revision})
         return results
 
     emit_json(run_service(_run))
@@ -155,8 +166,9 @@ def db_current(ctx: click.Context, tenant: str | None, all_tenants: bool) -> Non
     async def _run():
         results = []
         for t in await _db_targets(ctx, tenant, all_tenants):
-            revision = await get_current_revision(t.db_manager.database_url)
-            results.append({"tenant": t.id, "revision": revision})
+            for db in migration_targets(t.db_manager):
+                revision = await get_current_revision(db.database_url)
+                results.append({"tenant": t.id, "database": db.dbname, "revision": revision})
         return results
 
     emit_json(run_service(_run))
@@ -168,6 +180,158 @@ def db_history() -> None:
     emit_json(history())
 
 
+@db_group.group("statements")
+def db_statements() -> None:
+    """`pg_stat_statements` snapshots and diffs for a tenant database."""
+
+
+@db_statements.command("snapshot")
+@click.option("--tenant", required=True, help="Tenant id")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), required=True, help="Snapshot file")
+@click.pass_context
+def db_statements_snapshot(ctx: click.Context, tenant: str, output: str) -> None:
+    """Save the current counters, to diff against later with `db statements diff --since`."""
+
+    async def _run():
+        t = await resolve_tenant(tenant, tenants_dir_from_ctx(ctx.obj))
+        snapshot = await SystemService(t).snapshot_statements()
+        with open(output, "w", encoding="utf-8") as fh:
+            json.dump(snapshot.to_dict(), fh)
+        return {"tenant": t.id, "database": snapshot.database, "taken_at": snapshot.taken_at, "output": output}
+
+    emit_json(run_service(_run))
+
+
+@db_statements.command("diff")
+@click.option("--tenant", required=True, help="Tenant id")
+@click.option("--since", type=click.Path(exists=True, dir_okay=False), default=None, help="Earlier snapshot file")
+@click.option("--window", default=60, show_default=True, type=click.IntRange(min=1), help="Seconds (without --since)")
+@click.option("--sort", type=click.Choice(list(STATEMENT_SORT_KEYS)), default="total_time", show_default=True)
+@click.option("--limit", default=20, show_default=True, type=click.IntRange(min=1))
+@click.option("--save", type=click.Path(dir_okay=False, writable=True), default=None, help="Also save the new snapshot")
+@click.pass_context
+def db_statements_diff(
+    ctx: click.Context, tenant: str, since: str | None, window: int, sort: str, limit: int, save: str | None
+) -> None:
+    """Rank statements run since a saved snapshot, or over the next --window seconds."""
+
+    async def _run():
+        t = await resolve_tenant(tenant, tenants_dir_from_ctx(ctx.obj))
+        service = SystemService(t)
+        if since is not None:
+            with open(since, encoding="utf-8") as fh:
+                before = StatementSnapshot.from_dict(json.load(fh))
+        else:
+            before = await service.snapshot_statements()
+            await asyncio.sleep(window)
+        after = await service.snapshot_statements()
+        if save is not None:
+            with open(save, "w", encoding="utf-8") as fh:
+                json.dump(after.to_dict(), fh)
+        return {"tenant": t.id, **await service.compare_statements(before, after, sort=sort, limit=limit)}
+
+    emit_json(run_service(_run))
+
+
+@main.group("logs")
+def logs_group() -> None:
+    """Audit log maintenance (`gwapi.http_logs` / `gwapi.db_logs`)."""
+
+
+@logs_group.command("retention")
+@click.option("--tenant", default=None, help="Tenant id")
+@click.option("--all", "all_tenants", is_flag=True, help="Apply to every loaded tenant")
+@click.option("--dry-run", is_flag=True, help="Only report expired partitions and the bytes they hold")
+@click.pass_context
+def logs_retention(ctx: click.Context, tenant: str | None, all_tenants: bool, dry_run: bool) -> None:
+    """Detach, archive (LOG_ARCHIVE_FORMAT) and drop expired log partitions."""
+
+    async def _run():
+        return [
+            await apply_log_retention(t.db_manager.log_db, t.settings, dry_run=dry_run)
+            for t in await _db_targets(ctx, tenant, all_tenants)
+        ]
+
+    emit_json(run_service(_run))
+
+
+@main.group("bench")
+def bench_group() -> None:
+    """Load testing against a running instance."""
+
+
+def _parse_headers(values: tuple[str, ...]) -> dict[str, str]:
+    headers = {}
+    for value in values:
+        name, sep, content = value.partition(":")
+        if not sep or not name.strip():
+            raise click.BadParameter(f"expected 'Name: value', got '{value}'", param_hint="--header")
+        headers[name.strip()] = content.strip()
+    return headers
+
+
+@bench_group.command("replay")
+@click.option("--tenant", required=True, help="Tenant whose audit log is replayed")
+@click.option("--target", required=True, help="Base URL of the instance under test, e.g. http://localhost:8000")
+@click.option("--from", "from_", type=click.DateTime(), default=None, help="Window start (default: 1 hour before --to)")
+@click.option("--to", type=click.DateTime(), default=None, help="Window end (default: now)")
+@click.option("--endpoint", default=None, help="Only replay this logged endpoint")
+@click.option("--limit", default=10000, show_default=True, type=click.IntRange(min=1), help="Max requests loaded")
+@click.option("--speed", default="real", show_default=True, help="real, max, or a factor (2 = twice as fast)")
+@click.option("--concurrency", default=10, show_default=True, type=click.IntRange(min=1))
+@click.option("--header", "headers", multiple=True, help="Extra header 'Name: value' (e.g. Authorization, Host)")
+@click.option("--timeout", default=30.0, show_default=True, type=float, help="Per-request timeout in seconds")
+@click.option("--include-writes", is_flag=True, help="Also replay POST/PUT/PATCH/DELETE with fully captured bodies")
+@click.pass_context
+def bench_replay(
+    ctx: click.Context,
+    tenant: str,
+    target: str,
+    from_,
+    to,
+    endpoint: str | None,
+    limit: int,
+    speed: str,
+    concurrency: int,
+    headers: tuple[str, ...],
+    timeout: float,
+    include_writes: bool,
+) -> None:
+    """Replay logged requests (`http_logs`) against --target and compare latencies with the originals."""
+    try:
+        pace = parse_speed(speed)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="--speed") from exc
+    extra_headers = _parse_headers(headers)
+
+    async def _run():
+        t = await resolve_tenant(tenant, tenants_dir_from_ctx(ctx.obj))
+        window_end = to or datetime.now(timezone.utc)
+        window_start = from_ or window_end - REPLAY_DEFAULT_WINDOW
+        rows = await SystemService(t).get_logged_requests(
+            from_=window_start, to=window_end, endpoint=endpoint, limit=limit
+        )
+        report = await replay_requests(
+            rows,
+            target=target,
+            speed=pace,
+            concurrency=concurrency,
+            headers=extra_headers,
+            timeout=timeout,
+            include_writes=include_writes,
+        )
+        return {
+            "tenant": t.id,
+            "target": target,
+            "speed": speed,
+            "concurrency": concurrency,
+            "loaded": len(rows),
+            **report,
+        }
+
+    emit_json(run_service(_run))
+
+
 @main.group()
 @click.option("--tenant", required=True, help="Tenant id")
 @click.option("--schema", required=True, help="Database schema")
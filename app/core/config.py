@@ -18,6 +18,10 @@ from dotenv import dotenv_values, load_dotenv
 logger = logging.getLogger(__name__)
 AuthMode = Literal["none", "basic", "keycloak"]
 AUTH_MODES = frozenset({"none", "basic", "keycloak"})
+RoutingBackend = Literal["valhalla", "local"]
+ROUTING_BACKENDS = frozenset({"valhalla", "local"})
+LogArchiveFormat = Literal["none", "csv", "parquet"]
+LOG_ARCHIVE_FORMATS = frozenset({"none", "csv", "parquet"})
 
 # Tracks 2.0.0 cleanup: grep `DEPRECATED #22` (github.com/Giswater/giswater-api/issues/22).
 DEPRECATED_KEYCLOAK_ENABLED_ISSUE = "22"
@@ -52,6 +56,17 @@ def _to_float(value, default: float) -> float:
         return default
 
 
+def _to_thresholds(value) -> tuple[tuple[str, int], ...]:
+    """Parse ``fragment=ms,fragment=ms`` pairs; malformed entries are skipped."""
+    thresholds = []
+    for item in (value or "").split(","):
+        fragment, _, ms = item.partition("=")
+        fragment = fragment.strip()
+        if fragment and ms.strip().lstrip("-").isdigit():
+            thresholds.append((fragment, int(ms)))
+    return tuple(thresholds)
+
+
 def _normalize_api_root(value: str | None, default: str = "/giswater") -> str:
     """Normalize and validate the public API root prefix (e.g. ``/giswater``).
 
@@ -101,7 +116,14 @@ class GlobalSettings:
     log_level: str = "INFO"
     log_rotate_days: int = 14
     log_db_enabled: bool = True
+    # Default separate audit-log database for every tenant; `{tenant}` is replaced by the tenant id.
+    log_database_url: str | None = None
+    # Tail-based sampling: fast successful requests are DB-logged with this probability;
+    # errors, non-2xx, failed procedures and requests over the slow threshold always are.
     log_db_sample_rate: float = 1.0
+    # Slow-request threshold in ms (0 = none), overridable per endpoint path fragment.
+    log_db_slow_ms: int = 1000
+    log_db_slow_ms_endpoints: tuple[tuple[str, int], ...] = ()
     # When True, request/response bodies appear in file + DB logs (truncated per LOG_DB_MAX_BODY_BYTES).
     log_http_body_capture: bool = True
     # Max bytes stored per body when capture is enabled; 0 means use safe default (2048).
@@ -110,6 +132,41 @@ class GlobalSettings:
     # DB responses can be much larger than HTTP form bodies, so this is a separate knob.
     # 0 (or negative) disables truncation (full payload stored).
     log_db_response_max_bytes: int = 8192
+    # Batched audit-log writer (per tenant): bounded queue flushed with COPY every
+    # `flush_seconds` or `batch_size` records. Queue size 0 = one INSERT task per record.
+    log_db_writer_queue_size: int = 10000
+    log_db_writer_batch_size: int = 500
+    log_db_writer_flush_seconds: float = 1.0
+    # Rows fetched per round trip by the `/logs/export` server-side cursor.
+    log_export_batch_rows: int = 2000
+    # Audit log partitions created ahead of time (current month + N) at startup and every
+    # `log_maintenance_interval_seconds` (0 = startup only).
+    log_partition_months_ahead: int = 2
+    # Local spill of audit records while the tenant DB is down (LOG_DIR/<tenant>/spill/,
+    # 0 = disabled); DB re-probed every `log_spill_retry_seconds`.
+    log_spill_max_bytes: int = 268435456
+    log_spill_segment_bytes: int = 8388608
+    log_spill_retry_seconds: float = 10.0
+    log_maintenance_interval_seconds: int = 21600
+
+    # Prometheus metrics at <API_ROOT>/metrics (admin credentials unless `metrics_require_admin` is off).
+    metrics_enabled: bool = False
+    metrics_require_admin: bool = True
+    # Pool and audit-queue gauges are sampled by each worker this often.
+    metrics_refresh_seconds: float = 15.0
+
+    # Request tracing (app/utils/tracing.py): spans written as OTLP-JSON lines under
+    # `trace_dir` (default LOG_DIR/traces). Head sampling by `trace_sample_rate` (or the
+    # caller's traceparent flag); slow (`trace_slow_ms`, 0 = off) and failed traces are always kept.
+    tracing_enabled: bool = False
+    trace_sample_rate: float = 0.01
+    trace_slow_ms: int = 1000
+    trace_keep_errors: bool = True
+    trace_dir: str | None = None
+    trace_file_max_bytes: int = 67108864
+    trace_file_keep: int = 10
+    trace_export_flush_seconds: float = 5.0
+    trace_max_spans: int = 256
 
     # Rate limiting
     rate_limit_default_max_requests: int = 30
@@ -138,6 +195,31 @@ class GlobalSettings:
     platform_keycloak_client_id: str | None = None
     platform_keycloak_client_secret: str | None = None
 
+    # Routing provider circuit breaker (per worker). After N consecutive Valhalla
+    # failures the circuit opens for `reset_seconds`; tenants with
+    # ROUTING_FALLBACK_LOCAL=true are then served by the local solver.
+    routing_circuit_failure_threshold: int = 3
+    routing_circuit_reset_seconds: float = 60.0
+    # Time budget for the local solver's 2-opt / Or-opt improvement phase.
+    routing_local_time_budget: float = 2.0
+    # Requests with more network points than this are split into spatial chunks
+    # solved concurrently (Valhalla caps locations per request). 0 disables chunking.
+    routing_chunk_size: int = 48
+    routing_chunk_concurrency: int = 4
+    # Cached `gw_fct_getfeatures` point sets for routing (0 TTL disables); a tenant's sets
+    # are dropped when a `gw_fct_featurechanges` poll (every N seconds, 0 = never) differs.
+    routing_points_cache_ttl_seconds: float = 3600.0
+    routing_points_change_check_seconds: float = 60.0
+    # Optimized-route response cache (per worker; optional SQLite file shared on the host).
+    # 0 entries or 0 TTL disables it.
+    routing_cache_max_entries: int = 256
+    routing_cache_ttl_seconds: float = 3600.0
+    routing_cache_grid_meters: float = 25.0
+    routing_cache_path: str | None = None
+    # Per-tenant marker files bumped by the admin invalidation so every worker drops its
+    # cached point sets and matrices (default LOG_DIR/routing-generations).
+    routing_cache_generation_dir: str | None = None
+
     # DB compatibility (optional readiness gate; see GISWATER_DB_* env vars)
     giswater_db_version_check: bool = False
     giswater_db_min_version: str = "4.8.0"
@@ -181,6 +263,8 @@ class TenantSettings:
     db_password: str = "postgres"
     db_schema: str = "public"
     database_url: str | None = None
+    # Separate Postgres for audit logs (`gwapi.http_logs` / `db_logs`, /logs queries); overrides the global one.
+    log_database_url: str | None = None
     db_pool_min_size: int = 1
     db_pool_max_size: int = 10
     db_pool_timeout: float = 30.0
@@ -188,6 +272,22 @@ class TenantSettings:
     db_pool_max_idle: float = 300.0
     db_connect_timeout: float = 5.0
 
+    # Routing: `valhalla` (remote) or `local` (offline straight-line solver).
+    routing_backend: RoutingBackend = "valhalla"
+    # Opt-in: the local solver returns straight-line legs, not road geometry.
+    routing_fallback_local: bool = False
+    # Order stops locally over a cached Valhalla cost matrix per mapzone (see app/utils/routing_matrix.py).
+    routing_matrix_cache: bool = False
+
+    # Audit log retention (app/db/retention.py): days to keep per table (0 = forever) and
+    # optional export of expired monthly partitions under LOG_DIR before they are dropped.
+    log_retention_http_days: int = 0
+    log_retention_db_days: int = 0
+    log_archive_format: LogArchiveFormat = "none"
+
+    # Send the request phase breakdown (app/utils/server_timing.py) as a `Server-Timing` header.
+    server_timing: bool = False
+
     # Tenant API authentication
     auth_mode: AuthMode = "none"
     auth_basic_bootstrap_user: str | None = None
@@ -225,6 +325,10 @@ class TenantSettings:
                 raise ValueError(f"Keycloak configuration is incomplete: {', '.join(missing)}")
         if self.auth_mode not in AUTH_MODES:
             raise ValueError(f"Invalid AUTH_MODE '{self.auth_mode}'")
+        if self.routing_backend not in ROUTING_BACKENDS:
+            raise ValueError(f"Invalid ROUTING_BACKEND '{self.routing_backend}'")
+        if self.log_archive_format not in LOG_ARCHIVE_FORMATS:
+            raise ValueError(f"Invalid LOG_ARCHIVE_FORMAT '{self.log_archive_format}'")
 
 
 def _resolve_auth_mode(env: Mapping[str, str | None]) -> AuthMode:
@@ -260,10 +364,34 @@ def _build_global(env: Mapping[str, str | None]) -> GlobalSettings:
         log_level=(env.get("LOG_LEVEL") or "INFO"),
         log_rotate_days=_to_int(env.get("LOG_ROTATE_DAYS"), 14),
         log_db_enabled=_to_bool(env.get("LOG_DB_ENABLED"), True),
+        log_database_url=env.get("LOG_DATABASE_URL") or None,
         log_db_sample_rate=_to_float(env.get("LOG_DB_SAMPLE_RATE"), 1.0),
+        log_db_slow_ms=_to_int(env.get("LOG_DB_SLOW_MS"), 1000),
+        log_db_slow_ms_endpoints=_to_thresholds(env.get("LOG_DB_SLOW_MS_ENDPOINTS")),
         log_http_body_capture=_to_bool(env.get("LOG_HTTP_BODY_CAPTURE"), True),
         log_db_max_body_bytes=_to_int(env.get("LOG_DB_MAX_BODY_BYTES"), 2048),
         log_db_response_max_bytes=_to_int(env.get("LOG_DB_RESPONSE_MAX_BYTES"), 8192),
+        log_db_writer_queue_size=_to_int(env.get("LOG_DB_WRITER_QUEUE_SIZE"), 10000),
+        log_db_writer_batch_size=_to_int(env.get("LOG_DB_WRITER_BATCH_SIZE"), 500),
+        log_db_writer_flush_seconds=_to_float(env.get("LOG_DB_WRITER_FLUSH_SECONDS"), 1.0),
+        log_export_batch_rows=_to_int(env.get("LOG_EXPORT_BATCH_ROWS"), 2000),
+        log_partition_months_ahead=_to_int(env.get("LOG_PARTITION_MONTHS_AHEAD"), 2),
+        log_spill_max_bytes=_to_int(env.get("LOG_SPILL_MAX_BYTES"), 268435456),
+        log_spill_segment_bytes=_to_int(env.get("LOG_SPILL_SEGMENT_BYTES"), 8388608),
+        log_spill_retry_seconds=_to_float(env.get("LOG_SPILL_RETRY_SECONDS"), 10.0),
+        log_maintenance_interval_seconds=_to_int(env.get("LOG_MAINTENANCE_INTERVAL_SECONDS"), 21600),
+        metrics_enabled=_to_bool(env.get("METRICS_ENABLED"), False),
+        metrics_require_admin=_to_bool(env.get("METRICS_REQUIRE_ADMIN"), True),
+        metrics_refresh_seconds=_to_float(env.get("METRICS_REFRESH_SECONDS"), 15.0),
+        tracing_enabled=_to_bool(env.get("TRACING_ENABLED"), False),
+        trace_sample_rate=_to_float(env.get("TRACE_SAMPLE_RATE"), 0.01),
+        trace_slow_ms=_to_int(env.get("TRACE_SLOW_MS"), 1000),
+        trace_keep_errors=_to_bool(env.get("TRACE_KEEP_ERRORS"), True),
+        trace_dir=env.get("TRACE_DIR") or None,
+        trace_file_max_bytes=_to_int(env.get("TRACE_FILE_MAX_BYTES"), 67108864),
+        trace_file_keep=_to_int(env.get("TRACE_FILE_KEEP"), 10),
+        trace_export_flush_seconds=_to_float(env.get("TRACE_EXPORT_FLUSH_SECONDS"), 5.0),
+        trace_max_spans=_to_int(env.get("TRACE_MAX_SPANS"), 256),
         rate_limit_default_max_requests=_to_int(env.get("RATE_LIMIT_DEFAULT_MAX_REQUESTS"), 30),
         rate_limit_default_window_seconds=_to_int(env.get("RATE_LIMIT_DEFAULT_WINDOW_SECONDS"), 60),
         admin_user=(env.get("ADMIN_USER") or env.get("LOG_ADMIN_USER") or "admin"),
@@ -278,6 +406,18 @@ def _build_global(env: Mapping[str, str | None]) -> GlobalSettings:
         platform_keycloak_realm=env.get("PLATFORM_KEYCLOAK_REALM") or None,
         platform_keycloak_client_id=env.get("PLATFORM_KEYCLOAK_CLIENT_ID") or None,
         platform_keycloak_client_secret=env.get("PLATFORM_KEYCLOAK_CLIENT_SECRET") or None,
+        routing_circuit_failure_threshold=_to_int(env.get("ROUTING_CIRCUIT_FAILURE_THRESHOLD"), 3),
+        routing_circuit_reset_seconds=_to_float(env.get("ROUTING_CIRCUIT_RESET_SECONDS"), 60.0),
+        routing_local_time_budget=_to_float(env.get("ROUTING_LOCAL_TIME_BUDGET"), 2.0),
+        routing_chunk_size=_to_int(env.get("ROUTING_CHUNK_SIZE"), 48),
+        routing_chunk_concurrency=_to_int(env.get("ROUTING_CHUNK_CONCURRENCY"), 4),
+        routing_points_cache_ttl_seconds=_to_float(env.get("ROUTING_POINTS_CACHE_TTL_SECONDS"), 3600.0),
+        routing_points_change_check_seconds=_to_float(env.get("ROUTING_POINTS_CHANGE_CHECK_SECONDS"), 60.0),
+        routing_cache_max_entries=_to_int(env.get("ROUTING_CACHE_MAX_ENTRIES"), 256),
+        routing_cache_ttl_seconds=_to_float(env.get("ROUTING_CACHE_TTL_SECONDS"), 3600.0),
+        routing_cache_grid_meters=_to_float(env.get("ROUTING_CACHE_GRID_METERS"), 25.0),
+        routing_cache_path=env.get("ROUTING_CACHE_PATH") or None,
+        routing_cache_generation_dir=env.get("ROUTING_CACHE_GENERATION_DIR") or None,
         giswater_db_version_check=_to_bool(env.get("GISWATER_DB_VERSION_CHECK"), False),
         giswater_db_min_version=(env.get("GISWATER_DB_MIN_VERSION") or "4.8.0"),
         db_auto_migrate=_to_bool(env.get("DB_AUTO_MIGRATE"), True),
@@ -303,12 +443,20 @@ def _build_tenant(env: Mapping[str, str | None]) -> TenantSettings:
         db_password=(env.get("DB_PASSWORD") or "postgres"),
         db_schema=(env.get("DB_SCHEMA") or "public"),
         database_url=env.get("DATABASE_URL") or None,
+        log_database_url=env.get("LOG_DATABASE_URL") or None,
         db_pool_min_size=_to_int(env.get("DB_POOL_MIN_SIZE"), 1),
         db_pool_max_size=_to_int(env.get("DB_POOL_MAX_SIZE"), 10),
         db_pool_timeout=_to_float(env.get("DB_POOL_TIMEOUT"), 30.0),
         db_pool_max_waiting=_to_int(env.get("DB_POOL_MAX_WAITING"), 0),
         db_pool_max_idle=_to_float(env.get("DB_POOL_MAX_IDLE"), 300.0),
         db_connect_timeout=_to_float(env.get("DB_CONNECT_TIMEOUT"), 5.0),
+        routing_backend=(env.get("ROUTING_BACKEND") or "valhalla").strip().lower(),  # type: ignore[arg-type]
+        routing_fallback_local=_to_bool(env.get("ROUTING_FALLBACK_LOCAL"), False),
+        routing_matrix_cache=_to_bool(env.get("ROUTING_MATRIX_CACHE"), False),
+        log_retention_http_days=_to_int(env.get("LOG_RETENTION_HTTP_DAYS"), 0),
+        log_retention_db_days=_to_int(env.get("LOG_RETENTION_DB_DAYS"), 0),
+        log_archive_format=(env.get("LOG_ARCHIVE_FORMAT") or "none").strip().lower(),  # type: ignore[arg-type]
+        server_timing=_to_bool(env.get("SERVER_TIMING"), False),
         auth_mode=_resolve_auth_mode(env),
         auth_basic_bootstrap_user=env.get("AUTH_BASIC_BOOTSTRAP_USER") or None,
         auth_basic_bootstrap_password=env.get("AUTH_BASIC_BOOTSTRAP_PASSWORD") or None,
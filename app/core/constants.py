@@ -14,4 +14,5 @@ API_ROOT = global_settings.api_root
 TENANT_PREFIX = f"{API_ROOT}/v1"
 ADMIN_PREFIX = f"{API_ROOT}/admin"
 GLOBAL_HEALTH_PATH = f"{API_ROOT}/health"
+METRICS_PATH = f"{API_ROOT}/metrics"
 STATIC_PREFIX = f"{API_ROOT}/static"
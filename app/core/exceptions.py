@@ -19,6 +19,10 @@ class DatabaseUnavailableError(Exception):
     """Raised when the database cannot be reached."""
 
 
+class RoutingProviderError(RuntimeError):
+    """Raised when the routing provider (Valhalla) fails or its circuit is open (HTTP 502)."""
+
+
 class InvalidParametersError(ValueError):
     """Invalid request parameters parsed in the service layer (HTTP 422)."""
 
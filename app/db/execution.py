@@ -5,7 +5,6 @@ General Public License as published by the Free Software Foundation, either vers
 or (at your option) any later version.
 """
 
-import asyncio
 import json
 import logging
 import time
@@ -19,12 +18,31 @@ from psycopg.rows import dict_row
 
 from ..core.config import global_settings
 from ..core.exceptions import DatabaseUnavailableError
+from ..utils.metrics import observe_procedure
+from ..utils.server_timing import phase
+from ..utils.tracing import span
 from .context import REQUEST_ID_CTX, _resolve_db_identity
-from .log_store import insert_api_db_log
+from .log_sampling import hold_db_log
+from .log_store import submit_api_db_log
 
 logger = logging.getLogger(__name__)
 
 
+async def _set_role(cursor, identity: str) -> None:
+    with phase("role"):
+        await cursor.execute(sql.SQL("SET ROLE {}").format(sql.Identifier(identity)))
+
+
+def _procedure_span_attributes(db_manager, schema_name: str, function_name: str) -> dict:
+    return {
+        "db.system": "postgresql",
+        "db.namespace": db_manager.dbname,
+        "db.operation": function_name,
+        "db.schema": schema_name,
+        "tenant": db_manager.tenant_id,
+    }
+
+
 def create_response(db_result=None, form_xml=None, status=None, message=None):
     """Create and return a json response to send to the client"""
 
@@ -127,17 +145,21 @@ async def execute_procedure(  # noqa: C901
         identity = _resolve_db_identity(user, db_role)
         db_error = None
         try:
-            async with conn.cursor() as cursor:
-                if set_role and identity:
-                    await cursor.execute(sql.SQL("SET ROLE {}").format(sql.Identifier(identity)))
-                if sql_params:
-                    await cursor.execute(query, sql_params)
-                else:
-                    await cursor.execute(query)
-                result = await cursor.fetchone()
-                result = result[0] if result else None
-                # Manual commit after successful execution
-                await conn.commit()
+            with span(
+                f"execute_procedure {function_name}", _procedure_span_attributes(db_manager, schema_name, function_name)
+            ):
+                async with conn.cursor() as cursor:
+                    if set_role and identity:
+                        await _set_role(cursor, identity)
+                    with phase("db"):
+                        if sql_params:
+                            await cursor.execute(query, sql_params)
+                        else:
+                            await cursor.execute(query)
+                        result = await cursor.fetchone()
+                        result = result[0] if result else None
+                        # Manual commit after successful execution
+                        await conn.commit()
             response_msg = json.dumps(result)
         except psycopg.Error as e:
             # Rollback on error
@@ -178,6 +200,9 @@ async def execute_procedure(  # noqa: C901
         if result and "version" in result:
             result["version"] = {"db": result["version"], "api": api_version}
 
+        status = result.get("status") if isinstance(result, dict) else None
+        observe_procedure(db_manager.tenant_id, function_name, status or "-", time.monotonic() - start_time)
+
         if global_settings.log_db_enabled:
             duration_ms = int((time.monotonic() - start_time) * 1000)
             request_id = REQUEST_ID_CTX.get()
@@ -193,10 +218,11 @@ async def execute_procedure(  # noqa: C901
                 "sql_text": sql_preview,
                 "response_json": stored_response,
                 "duration_ms": duration_ms,
-                "status": result.get("status") if isinstance(result, dict) else None,
+                "status": status,
                 "error": db_error,
             }
-            asyncio.create_task(insert_api_db_log(db_manager, db_log_record))
+            if not hold_db_log(db_manager.log_db, db_log_record):
+                submit_api_db_log(db_manager.log_db, db_log_record)
 
         return result
 
@@ -242,13 +268,14 @@ async def execute_sql_select(
             async with conn.cursor(row_factory=dict_row) as cursor:
                 identity = _resolve_db_identity(user, db_role)
                 if set_role and identity:
-                    await cursor.execute(sql.SQL("SET ROLE {}").format(sql.Identifier(identity)))
-                if parameters is None:
-                    await cursor.execute(query)
-                else:
-                    await cursor.execute(query, parameters)
-                rows = await cursor.fetchall()
-            await conn.commit()
+                    await _set_role(cursor, identity)
+                with phase("db"):
+                    if parameters is None:
+                        await cursor.execute(query)
+                    else:
+                        await cursor.execute(query, parameters)
+                    rows = await cursor.fetchall()
+                    await conn.commit()
         except psycopg.Error as e:
             await conn.rollback()
             raise HTTPException(status_code=500, detail=str(e)) from e
@@ -293,13 +320,14 @@ async def execute_sql(
             async with conn.cursor(row_factory=dict_row) as cursor:
                 identity = _resolve_db_identity(user, db_role)
                 if set_role and identity:
-                    await cursor.execute(sql.SQL("SET ROLE {}").format(sql.Identifier(identity)))
-                if parameters is None:
-                    await cursor.execute(query)
-                else:
-                    await cursor.execute(query, parameters)
-                rows = await cursor.fetchall()
-            await conn.commit()
+                    await _set_role(cursor, identity)
+                with phase("db"):
+                    if parameters is None:
+                        await cursor.execute(query)
+                    else:
+                        await cursor.execute(query, parameters)
+                    rows = await cursor.fetchall()
+                    await conn.commit()
         except psycopg.Error as e:
             await conn.rollback()
             raise HTTPException(status_code=500, detail=str(e)) from e
@@ -351,10 +379,11 @@ async def execute_sql_insert(
             async with conn.cursor(row_factory=dict_row) as cursor:
                 identity = _resolve_db_identity(user, db_role)
                 if set_role and identity:
-                    await cursor.execute(sql.SQL("SET ROLE {}").format(sql.Identifier(identity)))
-                await cursor.execute(query, tuple(values))
-                rows = await cursor.fetchall()
-            await conn.commit()
+                    await _set_role(cursor, identity)
+                with phase("db"):
+                    await cursor.execute(query, tuple(values))
+                    rows = await cursor.fetchall()
+                    await conn.commit()
         except psycopg.Error as e:
             await conn.rollback()
             raise HTTPException(status_code=500, detail=str(e)) from e
@@ -410,10 +439,11 @@ async def execute_sql_update(
             async with conn.cursor(row_factory=dict_row) as cursor:
                 identity = _resolve_db_identity(user, db_role)
                 if set_role and identity:
-                    await cursor.execute(sql.SQL("SET ROLE {}").format(sql.Identifier(identity)))
-                await cursor.execute(query, tuple(values))
-                rows = await cursor.fetchall()
-            await conn.commit()
+                    await _set_role(cursor, identity)
+                with phase("db"):
+                    await cursor.execute(query, tuple(values))
+                    rows = await cursor.fetchall()
+                    await conn.commit()
         except psycopg.Error as e:
             await conn.rollback()
             raise HTTPException(status_code=500, detail=str(e)) from e
@@ -537,10 +567,11 @@ async def execute_sql_delete(
 
                 identity = _resolve_db_identity(user, db_role)
                 if set_role and identity:
-                    await cursor.execute(sql.SQL("SET ROLE {}").format(sql.Identifier(identity)))
-                await cursor.execute(query, tuple(values))
+                    await _set_role(cursor, identity)
+                with phase("db"):
+                    await cursor.execute(query, tuple(values))
+                    await conn.commit()
                 status = True
-            await conn.commit()
         except psycopg.Error as e:
             await conn.rollback()
             raise HTTPException(status_code=500, detail=str(e)) from e
@@ -0,0 +1,86 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Tail-based sampling of DB audit logs.
+
+Whether a request is written to the audit log is decided after its response:
+errors, non-2xx responses, failed procedure calls and requests slower than the
+endpoint's latency threshold (`LOG_DB_SLOW_MS`, `LOG_DB_SLOW_MS_ENDPOINTS`) are
+always kept; fast successful requests are kept with probability
+`LOG_DB_SAMPLE_RATE`. Procedure records (``db_logs``) created while a request is
+running are held under its `REQUEST_ID_CTX` id and follow the request's decision.
+"""
+
+import random
+import uuid
+from typing import Any, Dict
+
+from ..core.config import global_settings
+from .log_store import submit_api_db_log
+
+
+class PendingRequestLogs:
+    """DB audit records held for one request until its sampling decision."""
+
+    __slots__ = ("records", "failed")
+
+    def __init__(self):
+        self.records: list[tuple[Any, Dict[str, Any]]] = []
+        self.failed = False
+
+    def flush(self) -> None:
+        for db_manager, record in self.records:
+            submit_api_db_log(db_manager, record)
+        self.records.clear()
+
+
+_pending: dict[uuid.UUID, PendingRequestLogs] = {}
+
+
+def begin_request(request_id: uuid.UUID) -> None:
+    _pending[request_id] = PendingRequestLogs()
+
+
+def end_request(request_id: uuid.UUID) -> PendingRequestLogs:
+    """Stop holding records for `request_id` and return what was held."""
+    return _pending.pop(request_id, None) or PendingRequestLogs()
+
+
+def hold_db_log(db_manager, record: Dict[str, Any]) -> bool:
+    """
+    Hold a procedure record until its request is sampled. Returns False when the
+    record has no running parent request (startup, background work) and should be
+    written right away.
+    """
+    pending = _pending.get(record.get("request_id"))
+    if pending is None:
+        return False
+    pending.records.append((db_manager, record))
+    if record.get("error") or record.get("status") == "Failed":
+        pending.failed = True
+    return True
+
+
+def slow_threshold_ms(endpoint: str) -> int:
+    """Latency threshold for `endpoint`: the longest matching `LOG_DB_SLOW_MS_ENDPOINTS` fragment, else the default."""
+    best: tuple[int, int] | None = None
+    for fragment, threshold in global_settings.log_db_slow_ms_endpoints:
+        if fragment in endpoint and (best is None or len(fragment) > best[0]):
+            best = (len(fragment), threshold)
+    return best[1] if best is not None else global_settings.log_db_slow_ms
+
+
+def keep_request(status: int, duration_ms: int, endpoint: str, error: bool = False, failed: bool = False) -> bool:
+    """Tail-based decision: keep anything interesting, sample fast successful requests."""
+    if not global_settings.log_db_enabled:
+        return False
+    if error or failed or not 200 <= status < 300:
+        return True
+    threshold = slow_threshold_ms(endpoint)
+    if threshold > 0 and duration_ms >= threshold:
+        return True
+    rate = global_settings.log_db_sample_rate
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
@@ -0,0 +1,285 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Local disk spill for audit-log records while the tenant database is down.
+
+Records are appended as JSON lines to size-capped segment files under
+``LOG_DIR/<tenant>/spill/``. A segment is written as
+``<ns>-<pid>-<process start>.open`` and renamed to ``.jsonl`` once sealed (full,
+before replay, on shutdown, or left behind by a dead worker); only sealed
+segments are replayed (`log_store.replay_spilled_logs`). The process start time
+in the name keeps a reused pid (e.g. after a container restart) from passing
+for the segment's writer.
+The outage circuit makes audit writes skip the database entirely between
+probes instead of queueing up connection attempts. The size cap is checked
+against a running byte count (rescanned from disk before each replay) and
+callers run `LogSpill.append` in a worker thread, so spilling never blocks the
+event loop on file I/O; constructing a spill touches no files.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Literal
+
+from ..core.config import global_settings
+from ..utils.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+LogKind = Literal["http", "db"]
+SpilledRecord = tuple[LogKind, dict[str, Any]]
+
+_OPEN_SUFFIX = ".open"
+_SEALED_SUFFIX = ".jsonl"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start(pid: int) -> str | None:
+    """Start time of `pid` in clock ticks since boot, or None without ``/proc``."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Fields after the parenthesised command name start at field 3; starttime is field 22.
+    fields = stat.rpartition(")")[2].split()
+    return fields[19] if len(fields) > 19 else None
+
+
+def _process_token() -> str:
+    pid = os.getpid()
+    start = _process_start(pid)
+    return f"{pid}-{start}" if start else str(pid)
+
+
+def _writer_alive(token: str) -> bool:
+    """Whether the process that named a segment `<ns>-<token>.open` is still running."""
+    pid, _, start = token.partition("-")
+    if not pid.isdigit():
+        return False
+    if start:
+        current = _process_start(int(pid))
+        if current is not None:
+            return current == start
+    return _pid_alive(int(pid))
+
+
+class LogSpill:
+    """Append-only, size-capped segment files for one tenant (per worker process)."""
+
+    def __init__(self, tenant_id: str, directory: Path, *, max_bytes: int, segment_bytes: int, retry_seconds: float):
+        self.tenant_id = tenant_id
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = max(segment_bytes, 1)
+        self.outage = CircuitBreaker(f"audit-log-db-{tenant_id}", failure_threshold=1, reset_seconds=retry_seconds)
+        self.replaying = False
+        self.spilled: Counter[str] = Counter()
+        self.dropped: Counter[str] = Counter()
+        self.replayed: Counter[str] = Counter()
+        self._current: Path | None = None
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        # Bytes of every file in the directory, and of the `.failed` segments among them.
+        # Loaded on the first append or replay pass (both run in worker threads).
+        self._pending_bytes = self._failed_bytes = 0
+        self._synced = False
+
+    def _segment_files(self, suffix: str) -> list[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"*{suffix}"))
+
+    def _seal_orphans(self) -> None:
+        """Seal `.open` segments whose writer process is gone so they get replayed."""
+        for path in self._segment_files(_OPEN_SUFFIX):
+            if _writer_alive(path.stem.partition("-")[2]):
+                continue
+            try:
+                path.rename(path.with_suffix(_SEALED_SUFFIX))
+            except FileNotFoundError:
+                pass  # another worker sealed it first
+            except OSError:
+                logger.warning("[%s] could not seal orphaned spill segment %s", self.tenant_id, path, exc_info=True)
+
+    def _sync(self) -> None:
+        """Seal orphaned segments and reload the running byte counts from disk (caller holds the lock)."""
+        self._seal_orphans()
+        self._pending_bytes, self._failed_bytes = self._scan_bytes()
+        self._synced = True
+
+    def _scan_bytes(self) -> tuple[int, int]:
+        total = failed = 0
+        for path in self.directory.glob("*") if self.directory.is_dir() else ():
+            try:
+                size = path.stat().st_size if path.is_file() else 0
+            except OSError:
+                continue
+            total += size
+            if path.suffix == ".failed":
+                failed += size
+        return total, failed
+
+    def _seal_current(self) -> None:
+        if self._current is not None and self._current.exists():
+            self._current.rename(self._current.with_suffix(_SEALED_SUFFIX))
+        self._current = None
+        self._current_bytes = 0
+
+    def _encode(self, records: list[SpilledRecord]) -> list[tuple[LogKind, str]]:
+        """JSON lines for the records that still fit under `max_bytes` (the rest are counted as dropped)."""
+        available = self.max_bytes - self._pending_bytes
+        lines = []
+        for kind, record in records:
+            line = json.dumps({"kind": kind, "record": record}, default=str, separators=(",", ":")) + "\n"
+            available -= len(line.encode("utf-8"))
+            if available < 0:
+                self.dropped[kind] += 1
+                continue
+            lines.append((kind, line))
+        return lines
+
+    def _write(self, lines: list[tuple[LogKind, str]]) -> None:
+        if self._current is None:
+            self._current = self.directory / f"{time.time_ns()}-{_process_token()}{_OPEN_SUFFIX}"
+        with open(self._current, "a", encoding="utf-8") as f:
+            f.writelines(line for _, line in lines)
+        written = sum(len(line.encode("utf-8")) for _, line in lines)
+        self._current_bytes += written
+        self._pending_bytes += written
+        if self._current_bytes >= self.segment_bytes:
+            self._seal_current()
+
+    def append(self, records: list[SpilledRecord]) -> int:
+        """
+        Append records to the current segment. Returns how many were written (rest dropped: cap reached).
+
+        Blocking file I/O: async callers run it with `asyncio.to_thread`.
+        """
+        if not records:
+            return 0
+        with self._lock:
+            try:
+                if not self._synced:
+                    self._sync()
+                self.directory.mkdir(parents=True, exist_ok=True)
+                lines = self._encode(records)
+                if lines:
+                    self._write(lines)
+            except OSError:
+                logger.warning("[%s] audit log spill write failed", self.tenant_id, exc_info=True)
+                for kind, _ in records:
+                    self.dropped[kind] += 1
+                return 0
+            for kind, _ in lines:
+                self.spilled[kind] += 1
+        if len(lines) < len(records):
+            logger.warning(
+                "[%s] audit log spill full (%s bytes); dropped=%s", self.tenant_id, self.max_bytes, dict(self.dropped)
+            )
+        return len(lines)
+
+    def has_pending(self) -> bool:
+        """Whether there may be segments to replay (no disk access; see `sealed_segments`)."""
+        return not self._synced or self._current is not None or self._pending_bytes > self._failed_bytes
+
+    def sealed_segments(self) -> list[Path]:
+        """Seal this worker's open segment (and orphaned ones) and list every sealed segment, oldest first."""
+        with self._lock:
+            self._seal_current()
+            # Other workers spill into the same directory: resync the running counts.
+            self._sync()
+        return self._segment_files(_SEALED_SUFFIX)
+
+    def close(self) -> None:
+        """Seal the open segment on shutdown so the next process replays it (blocking file I/O)."""
+        with self._lock:
+            try:
+                self._seal_current()
+            except OSError:
+                logger.warning("[%s] could not seal audit log spill segment", self.tenant_id, exc_info=True)
+
+    @staticmethod
+    def read_segment(path: Path) -> list[SpilledRecord]:
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line from a worker killed mid-write.
+                    logger.warning("Skipping unreadable line in audit log spill segment %s", path)
+                    continue
+                record = entry["record"]
+                record["ts"] = datetime.fromisoformat(record["ts"])
+                records.append((entry["kind"], record))
+        return records
+
+    def claim(self, path: Path) -> Path | None:
+        """Rename a sealed segment so a single worker replays it. None if another worker got it first."""
+        claimed = path.with_name(f"{path.name}.{os.getpid()}.replay")
+        try:
+            path.rename(claimed)
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    def release(self, claimed: Path, *, failed: bool = False) -> None:
+        """Drop a replayed segment, or set it aside as ``.failed`` when its rows were rejected."""
+        try:
+            size = claimed.stat().st_size
+        except OSError:
+            size = 0
+        with self._lock:
+            if failed:
+                claimed.rename(claimed.with_name(claimed.name.split(_SEALED_SUFFIX)[0] + ".failed"))
+                self._failed_bytes += size
+            else:
+                claimed.unlink(missing_ok=True)
+                self._pending_bytes = max(self._pending_bytes - size, self._failed_bytes)
+
+    def unclaim(self, claimed: Path) -> None:
+        """Put a segment back for a later replay (database went away again)."""
+        claimed.rename(claimed.with_name(claimed.name.split(_SEALED_SUFFIX)[0] + _SEALED_SUFFIX))
+
+    def stats(self) -> dict:
+        return {
+            "outage": self.outage.state,
+            "pending_bytes": self._pending_bytes,
+            "spilled": dict(self.spilled),
+            "dropped": dict(self.dropped),
+            "replayed": dict(self.replayed),
+        }
+
+
+def build_log_spill(tenant_id: str) -> LogSpill | None:
+    """Spill for a tenant, or None when disabled (`LOG_SPILL_MAX_BYTES=0`)."""
+    if global_settings.log_spill_max_bytes <= 0:
+        return None
+    return LogSpill(
+        tenant_id,
+        Path(global_settings.log_dir) / tenant_id / "spill",
+        max_bytes=global_settings.log_spill_max_bytes,
+        segment_bytes=global_settings.log_spill_segment_bytes,
+        retry_seconds=global_settings.log_spill_retry_seconds,
+    )
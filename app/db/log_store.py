@@ -5,109 +5,264 @@ General Public License as published by the Free Software Foundation, either vers
 or (at your option) any later version.
 """
 
+import asyncio
 import logging
-from typing import Any, Dict
+from typing import Any, Callable, Dict
 
+import psycopg
 from psycopg import sql
 from psycopg.types.json import Json
 
-from .partitions import ensure_log_partition
-from .schema import resolve_log_targets
+from ..utils.tracing import span
+from .log_spill import LogKind, SpilledRecord
+from .partitions import ensure_known_partitions
+from .schema import LogTargets, resolve_log_targets
 
 logger = logging.getLogger(__name__)
 
 
-async def insert_api_log(db_manager, record: Dict[str, Any]) -> None:
+HTTP_LOG_COLUMNS = (
+    "ts",
+    "method",
+    "endpoint",
+    "status",
+    "duration_ms",
+    "user_name",
+    "request_id",
+    "client_ip",
+    "query_params",
+    "body_size",
+    "response_size",
+    "request_headers",
+    "request_body",
+    "response_headers",
+    "response_body",
+    "timings",
+)
+# Tables that predate the `timings` column: the legacy `log` schema (DEPRECATED #28), or
+# `gwapi` before migration 0004 (see `LogTargets.has_timings`).
+LEGACY_HTTP_LOG_COLUMNS = HTTP_LOG_COLUMNS[:-1]
+DB_LOG_COLUMNS = (
+    "ts",
+    "request_id",
+    "schema_name",
+    "function_name",
+    "sql_text",
+    "response_json",
+    "duration_ms",
+    "status",
+    "error",
+)
+_HTTP_JSON_COLUMNS = frozenset({"query_params", "request_headers", "response_headers", "timings"})
+
+
+def http_log_row(record: Dict[str, Any], columns: tuple[str, ...] = HTTP_LOG_COLUMNS) -> tuple:
+    """Column values for `HTTP_LOG_COLUMNS` (JSON columns wrapped for psycopg)."""
+    return tuple(
+        Json(record[col]) if col in _HTTP_JSON_COLUMNS and record.get(col) is not None else record.get(col)
+        for col in columns
+    )
+
+
+def _legacy_http_log_row(record: Dict[str, Any]) -> tuple:
+    return http_log_row(record, LEGACY_HTTP_LOG_COLUMNS)
+
+
+def db_log_row(record: Dict[str, Any]) -> tuple:
+    """Column values for `DB_LOG_COLUMNS`."""
+    return tuple(record.get(col) for col in DB_LOG_COLUMNS)
+
+
+def _insert_sql(schema: str, table: str, columns: tuple[str, ...]) -> sql.Composed:
+    return sql.SQL("INSERT INTO {}.{} ({}) VALUES ({})").format(
+        sql.Identifier(schema),
+        sql.Identifier(table),
+        sql.SQL(", ").join(sql.Identifier(col) for col in columns),
+        sql.SQL(", ").join(sql.Placeholder() for _ in columns),
+    )
+
+
+def _table_for(targets: LogTargets, kind: LogKind) -> tuple[str, tuple[str, ...], Callable[[Dict[str, Any]], tuple]]:
+    if kind == "http":
+        if not targets.has_timings:
+            return targets.http_table, LEGACY_HTTP_LOG_COLUMNS, _legacy_http_log_row
+        return targets.http_table, HTTP_LOG_COLUMNS, http_log_row
+    return targets.db_table, DB_LOG_COLUMNS, db_log_row
+
+
+async def copy_log_records(conn, targets: LogTargets, records: list[SpilledRecord]) -> None:
+    """``COPY`` records into their audit tables on `conn` (caller commits)."""
+    for kind in ("http", "db"):
+        rows = [record for record_kind, record in records if record_kind == kind]
+        if not rows:
+            continue
+        table, columns, to_row = _table_for(targets, kind)
+        statement = sql.SQL("COPY {}.{} ({}) FROM STDIN").format(
+            sql.Identifier(targets.schema),
+            sql.Identifier(table),
+            sql.SQL(", ").join(sql.Identifier(col) for col in columns),
+        )
+        async with conn.cursor() as cursor:
+            async with cursor.copy(statement) as copy:
+                for record in rows:
+                    await copy.write_row(to_row(record))
+
+
+async def insert_log_records(conn, targets: LogTargets, records: list[SpilledRecord]) -> list[SpilledRecord]:
+    """
+    Row-by-row fallback for a batch ``COPY`` rejected by the database (e.g. a NUL byte in a body).
+
+    Each row is inserted in its own transaction block, so only the offending rows are
+    lost. Returns the rejected records (caller commits).
+    """
+    rejected = []
+    async with conn.cursor() as cursor:
+        for kind, record in records:
+            table, columns, to_row = _table_for(targets, kind)
+            try:
+                async with conn.transaction():
+                    await cursor.execute(_insert_sql(targets.schema, table, columns), to_row(record))
+            except (psycopg.DataError, psycopg.IntegrityError) as exc:
+                logger.warning("Audit log %s record %s rejected: %s", kind, record.get("request_id"), exc)
+                rejected.append((kind, record))
+    return rejected
+
+
+async def prepare_log_partitions(db_manager, conn, targets: LogTargets, records: list[SpilledRecord]) -> None:
+    for kind in ("http", "db"):
+        table = _table_for(targets, kind)[0]
+        await ensure_known_partitions(db_manager, conn, targets, table, [r["ts"] for k, r in records if k == kind])
+
+
+async def spill_or_drop(db_manager, records: list[SpilledRecord]) -> bool:
+    """Append records to the tenant's local spill, if enabled. Returns False when they are dropped."""
+    spill = getattr(db_manager, "log_spill", None)
+    if spill is None:
+        return False
+    return await asyncio.to_thread(spill.append, records) == len(records)
+
+
+def log_db_outage(db_manager) -> bool:
+    """True while audit writes should skip the database (outage circuit open, between probes)."""
+    spill = getattr(db_manager, "log_spill", None)
+    return spill is not None and not spill.outage.allow_request()
+
+
+def record_log_db_result(db_manager, ok: bool) -> None:
+    """Feed the outage circuit; after a success, replay spilled segments in the background."""
+    spill = getattr(db_manager, "log_spill", None)
+    if spill is None:
+        return
+    if not ok:
+        spill.outage.record_failure()
+        return
+    spill.outage.record_success()
+    if not spill.replaying and spill.has_pending():
+        asyncio.create_task(replay_spilled_logs(db_manager))
+
+
+async def _insert_record(db_manager, kind: LogKind, record: Dict[str, Any]) -> None:
+    """Single-row insert (used when the batched writer is disabled)."""
+    if log_db_outage(db_manager):
+        await spill_or_drop(db_manager, [(kind, record)])
+        return
     targets = await resolve_log_targets(db_manager)
-    async with db_manager.get_db() as conn:
+    table, columns, to_row = _table_for(targets, kind)
+    # One attempt only: during an outage the record goes to disk instead of waiting on retries.
+    async with db_manager.get_db(max_tries=1, timeout=db_manager.settings.db_connect_timeout) as conn:
         if conn is None:
+            record_log_db_result(db_manager, False)
+            await spill_or_drop(db_manager, [(kind, record)])
             return
         try:
-            await ensure_log_partition(conn, record["ts"], targets.http_table, targets.schema)
-            async with conn.cursor() as cursor:
-                await cursor.execute(
-                    sql.SQL(
-                        """
-                        INSERT INTO {}.{} (
-                            ts,
-                            method,
-                            endpoint,
-                            status,
-                            duration_ms,
-                            user_name,
-                            request_id,
-                            client_ip,
-                            query_params,
-                            body_size,
-                            response_size,
-                            request_headers,
-                            request_body,
-                            response_headers,
-                            response_body
-                        )
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """
-                    ).format(sql.Identifier(targets.schema), sql.Identifier(targets.http_table)),
-                    (
-                        record.get("ts"),
-                        record.get("method"),
-                        record.get("endpoint"),
-                        record.get("status"),
-                        record.get("duration_ms"),
-                        record.get("user_name"),
-                        record.get("request_id"),
-                        record.get("client_ip"),
-                        Json(record.get("query_params")) if record.get("query_params") is not None else None,
-                        record.get("body_size"),
-                        record.get("response_size"),
-                        Json(record.get("request_headers")) if record.get("request_headers") is not None else None,
-                        record.get("request_body"),
-                        Json(record.get("response_headers")) if record.get("response_headers") is not None else None,
-                        record.get("response_body"),
-                    ),
-                )
-            await conn.commit()
+            await ensure_known_partitions(db_manager, conn, targets, table, [record["ts"]])
+            with span("audit_log.insert", {"audit_log.kind": kind}):
+                async with conn.cursor() as cursor:
+                    await cursor.execute(_insert_sql(targets.schema, table, columns), to_row(record))
+                await conn.commit()
+        except psycopg.OperationalError:
+            record_log_db_result(db_manager, False)
+            await spill_or_drop(db_manager, [(kind, record)])
+            return
         except Exception:
             await conn.rollback()
+            return
+    record_log_db_result(db_manager, True)
+
+
+async def insert_api_log(db_manager, record: Dict[str, Any]) -> None:
+    await _insert_record(db_manager, "http", record)
 
 
 async def insert_api_db_log(db_manager, record: Dict[str, Any]) -> None:
-    targets = await resolve_log_targets(db_manager)
-    async with db_manager.get_db() as conn:
-        if conn is None:
-            return
-        try:
-            await ensure_log_partition(conn, record["ts"], targets.db_table, targets.schema)
-            async with conn.cursor() as cursor:
-                await cursor.execute(
-                    sql.SQL(
-                        """
-                        INSERT INTO {}.{} (
-                            ts,
-                            request_id,
-                            schema_name,
-                            function_name,
-                            sql_text,
-                            response_json,
-                            duration_ms,
-                            status,
-                            error
-                        )
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """
-                    ).format(sql.Identifier(targets.schema), sql.Identifier(targets.db_table)),
-                    (
-                        record.get("ts"),
-                        record.get("request_id"),
-                        record.get("schema_name"),
-                        record.get("function_name"),
-                        record.get("sql_text"),
-                        record.get("response_json"),
-                        record.get("duration_ms"),
-                        record.get("status"),
-                        record.get("error"),
-                    ),
-                )
-            await conn.commit()
-        except Exception:
-            await conn.rollback()
+    await _insert_record(db_manager, "db", record)
+
+
+async def _replay_segment(db_manager, records: list[SpilledRecord]) -> None:
+    """Load one spilled segment in a single transaction (all or nothing)."""
+    conn = await psycopg.AsyncConnection.connect(
+        db_manager.database_url,
+        connect_timeout=max(int(db_manager.settings.db_connect_timeout), 1),
+    )
+    async with conn:
+        targets = await resolve_log_targets(db_manager)
+        await prepare_log_partitions(db_manager, conn, targets, records)
+        await copy_log_records(conn, targets, records)
+
+
+async def replay_spilled_logs(db_manager) -> int:
+    """
+    Bulk-load sealed spill segments (oldest first) and delete them. Returns records replayed.
+
+    Stops at the first connection failure and leaves the remaining segments for
+    the next attempt; a segment the database rejects is kept aside as ``.failed``.
+    """
+    spill = getattr(db_manager, "log_spill", None)
+    if spill is None or spill.replaying:
+        return 0
+    spill.replaying = True
+    replayed = 0
+    try:
+        for segment in await asyncio.to_thread(spill.sealed_segments):
+            claimed = spill.claim(segment)
+            if claimed is None:
+                continue
+            records = await asyncio.to_thread(spill.read_segment, claimed)
+            try:
+                await _replay_segment(db_manager, records)
+            except (psycopg.OperationalError, OSError) as exc:
+                spill.unclaim(claimed)
+                spill.outage.record_failure()
+                logger.warning("[%s] audit log replay paused: %s", db_manager.tenant_id, exc)
+                break
+            except Exception as exc:
+                spill.release(claimed, failed=True)
+                logger.error("[%s] audit log spill segment %s rejected: %s", db_manager.tenant_id, segment.name, exc)
+                continue
+            spill.release(claimed)
+            for kind, _ in records:
+                spill.replayed[kind] += 1
+            replayed += len(records)
+    finally:
+        spill.replaying = False
+    if replayed:
+        logger.info("[%s] replayed %s spilled audit log record(s)", db_manager.tenant_id, replayed)
+    return replayed
+
+
+def submit_api_log(db_manager, record: Dict[str, Any]) -> None:
+    """Queue an HTTP audit record on the tenant's batched writer (or insert it in a task)."""
+    writer = getattr(db_manager, "log_writer", None)
+    if writer is not None:
+        writer.submit("http", record)
+    else:
+        asyncio.create_task(insert_api_log(db_manager, record))
+
+
+def submit_api_db_log(db_manager, record: Dict[str, Any]) -> None:
+    """Queue a DB audit record on the tenant's batched writer (or insert it in a task)."""
+    writer = getattr(db_manager, "log_writer", None)
+    if writer is not None:
+        writer.submit("db", record)
+    else:
+        asyncio.create_task(insert_api_db_log(db_manager, record))
@@ -0,0 +1,216 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Batched, asynchronous audit-log writer (one per tenant `DatabaseManager`).
+
+Request and procedure logging only enqueue records. A background task drains
+the bounded queue and writes batches (by size or every flush interval) with
+``COPY`` over one dedicated connection, so audit logging no longer borrows a
+pool connection and commits once per record. When the queue is full new
+records are dropped and counted. A batch the database rejects (bad value in
+one record) is retried row by row so only the offending records are lost.
+`stop()` flushes what is queued. While the
+database is unreachable, batches go to the tenant's local spill (`log_spill.py`)
+and are replayed once a flush succeeds again.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Any
+
+import psycopg
+
+from ..core.config import global_settings
+from ..utils.tracing import background_trace
+from .log_spill import LogKind, SpilledRecord
+from .log_store import (
+    copy_log_records,
+    insert_log_records,
+    log_db_outage,
+    prepare_log_partitions,
+    record_log_db_result,
+    spill_or_drop,
+)
+from .schema import resolve_log_targets
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    def __init__(
+        self,
+        db_manager,
+        *,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.db_manager = db_manager
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue[SpilledRecord] = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task | None = None
+        # Records taken off the queue but not yet flushed, and the flush in progress;
+        # both survive `stop()` cancelling the loop so nothing dequeued is lost.
+        self._pending: list[SpilledRecord] = []
+        self._flushing: asyncio.Future | None = None
+        self._conn: psycopg.AsyncConnection | None = None
+        self.written: Counter[str] = Counter()
+        self.dropped: Counter[str] = Counter()
+        self.failed: Counter[str] = Counter()
+        self.spilled: Counter[str] = Counter()
+
+    @property
+    def tenant_id(self) -> str:
+        return self.db_manager.tenant_id
+
+    def submit(self, kind: LogKind, record: dict[str, Any]) -> bool:
+        """Enqueue without waiting. Returns False (and counts a drop) when the queue is full."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=f"audit-log-writer-{self.tenant_id}")
+        try:
+            self._queue.put_nowait((kind, record))
+        except asyncio.QueueFull:
+            self.dropped[kind] += 1
+            if sum(self.dropped.values()) % 1000 == 1:
+                logger.warning("[%s] audit log queue full; dropped=%s", self.tenant_id, dict(self.dropped))
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": dict(self.written),
+            "dropped": dict(self.dropped),
+            "failed": dict(self.failed),
+            "spilled": dict(self.spilled),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await self._collect()
+            batch, self._pending = self._pending, []
+            self._flushing = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._flushing)
+
+    async def _collect(self) -> None:
+        """Fill `_pending` until `batch_size` records or `flush_interval` after the first one."""
+        self._pending.append(await self._queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(self._pending) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                self._pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    def _drain(self) -> list[SpilledRecord]:
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return batch
+
+    async def _connection(self) -> psycopg.AsyncConnection:
+        if self._conn is None or self._conn.closed:
+            self._conn = await psycopg.AsyncConnection.connect(
+                self.db_manager.database_url,
+                connect_timeout=max(int(self.db_manager.settings.db_connect_timeout), 1),
+            )
+        return self._conn
+
+    async def _write(self, batch: list[SpilledRecord]) -> list[SpilledRecord]:
+        """Write the batch; returns the records the database rejected."""
+        # Connect first: during an outage this fails within `db_connect_timeout`, before
+        # anything goes through the pool's retrying `get_db`.
+        conn = await self._connection()
+        targets = await resolve_log_targets(self.db_manager)
+        await prepare_log_partitions(self.db_manager, conn, targets, batch)
+        try:
+            await copy_log_records(conn, targets, batch)
+            rejected = []
+        except (psycopg.DataError, psycopg.IntegrityError) as exc:
+            await conn.rollback()
+            logger.warning("[%s] audit log batch rejected (%s); retrying row by row", self.tenant_id, exc)
+            rejected = await insert_log_records(conn, targets, batch)
+        await conn.commit()
+        return rejected
+
+    async def _flush(self, batch: list[SpilledRecord]) -> None:
+        if not batch:
+            return
+        if log_db_outage(self.db_manager):
+            await self._spill(batch)
+            return
+        try:
+            with background_trace("audit_log.flush", {"tenant": self.tenant_id, "audit_log.rows": len(batch)}):
+                rejected = await self._write(batch)
+        except (psycopg.OperationalError, OSError) as exc:
+            await self._discard_connection()
+            record_log_db_result(self.db_manager, False)
+            logger.warning("[%s] audit log database unavailable: %s", self.tenant_id, exc)
+            await self._spill(batch)
+            return
+        except Exception as exc:
+            self._count(self.failed, batch)
+            logger.warning("[%s] audit log batch of %s failed: %s", self.tenant_id, len(batch), exc)
+            await self._discard_connection()
+            return
+        self._count(self.failed, rejected)
+        self._count(self.written, [item for item in batch if item not in rejected])
+        record_log_db_result(self.db_manager, True)
+
+    async def _spill(self, batch: list[SpilledRecord]) -> None:
+        if await spill_or_drop(self.db_manager, batch):
+            self._count(self.spilled, batch)
+        else:
+            self._count(self.failed, batch)
+
+    @staticmethod
+    def _count(counter: Counter, batch: list[SpilledRecord]) -> None:
+        for kind, _ in batch:
+            counter[kind] += 1
+
+    async def _discard_connection(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None and not conn.closed:
+            try:
+                await conn.close()
+            except (psycopg.Error, OSError):
+                logger.debug("[%s] error closing audit log connection", self.tenant_id, exc_info=True)
+
+    async def stop(self) -> None:
+        """Stop the background task and flush everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushing is not None and not self._flushing.done():
+            await self._flushing
+        remaining, self._pending = self._pending + self._drain(), []
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start : start + self.batch_size])
+        await self._discard_connection()
+
+
+def build_log_writer(db_manager) -> AuditLogWriter | None:
+    """Writer for a tenant, or None when batching is disabled (`LOG_DB_WRITER_QUEUE_SIZE=0`)."""
+    if global_settings.log_db_writer_queue_size <= 0:
+        return None
+    return AuditLogWriter(
+        db_manager,
+        max_queue=global_settings.log_db_writer_queue_size,
+        batch_size=global_settings.log_db_writer_batch_size,
+        flush_interval=global_settings.log_db_writer_flush_seconds,
+    )
@@ -0,0 +1,55 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Periodic audit-log maintenance for every loaded tenant.
+
+Started from the app lifespan; each pass pre-creates the upcoming monthly log
+partitions (`LOG_PARTITION_MONTHS_AHEAD`) so month rollover never needs DDL on
+the write path, applies the tenant's log retention (`app/db/retention.py`) and
+replays audit records spilled to disk during an outage (`app/db/log_spill.py`).
+Every worker runs it; partition creation and retention take a per-table
+advisory lock (`try_maintenance_lock`) and skip tables another worker holds.
+"""
+
+import asyncio
+import logging
+
+from ..core.config import global_settings
+from .log_store import replay_spilled_logs
+from .partitions import maintain_log_partitions
+from .retention import apply_log_retention
+from .schema import resolve_log_targets
+
+logger = logging.getLogger(__name__)
+
+
+async def run_log_maintenance(registry) -> None:
+    """One maintenance pass over all tenants with a connection pool."""
+    for tenant in registry.all():
+        db_manager = tenant.db_manager.log_db
+        if db_manager.connection_pool is None:
+            continue
+        try:
+            targets = await resolve_log_targets(db_manager)
+            await maintain_log_partitions(db_manager, targets, global_settings.log_partition_months_ahead)
+            await apply_log_retention(db_manager, tenant.settings)
+            await replay_spilled_logs(db_manager)
+        except Exception as exc:
+            logger.warning("[%s] log maintenance failed: %s", tenant.id, exc)
+
+
+async def _maintenance_loop(registry, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await run_log_maintenance(registry)
+
+
+def start_log_maintenance(registry) -> asyncio.Task | None:
+    """Schedule periodic maintenance, or None when disabled or DB logging is off."""
+    interval = global_settings.log_maintenance_interval_seconds
+    if interval <= 0 or not global_settings.log_db_enabled:
+        return None
+    return asyncio.get_running_loop().create_task(_maintenance_loop(registry, interval), name="log-maintenance")
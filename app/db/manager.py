@@ -7,21 +7,38 @@ or (at your option) any later version.
 
 import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 from psycopg_pool import AsyncConnectionPool
 import psycopg
+from psycopg.conninfo import conninfo_to_dict
 from fastapi import HTTPException
 
-from ..core.config import TenantSettings
+from ..core.config import TenantSettings, global_settings
 from ..core.exceptions import DatabaseUnavailableError
+from ..utils.metrics import observe_pool_wait
+from ..utils.server_timing import phase, record_phase
+from ..utils.tracing import record_span, span
+from .log_spill import build_log_spill
+from .log_writer import build_log_writer
 
 logger = logging.getLogger(__name__)
 
 
+def log_database_url(settings: TenantSettings, tenant_id: str) -> str | None:
+    """Separate audit-log database for a tenant (tenant `LOG_DATABASE_URL`, else the global one), or None."""
+    url = settings.log_database_url or global_settings.log_database_url
+    return url.replace("{tenant}", tenant_id) if url else None
+
+
 class DatabaseManager:
-    """Per-tenant async Postgres connection pool."""
+    """Per-tenant async Postgres connection pool.
+
+    `log_db` is the manager audit logging uses: this one, or a separate manager
+    (own pool, batched writer and spill) when `LOG_DATABASE_URL` is set.
+    """
 
-    def __init__(self, settings: TenantSettings, tenant_id: str):
+    def __init__(self, settings: TenantSettings, tenant_id: str, *, database_url: str | None = None):
         self.tenant_id = tenant_id
         self.settings = settings
         self.connection_pool = None
@@ -33,7 +50,10 @@ class DatabaseManager:
         self.password = settings.db_password
         self.default_schema = settings.db_schema
 
-        if settings.database_url:
+        if database_url:
+            self.database_url = database_url
+            self.dbname = conninfo_to_dict(database_url).get("dbname") or self.dbname
+        elif settings.database_url:
             self.database_url = settings.database_url
         else:
             self.database_url = (
@@ -41,6 +61,15 @@ class DatabaseManager:
                 f"{self.dbname}?application_name=giswater-api"
             )
 
+        log_url = None if database_url else log_database_url(settings, tenant_id)
+        self.log_db = DatabaseManager(settings, tenant_id, database_url=log_url) if log_url else self
+        self.log_spill = build_log_spill(tenant_id) if self.log_db is self else None
+        self.log_writer = build_log_writer(self) if self.log_db is self else None
+
+    @property
+    def has_separate_log_db(self) -> bool:
+        return self.log_db is not self
+
     def _log_prefix(self) -> str:
         return f"[{self.tenant_id}]"
 
@@ -66,14 +95,17 @@ class DatabaseManager:
             self.connection_pool = None
 
     @asynccontextmanager
-    async def get_db(self):
+    async def get_db(self, max_tries: int = 3, timeout: float | None = None):
         """
         Get a database connection from the pool.
 
+        Args:
+            max_tries: attempts before giving up (audit logging uses 1 to fail fast)
+            timeout: seconds to wait for a pooled connection (default: `DB_POOL_TIMEOUT`)
+
         Yields:
             psycopg connection or None if connection fails
         """
-        max_tries = 3
         retry_delay_seconds = 2
 
         for n_try in range(max_tries):
@@ -85,7 +117,12 @@ class DatabaseManager:
                     continue
 
             try:
-                async with self.connection_pool.connection() as conn:
+                requested, requested_ns = time.monotonic(), time.time_ns()
+                async with self.connection_pool.connection(timeout=timeout) as conn:
+                    waited = time.monotonic() - requested
+                    observe_pool_wait(self.tenant_id, self.dbname, waited)
+                    record_phase("pool", waited)
+                    record_span("db.pool.acquire", requested_ns, time.time_ns(), {"db.namespace": self.dbname})
                     yield conn
                     return
             except (psycopg.Error, OSError, asyncio.TimeoutError) as e:
@@ -110,17 +147,18 @@ class DatabaseManager:
 
     async def validate_schema(self, schema: str) -> bool:
         """Validate if a schema exists in the database."""
-        async with self.get_db() as conn:
-            if conn is None:
-                raise DatabaseUnavailableError()
-            try:
-                async with conn.cursor() as cursor:
-                    await cursor.execute(
-                        "SELECT schema_name FROM information_schema.schemata WHERE schema_name = %s", (schema,)
-                    )
-                    return await cursor.fetchone() is not None
-            except psycopg.Error as e:
-                raise HTTPException(status_code=500, detail=str(e)) from e
+        with phase("schema"), span("db.validate_schema", {"db.schema": schema}):
+            async with self.get_db() as conn:
+                if conn is None:
+                    raise DatabaseUnavailableError()
+                try:
+                    async with conn.cursor() as cursor:
+                        await cursor.execute(
+                            "SELECT schema_name FROM information_schema.schemata WHERE schema_name = %s", (schema,)
+                        )
+                        return await cursor.fetchone() is not None
+                except psycopg.Error as e:
+                    raise HTTPException(status_code=500, detail=str(e)) from e
 
     async def is_db_available(self, timeout_seconds: float = 2.0) -> bool:
         """Fast one-shot availability check used by health endpoints."""
@@ -146,7 +184,13 @@ class DatabaseManager:
         return await self.is_db_available()
 
     async def close(self):
-        """Close the connection pool."""
+        """Flush queued audit logs and close the connection pool(s)."""
+        if self.has_separate_log_db:
+            await self.log_db.close()
+        if self.log_writer is not None:
+            await self.log_writer.stop()
+        if self.log_spill is not None:
+            await asyncio.to_thread(self.log_spill.close)
         if self.connection_pool:
             await self.connection_pool.close()
             logger.info("%s Closed connection pool for %s", self._log_prefix(), self.dbname)
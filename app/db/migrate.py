@@ -23,7 +23,7 @@ from alembic.script import ScriptDirectory
 from sqlalchemy import create_engine, pool
 
 from ..core.config import TenantSettings, global_settings
-from .partitions import ensure_current_month_partitions
+from .partitions import invalidate_partition_cache, maintain_log_partitions
 from .schema import invalidate_log_schema_cache, resolve_log_targets
 
 logger = logging.getLogger(__name__)
@@ -98,6 +98,7 @@ async def run_alembic_upgrade(db_manager) -> None:
     before = await get_current_revision(db_manager.database_url)
     await asyncio.to_thread(_sync_upgrade, db_manager.database_url)
     invalidate_log_schema_cache(db_manager.tenant_id)
+    invalidate_partition_cache(db_manager.tenant_id)
     after = await get_current_revision(db_manager.database_url)
     if before != after:
         logger.info("[%s] migrated gwapi schema %s -> %s", db_manager.tenant_id, before, after)
@@ -109,39 +110,50 @@ async def get_current_revision(database_url: str) -> str | None:
     return await asyncio.to_thread(_sync_current_revision, database_url)
 
 
+def migration_targets(db_manager) -> list:
+    """Managers whose database holds a `gwapi` schema: the tenant DB, plus the audit-log DB when separate."""
+    return [db_manager, db_manager.log_db] if db_manager.has_separate_log_db else [db_manager]
+
+
 async def ensure_tenant_database(db_manager, settings: TenantSettings) -> None:
     """Bring a tenant DB to the current schema and prepare runtime objects.
 
     Replaces the old runtime DDL bootstrap. Runs Alembic (unless disabled),
-    ensures the current-month log partitions, and bootstraps the first basic-auth
+    pre-creates the upcoming log partitions, and bootstraps the first basic-auth
     user. Migration failures are non-fatal: the legacy schema resolver keeps the
-    API serving against `log.*` until the issue is resolved.
+    API serving against `log.*` until the issue is resolved. With a separate
+    audit-log database (`LOG_DATABASE_URL`) both databases are migrated.
     """
     needs_db = global_settings.log_db_enabled or settings.auth_mode == "basic"
     if not needs_db:
         return
 
+    databases = migration_targets(db_manager) if global_settings.log_db_enabled else [db_manager]
     if global_settings.db_auto_migrate:
-        try:
-            await run_alembic_upgrade(db_manager)
-        except Exception as exc:
-            logger.warning(
-                "[%s] alembic upgrade failed; keeping legacy schema: %r",
-                db_manager.tenant_id,
-                exc,
-                exc_info=True,
-            )
+        for target in databases:
+            try:
+                await run_alembic_upgrade(target)
+            except Exception as exc:
+                logger.warning(
+                    "[%s] alembic upgrade of %s failed; keeping legacy schema: %r",
+                    target.tenant_id,
+                    target.dbname,
+                    exc,
+                    exc_info=True,
+                )
     else:
         logger.info(
             "[%s] DB_AUTO_MIGRATE=false; audit logs stay in their current schema until "
             "'giswater-api db upgrade' is run.",
             db_manager.tenant_id,
         )
-        await _warn_if_behind(db_manager)
+        for target in databases:
+            await _warn_if_behind(target)
 
     if global_settings.log_db_enabled:
-        targets = await resolve_log_targets(db_manager)
-        await ensure_current_month_partitions(db_manager, targets)
+        log_db = db_manager.log_db
+        targets = await resolve_log_targets(log_db)
+        await maintain_log_partitions(log_db, targets, global_settings.log_partition_months_ahead)
 
     if settings.auth_mode == "basic":
         from ..auth.users import maybe_bootstrap_user
@@ -3,13 +3,24 @@ Copyright © 2026 by BGEO. All rights reserved.
 The program is free software: you can redistribute it and/or modify it under the terms of the GNU
 General Public License as published by the Free Software Foundation, either version 3 of the License,
 or (at your option) any later version.
+
+Monthly partitions of the audit log tables.
+
+Partitions are created ahead of time (`maintain_log_partitions`, at startup and
+from the periodic maintenance task) and recorded in a per-tenant in-memory set,
+so the write path (`ensure_known_partitions`) only checks that set instead of
+running catalog queries and DDL for every batch.
 """
 
 import logging
-from datetime import datetime, timezone
+import re
+import time
+from datetime import date, datetime, timezone
 
+import psycopg
 from psycopg import sql
 
+from ..core.config import global_settings
 from .schema import (
     DB_LOG_TABLE,
     HTTP_LOG_TABLE,
@@ -17,10 +28,42 @@ from .schema import (
     LEGACY_HTTP_LOG_TABLE,
     LogTargets,
     table_exists,
+    try_maintenance_lock,
 )
 
 logger = logging.getLogger(__name__)
 
+_PARTITION_SUFFIX = re.compile(r"_(\d{4})_(\d{2})$")
+
+# Per-tenant set of (schema, parent table, month start) partitions known to exist.
+_known_partitions: dict[str, set[tuple[str, str, date]]] = {}
+# (tenant, schema, parent table, month) -> monotonic time a write-path creation failed.
+_failed_checks: dict[tuple[str, str, str, date], float] = {}
+_FAILED_CHECK_RETRY_SECONDS = 30.0
+
+
+def invalidate_partition_cache(tenant_id: str | None = None) -> None:
+    if tenant_id is None:
+        _known_partitions.clear()
+        _failed_checks.clear()
+    else:
+        _known_partitions.pop(tenant_id, None)
+        for key in [key for key in _failed_checks if key[0] == tenant_id]:
+            del _failed_checks[key]
+
+
+def _remember_partition(tenant_id: str, schema: str, table_name: str, month: date) -> None:
+    _known_partitions.setdefault(tenant_id, set()).add((schema, table_name, month))
+
+
+def forget_partition(tenant_id: str, schema: str, table_name: str, month: date) -> None:
+    _known_partitions.get(tenant_id, set()).discard((schema, table_name, month))
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
 
 def _month_range(ts: datetime, table_name: str) -> tuple[datetime, datetime, str]:
     month_start = datetime(ts.year, ts.month, 1, tzinfo=ts.tzinfo)
@@ -68,16 +111,108 @@ async def ensure_log_partition(conn, ts: datetime, table_name: str, schema: str)
         )
 
 
-async def ensure_current_month_partitions(db_manager, targets: LogTargets) -> None:
-    """Ensure the current-month partitions exist for both audit log tables."""
+async def existing_partition_months(conn, schema: str, table_name: str) -> set[date]:
+    """Months that already have a partition of `schema.table_name` (one catalog query)."""
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            """,
+            (f"{schema}.{table_name}",),
+        )
+        rows = await cursor.fetchall()
+    months = set()
+    for (name,) in rows:
+        match = _PARTITION_SUFFIX.search(name)
+        if match:
+            months.add(date(int(match.group(1)), int(match.group(2)), 1))
+    return months
+
+
+def _wanted_months(ts: datetime | None, months_ahead: int) -> list[date]:
+    start = ts or datetime.now(timezone.utc)
+    first = date(start.year, start.month, 1)
+    return [add_months(first, offset) for offset in range(max(months_ahead, 0) + 1)]
+
+
+async def _create_partitions(
+    conn, tenant_id: str, targets: LogTargets, wanted: list[date], *, serialize: bool = False
+) -> int:
+    """
+    Create the missing `wanted` partitions of both audit tables on `conn` and record them as known.
+
+    With `serialize`, a table whose maintenance lock another worker holds is left
+    to that worker: only its existing partitions are recorded.
+    """
+    created = 0
+    for table_name in (targets.http_table, targets.db_table):
+        locked = not serialize or await try_maintenance_lock(conn, targets.schema, table_name, transaction=True)
+        existing = await existing_partition_months(conn, targets.schema, table_name)
+        for month in wanted if locked else ():
+            if month not in existing:
+                month_ts = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+                await ensure_log_partition(conn, month_ts, table_name, targets.schema)
+                created += 1
+        await conn.commit()
+        for month in existing.union(wanted) if locked else existing:
+            _remember_partition(tenant_id, targets.schema, table_name, month)
+    if created:
+        logger.info("[%s] created %s audit log partition(s)", tenant_id, created)
+    return created
+
+
+async def maintain_log_partitions(
+    db_manager, targets: LogTargets, months_ahead: int, ts: datetime | None = None
+) -> int:
+    """
+    Ensure partitions from the month of `ts` (default: now) through `months_ahead` months later.
+
+    Records every existing partition of both audit tables in the known-partitions
+    cache. Returns how many partitions were created. Tables another worker is
+    maintaining at the same time are skipped.
+    """
     async with db_manager.get_db() as conn:
         if conn is None:
-            return
-        now = datetime.now(timezone.utc)
+            return 0
+        try:
+            wanted = _wanted_months(ts, months_ahead)
+            return await _create_partitions(conn, db_manager.tenant_id, targets, wanted, serialize=True)
+        except Exception as exc:
+            await conn.rollback()
+            logger.warning("[%s] log partition maintenance failed: %s", db_manager.tenant_id, exc)
+            return 0
+
+
+async def ensure_known_partitions(db_manager, conn, targets: LogTargets, table_name: str, timestamps) -> None:
+    """
+    Write-path check: make sure the months of `timestamps` have partitions.
+
+    Normally every month is already in the known-partitions cache and this does
+    no DB work. A miss (maintenance not run yet, or a row far from now) creates
+    the partitions from that month on `conn`, the connection the batch is
+    written with, so an outage never waits on the pool's retries. A month whose
+    creation failed is not retried for `_FAILED_CHECK_RETRY_SECONDS`; connection
+    errors propagate so the caller can spill.
+    """
+    tenant_id = db_manager.tenant_id
+    for month in sorted({date(ts.year, ts.month, 1) for ts in timestamps}):
+        key = (targets.schema, table_name, month)
+        if key in _known_partitions.get(tenant_id, ()):
+            continue
+        failed_at = _failed_checks.get((tenant_id, *key))
+        if failed_at is not None and time.monotonic() - failed_at < _FAILED_CHECK_RETRY_SECONDS:
+            continue
+        wanted = _wanted_months(datetime(month.year, month.month, 1), global_settings.log_partition_months_ahead)
         try:
-            await ensure_log_partition(conn, now, targets.http_table, targets.schema)
-            await ensure_log_partition(conn, now, targets.db_table, targets.schema)
-            await conn.commit()
+            await _create_partitions(conn, tenant_id, targets, wanted)
+        except psycopg.OperationalError:
+            raise
         except Exception as exc:
             await conn.rollback()
-            logger.warning("[%s] log partition init failed: %s", db_manager.tenant_id, exc)
+            _failed_checks[(tenant_id, *key)] = time.monotonic()
+            logger.warning("[%s] audit log partition for %s failed: %s", tenant_id, month.isoformat(), exc)
+            continue
+        _failed_checks.pop((tenant_id, *key), None)
@@ -0,0 +1,259 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Audit log retention: detach, optionally archive, and drop expired monthly partitions.
+
+A partition expires once its whole month is older than the tenant's
+`LOG_RETENTION_HTTP_DAYS` / `LOG_RETENTION_DB_DAYS`. It is detached with
+``DETACH PARTITION ... CONCURRENTLY`` (plain ``DETACH`` where that is not
+available), exported to ``LOG_DIR/<tenant>/archive/`` when `LOG_ARCHIVE_FORMAT`
+is ``csv`` (gzip) or ``parquet`` (zstd, needs pyarrow), then dropped. Tables
+left detached by an interrupted run are picked up again on the next one. Each
+table is processed under an advisory lock, so when several workers run the
+maintenance task only one of them expires (and archives) a given table.
+"""
+
+import asyncio
+import csv
+import gzip
+import logging
+import os
+import re
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import psycopg
+from psycopg import sql
+
+from ..core.config import TenantSettings, global_settings
+from .partitions import add_months, forget_partition
+from .schema import (
+    DB_LOG_TABLE,
+    HTTP_LOG_TABLE,
+    LEGACY_DB_LOG_TABLE,
+    LEGACY_HTTP_LOG_TABLE,
+    resolve_log_targets,
+    try_maintenance_lock,
+)
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_NAME = re.compile(r"_(\d{4})_(\d{2})$")
+# Partition name prefixes per audit table (partitions moved from `log` keep their legacy names).
+_PREFIXES = {
+    HTTP_LOG_TABLE: (HTTP_LOG_TABLE, LEGACY_HTTP_LOG_TABLE),
+    LEGACY_HTTP_LOG_TABLE: (HTTP_LOG_TABLE, LEGACY_HTTP_LOG_TABLE),
+    DB_LOG_TABLE: (DB_LOG_TABLE, LEGACY_DB_LOG_TABLE),
+    LEGACY_DB_LOG_TABLE: (DB_LOG_TABLE, LEGACY_DB_LOG_TABLE),
+}
+_ARCHIVE_SUFFIX = {"csv": ".csv.gz", "parquet": ".parquet"}
+
+
+@dataclass(frozen=True)
+class LogPartition:
+    schema: str
+    table: str
+    name: str
+    month: date
+    attached: bool
+    bytes: int
+
+
+def retention_cutoff(retention_days: int, now: datetime | None = None) -> date | None:
+    """Partitions whose month ends on or before this date are expired (None = keep forever)."""
+    if retention_days <= 0:
+        return None
+    return ((now or datetime.now(timezone.utc)) - timedelta(days=retention_days)).date()
+
+
+def is_expired(partition: LogPartition, cutoff: date | None) -> bool:
+    return cutoff is not None and add_months(partition.month, 1) <= cutoff
+
+
+async def list_log_partitions(conn, schema: str, table_name: str) -> list[LogPartition]:
+    """Monthly partitions of `table_name` in `schema`, attached or left detached, with their size."""
+    prefixes = _PREFIXES.get(table_name, (table_name,))
+    pattern = "^(" + "|".join(re.escape(p) for p in prefixes) + r")_[0-9]{4}_[0-9]{2}$"
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT c.relname, i.inhparent IS NOT NULL, pg_total_relation_size(c.oid)
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+            WHERE n.nspname = %s AND c.relkind = 'r' AND c.relname ~ %s
+            ORDER BY c.relname
+            """,
+            (schema, pattern),
+        )
+        rows = await cursor.fetchall()
+    partitions = []
+    for name, attached, size in rows:
+        match = _PARTITION_NAME.search(name)
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        partitions.append(LogPartition(schema, table_name, name, month, bool(attached), int(size or 0)))
+    return partitions
+
+
+async def _detach(conn, partition: LogPartition) -> None:
+    parent = sql.Identifier(partition.schema, partition.table)
+    child = sql.Identifier(partition.schema, partition.name)
+    try:
+        await conn.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {} CONCURRENTLY").format(parent, child))
+    except psycopg.errors.ObjectNotInPrerequisiteState:
+        # Already pending detach from an interrupted concurrent detach.
+        await conn.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {} FINALIZE").format(parent, child))
+    except (psycopg.errors.FeatureNotSupported, psycopg.errors.SyntaxError):
+        # PostgreSQL < 14, or a default partition exists.
+        await conn.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(parent, child))
+
+
+def archive_dir(tenant_id: str) -> Path:
+    return Path(global_settings.log_dir) / tenant_id / "archive"
+
+
+# COPY output is buffered up to this size before each (threaded) file write.
+_ARCHIVE_WRITE_BYTES = 1 << 20
+
+
+def _csv_to_parquet(src: Path, dest: Path) -> None:
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+        from pyarrow import parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("LOG_ARCHIVE_FORMAT=parquet requires pyarrow (pip install 'giswater-api[parquet]')") from exc
+    with open(src, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    # Every column as text: the archive mirrors the COPY output without type guessing across blocks.
+    reader = pa_csv.open_csv(
+        src,
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in header}, strings_can_be_null=True
+        ),
+    )
+    with pq.ParquetWriter(dest, reader.schema, compression="zstd") as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+
+
+async def archive_partition(conn, tenant_id: str, partition: LogPartition, fmt: str) -> Path:
+    """
+    Export one partition (``COPY ... TO STDOUT``) to a compressed file; returns its path.
+
+    File I/O runs in worker threads, in ~1 MiB writes, so the event loop only
+    reads the COPY stream. CSV is gzipped as it streams; parquet goes through a
+    temporary CSV first (pyarrow reads it back in blocks).
+    """
+    target_dir = archive_dir(tenant_id)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    dest = target_dir / f"{partition.schema}.{partition.name}{_ARCHIVE_SUFFIX[fmt]}"
+    partial = dest.with_name(dest.name + ".part")
+    raw = dest.with_name(dest.name + ".tmp.csv")
+    statement = sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER true)").format(
+        sql.Identifier(partition.schema, partition.name)
+    )
+    try:
+        if fmt == "csv":
+            out = await asyncio.to_thread(gzip.open, partial, "wb")
+        else:
+            out = await asyncio.to_thread(open, raw, "wb")
+        try:
+            buffered, size = [], 0
+            async with conn.cursor() as cursor:
+                async with cursor.copy(statement) as copy:
+                    async for chunk in copy:
+                        buffered.append(bytes(chunk))
+                        size += len(chunk)
+                        if size >= _ARCHIVE_WRITE_BYTES:
+                            await asyncio.to_thread(out.write, b"".join(buffered))
+                            buffered, size = [], 0
+            await asyncio.to_thread(out.write, b"".join(buffered))
+        finally:
+            await asyncio.to_thread(out.close)
+        if fmt != "csv":
+            await asyncio.to_thread(_csv_to_parquet, raw, partial)
+        os.replace(partial, dest)
+    finally:
+        raw.unlink(missing_ok=True)
+        partial.unlink(missing_ok=True)
+    return dest
+
+
+async def _expire(conn, tenant_id: str, partition: LogPartition, fmt: str) -> dict:
+    entry = {**asdict(partition), "month": partition.month.isoformat()}
+    try:
+        if partition.attached:
+            await _detach(conn, partition)
+            forget_partition(tenant_id, partition.schema, partition.table, partition.month)
+        if fmt != "none":
+            entry["archive"] = str(await archive_partition(conn, tenant_id, partition, fmt))
+        await conn.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(partition.schema, partition.name)))
+        entry["action"] = "dropped"
+    except Exception as exc:
+        # Left detached (or attached) as-is; the next run retries.
+        logger.warning("[%s] log retention failed for %s: %s", tenant_id, partition.name, exc)
+        entry["action"] = "failed"
+        entry["error"] = str(exc)
+    return entry
+
+
+async def apply_log_retention(
+    db_manager,
+    settings: TenantSettings,
+    *,
+    dry_run: bool = False,
+    now: datetime | None = None,
+) -> dict:
+    """
+    Expire audit log partitions for one tenant.
+
+    Uses a dedicated autocommit connection (``DETACH ... CONCURRENTLY`` cannot run in
+    a transaction). With `dry_run` nothing is changed and the report lists what would
+    be dropped and how many bytes that reclaims.
+    """
+    targets = await resolve_log_targets(db_manager)
+    cutoffs = {
+        targets.http_table: retention_cutoff(settings.log_retention_http_days, now),
+        targets.db_table: retention_cutoff(settings.log_retention_db_days, now),
+    }
+    report = {"tenant": db_manager.tenant_id, "dry_run": dry_run, "bytes": 0, "partitions": []}
+    if all(cutoff is None for cutoff in cutoffs.values()):
+        return report
+    conn = await psycopg.AsyncConnection.connect(
+        db_manager.database_url,
+        autocommit=True,
+        connect_timeout=max(int(settings.db_connect_timeout), 1),
+    )
+    # Session locks: released when the connection closes.
+    async with conn:
+        for table_name, cutoff in cutoffs.items():
+            if cutoff is None:
+                continue
+            if not dry_run and not await try_maintenance_lock(conn, targets.schema, table_name):
+                logger.info("[%s] log retention for %s skipped: running elsewhere", db_manager.tenant_id, table_name)
+                report.setdefault("skipped", []).append(table_name)
+                continue
+            for partition in await list_log_partitions(conn, targets.schema, table_name):
+                if not is_expired(partition, cutoff):
+                    continue
+                if dry_run:
+                    entry = {**asdict(partition), "month": partition.month.isoformat(), "action": "would_drop"}
+                else:
+                    entry = await _expire(conn, db_manager.tenant_id, partition, settings.log_archive_format)
+                if entry["action"] != "failed":
+                    report["bytes"] += partition.bytes
+                report["partitions"].append(entry)
+    if report["partitions"] and not dry_run:
+        logger.info(
+            "[%s] log retention dropped %s partition(s), %s bytes",
+            db_manager.tenant_id,
+            sum(1 for p in report["partitions"] if p["action"] == "dropped"),
+            report["bytes"],
+        )
+    return report
@@ -41,6 +41,8 @@ class LogTargets:
     schema: str
     http_table: str
     db_table: str
+    # False until migration 0004 added `http_logs.timings` (and always for the legacy `log` tables).
+    has_timings: bool = True
 
 
 # Per-tenant cache of resolved log targets. Cleared after a successful migration
@@ -65,6 +67,30 @@ async def table_exists(conn, schema: str, table: str) -> bool:
         return bool(row and row[0])
 
 
+async def column_exists(conn, schema: str, table: str, column: str) -> bool:
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            "SELECT 1 FROM information_schema.columns WHERE table_schema = %s AND table_name = %s AND column_name = %s",
+            (schema, table, column),
+        )
+        return await cursor.fetchone() is not None
+
+
+async def try_maintenance_lock(conn, schema: str, table: str, *, transaction: bool = False) -> bool:
+    """
+    Non-blocking advisory lock on maintenance of the audit table `schema.table`.
+
+    Every gunicorn worker runs the maintenance task; only the holder of the lock
+    creates partitions or expires them, the others skip the table. Session locks
+    last until the connection closes, `transaction` ones until commit/rollback.
+    """
+    function = "pg_try_advisory_xact_lock" if transaction else "pg_try_advisory_lock"
+    async with conn.cursor() as cursor:
+        await cursor.execute(f"SELECT {function}(hashtext(%s))", (f"gwapi.log_maintenance:{schema}.{table}",))
+        row = await cursor.fetchone()
+        return bool(row and row[0])
+
+
 async def _detect_log_targets(db_manager) -> LogTargets | None:
     """Detect where audit log tables live for this tenant.
 
@@ -75,14 +101,16 @@ async def _detect_log_targets(db_manager) -> LogTargets | None:
         if conn is None:
             return None
         if await table_exists(conn, GWAPI_SCHEMA, HTTP_LOG_TABLE):
-            return LogTargets(GWAPI_SCHEMA, HTTP_LOG_TABLE, DB_LOG_TABLE)
+            # `gwapi` may still be behind 0004 (DB_AUTO_MIGRATE=false, or a failed upgrade).
+            has_timings = await column_exists(conn, GWAPI_SCHEMA, HTTP_LOG_TABLE, "timings")
+            return LogTargets(GWAPI_SCHEMA, HTTP_LOG_TABLE, DB_LOG_TABLE, has_timings)
         if await table_exists(conn, LEGACY_LOG_SCHEMA, LEGACY_HTTP_LOG_TABLE):
             logger.warning(
                 "[%s] DEPRECATED #28: audit logs still in the 'log' schema; run "
                 "'giswater-api db upgrade' to relocate them to 'gwapi'. Removal in 2.0.0.",
                 db_manager.tenant_id,
             )
-            return LogTargets(LEGACY_LOG_SCHEMA, LEGACY_HTTP_LOG_TABLE, LEGACY_DB_LOG_TABLE)
+            return LogTargets(LEGACY_LOG_SCHEMA, LEGACY_HTTP_LOG_TABLE, LEGACY_DB_LOG_TABLE, has_timings=False)
     # Neither exists yet (e.g. fresh DB before migration); target gwapi.
     return LogTargets(GWAPI_SCHEMA, HTTP_LOG_TABLE, DB_LOG_TABLE)
 
@@ -0,0 +1,195 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+`pg_stat_statements` snapshots and diffs for one tenant database.
+
+`take_snapshot` reads the cumulative counters of the statements run in the
+tenant database (``dbid`` = current database), summed per (user, queryid) across
+top-level and nested entries. `diff_snapshots` subtracts two snapshots; a
+statement first seen in the later one, or whose counters went backwards
+(``pg_stat_statements_reset()``, entry eviction), counts from zero.
+`rank_statements` orders the result by total time, calls, shared-buffer reads or
+temp I/O and names the function each statement calls, so it can be matched with
+``db_logs.function_name``.
+"""
+
+import re
+from dataclasses import asdict, dataclass, fields, replace
+from datetime import datetime, timezone
+
+import psycopg
+from psycopg import sql
+from psycopg.rows import dict_row
+
+from ..core.exceptions import DatabaseUnavailableError
+
+# `sort` values -> counter(s) the statements are ranked by.
+STATEMENT_SORT_KEYS = {
+    "total_time": ("total_ms",),
+    "calls": ("calls",),
+    "shared_blks_read": ("shared_blks_read",),
+    "temp_blks": ("temp_blks_read", "temp_blks_written"),
+}
+_QUERY_TEXT_MAX = 1000
+# `"schema"."function"(` as emitted by execute_procedure (normalized text keeps the call shape).
+_CALLED_FUNCTION = re.compile(r'\.\s*"?([A-Za-z_][A-Za-z0-9_$]*)"?\s*\(')
+
+
+@dataclass(frozen=True)
+class StatementStats:
+    userid: int
+    queryid: int
+    query: str
+    calls: int
+    total_ms: float
+    rows: int
+    shared_blks_hit: int
+    shared_blks_read: int
+    temp_blks_read: int
+    temp_blks_written: int
+
+
+@dataclass(frozen=True)
+class StatementSnapshot:
+    database: str
+    taken_at: datetime
+    statements: tuple[StatementStats, ...]
+
+    def to_dict(self) -> dict:
+        return {
+            "database": self.database,
+            "taken_at": self.taken_at.isoformat(),
+            "statements": [asdict(stats) for stats in self.statements],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StatementSnapshot":
+        names = {field.name for field in fields(StatementStats)}
+        return cls(
+            database=data["database"],
+            taken_at=datetime.fromisoformat(data["taken_at"]),
+            statements=tuple(
+                StatementStats(**{key: value for key, value in row.items() if key in names})
+                for row in data["statements"]
+            ),
+        )
+
+
+def _version_tuple(version: str) -> tuple[int, ...]:
+    return tuple(int(part) for part in re.findall(r"\d+", version))
+
+
+async def _statements_view(cursor, database: str) -> tuple[str, str]:
+    """Schema holding the extension and its total-time column (``total_time`` before 1.8 / PostgreSQL 13)."""
+    await cursor.execute(
+        "SELECT n.nspname AS schema, e.extversion AS version FROM pg_extension e "
+        "JOIN pg_namespace n ON n.oid = e.extnamespace WHERE e.extname = 'pg_stat_statements'"
+    )
+    row = await cursor.fetchone()
+    if row is None:
+        raise LookupError(f"pg_stat_statements is not installed in database '{database}'")
+    return row["schema"], "total_exec_time" if _version_tuple(row["version"]) >= (1, 8) else "total_time"
+
+
+def _snapshot_query(schema: str, total_column: str) -> sql.Composed:
+    return sql.SQL(
+        """
+        SELECT userid::bigint AS userid, queryid, min(query) AS query,
+               sum(calls)::bigint AS calls, sum({total})::float8 AS total_ms, sum(rows)::bigint AS rows,
+               sum(shared_blks_hit)::bigint AS shared_blks_hit, sum(shared_blks_read)::bigint AS shared_blks_read,
+               sum(temp_blks_read)::bigint AS temp_blks_read, sum(temp_blks_written)::bigint AS temp_blks_written
+        FROM {schema}.pg_stat_statements
+        WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database()) AND queryid IS NOT NULL
+        GROUP BY userid, queryid
+        """
+    ).format(schema=sql.Identifier(schema), total=sql.Identifier(total_column))
+
+
+async def take_snapshot(db_manager) -> StatementSnapshot:
+    """Current `pg_stat_statements` counters of the tenant database; LookupError when unavailable."""
+    async with db_manager.get_db() as conn:
+        if conn is None:
+            raise DatabaseUnavailableError()
+        try:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                schema, total_column = await _statements_view(cursor, db_manager.dbname)
+                await cursor.execute(_snapshot_query(schema, total_column))
+                rows = await cursor.fetchall()
+            await conn.commit()
+        except psycopg.Error as exc:
+            await conn.rollback()
+            # e.g. the extension exists but the library is not in shared_preload_libraries.
+            raise LookupError(f"pg_stat_statements unavailable: {exc}") from exc
+    return StatementSnapshot(
+        database=db_manager.dbname,
+        taken_at=datetime.now(timezone.utc),
+        statements=tuple(StatementStats(**row) for row in rows),
+    )
+
+
+def _delta(before: StatementStats | None, after: StatementStats) -> StatementStats:
+    if before is None or after.calls < before.calls:
+        return after
+    return replace(
+        after,
+        calls=after.calls - before.calls,
+        total_ms=max(after.total_ms - before.total_ms, 0.0),
+        rows=after.rows - before.rows,
+        shared_blks_hit=after.shared_blks_hit - before.shared_blks_hit,
+        shared_blks_read=after.shared_blks_read - before.shared_blks_read,
+        temp_blks_read=after.temp_blks_read - before.temp_blks_read,
+        temp_blks_written=after.temp_blks_written - before.temp_blks_written,
+    )
+
+
+def diff_snapshots(before: StatementSnapshot, after: StatementSnapshot) -> list[StatementStats]:
+    """Per-statement activity between two snapshots of the same database (statements with new calls only)."""
+    if before.database != after.database:
+        raise ValueError(f"Snapshots are from different databases ('{before.database}', '{after.database}')")
+    if before.taken_at >= after.taken_at:
+        raise ValueError("The first snapshot must be older than the second")
+    previous = {(stats.userid, stats.queryid): stats for stats in before.statements}
+    deltas = (_delta(previous.get((stats.userid, stats.queryid)), stats) for stats in after.statements)
+    return [delta for delta in deltas if delta.calls > 0]
+
+
+def called_function(query: str) -> str | None:
+    """Name of the first schema-qualified function the statement calls (``gw_fct_getinfofromid``)."""
+    match = _CALLED_FUNCTION.search(query)
+    return match.group(1) if match else None
+
+
+def _item(stats: StatementStats) -> dict:
+    touched = stats.shared_blks_hit + stats.shared_blks_read
+    query = stats.query if len(stats.query) <= _QUERY_TEXT_MAX else stats.query[:_QUERY_TEXT_MAX] + "...[truncated]"
+    return {
+        "queryid": stats.queryid,
+        "function": called_function(stats.query),
+        "query": query,
+        "calls": stats.calls,
+        "total_ms": round(stats.total_ms, 1),
+        "mean_ms": round(stats.total_ms / stats.calls, 2) if stats.calls else None,
+        "rows": stats.rows,
+        "shared_blks_hit": stats.shared_blks_hit,
+        "shared_blks_read": stats.shared_blks_read,
+        "hit_ratio": round(stats.shared_blks_hit / touched, 4) if touched else None,
+        "temp_blks_read": stats.temp_blks_read,
+        "temp_blks_written": stats.temp_blks_written,
+    }
+
+
+def rank_statements(statements: list[StatementStats], sort: str = "total_time", limit: int = 20) -> dict:
+    """Totals over `statements` plus the top `limit` by `sort` (one of `STATEMENT_SORT_KEYS`)."""
+    counters = STATEMENT_SORT_KEYS.get(sort)
+    if counters is None:
+        raise ValueError(f"Invalid sort '{sort}'; expected one of {', '.join(STATEMENT_SORT_KEYS)}")
+    ranked = sorted(statements, key=lambda stats: sum(getattr(stats, name) for name in counters), reverse=True)
+    total = {
+        name: sum(getattr(stats, name) for stats in statements)
+        for name in ("calls", "total_ms", "rows", "shared_blks_read", "temp_blks_read", "temp_blks_written")
+    }
+    total["total_ms"] = round(total["total_ms"], 1)
+    return {"sort": sort, "total": total, "count": len(statements), "items": [_item(s) for s in ranked[:limit]]}
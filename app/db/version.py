@@ -10,12 +10,18 @@ from fastapi import HTTPException
 from psycopg import sql
 
 from ..core.exceptions import DatabaseUnavailableError
+from ..utils.server_timing import phase
 
 
 async def get_db_version(log, db_manager, schema: str | None = None) -> str | None:
     """
     Return latest giswater version from sys_version.
     """
+    with phase("version"):
+        return await _select_db_version(log, db_manager, schema)
+
+
+async def _select_db_version(log, db_manager, schema: str | None) -> str | None:
     schema_name = schema or db_manager.default_schema
     if schema_name is None:
         log.warning("Schema is None")
@@ -5,6 +5,7 @@ General Public License as published by the Free Software Foundation, either vers
 or (at your option) any later version.
 """
 
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
@@ -14,7 +15,7 @@ from pathlib import Path
 from fastapi import Depends, FastAPI, Request
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 from .api.exception_handlers import register_exception_handlers
@@ -22,13 +23,16 @@ from .api.admin.router import register_admin
 from .api.v1.router import register_v1, tenant_openapi_routes
 from .auth import verify_admin
 from .core.config import global_settings
-from .core.constants import ADMIN_PREFIX, GLOBAL_HEALTH_PATH, STATIC_PREFIX, TENANT_PREFIX
-from .middleware.request_logging import request_logging_middleware
+from .core.constants import ADMIN_PREFIX, GLOBAL_HEALTH_PATH, METRICS_PATH, STATIC_PREFIX, TENANT_PREFIX
+from .db.maintenance import start_log_maintenance
+from .middleware.metrics import MetricsMiddleware
+from .middleware.request_logging import RequestLoggingMiddleware
 from .schemas.common import GwErrorResponse
 from .tenancy import state
 from .tenancy.host_middleware import host_middleware
 from .tenancy.registry import Tenant, TenantRegistry
-from .utils.log_setup import create_log
+from .utils.log_setup import create_log, logger_registry
+from .utils.metrics import render_metrics, start_metrics_refresh
 from .utils.plugins import load_plugins
 
 TITLE = "Giswater API"
@@ -44,6 +48,16 @@ def _register_health_route(app: FastAPI, path: str = "/health") -> None:
         return {"status": "ok"}
 
 
+def _register_metrics_route(app: FastAPI, path: str) -> None:
+    dependencies = [Depends(verify_admin)] if global_settings.metrics_require_admin else []
+
+    @app.get(path, include_in_schema=False, dependencies=dependencies)
+    async def metrics():
+        """Prometheus exposition, aggregated over all workers when `PROMETHEUS_MULTIPROC_DIR` is set."""
+        body, content_type = render_metrics(state.registry)
+        return Response(content=body, media_type=content_type)
+
+
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     tenants_dir = Path(global_settings.tenants_dir).resolve()
@@ -65,13 +79,24 @@ async def lifespan(_app: FastAPI):
 
     state.registry = registry
     state.global_logger = create_log("api", os.path.join(global_settings.log_dir, "_global"))
+    maintenance = start_log_maintenance(registry)
+    metrics_refresh = start_metrics_refresh(registry)
 
     try:
         yield
     finally:
+        if metrics_refresh is not None:
+            metrics_refresh.cancel()
+        if maintenance is not None:
+            maintenance.cancel()
+            try:
+                await maintenance
+            except asyncio.CancelledError:
+                pass
         await registry.close_all()
         state.registry = None
         state.global_logger = None
+        logger_registry.stop()
 
 
 parent = FastAPI(
@@ -162,13 +187,17 @@ parent.mount(TENANT_PREFIX, tenant_app)
 parent.mount(STATIC_PREFIX, StaticFiles(directory="app/static"), name="static")
 
 _register_health_route(parent, GLOBAL_HEALTH_PATH)
+if global_settings.metrics_enabled:
+    _register_metrics_route(parent, METRICS_PATH)
 for _app in (tenant_app, admin_app):
     _register_health_route(_app)
 
 
 # Middleware order: Starlette runs LIFO — register host_middleware first so it runs inner.
 parent.middleware("http")(host_middleware)
-parent.middleware("http")(request_logging_middleware)
+parent.add_middleware(RequestLoggingMiddleware)
+if global_settings.metrics_enabled:
+    parent.add_middleware(MetricsMiddleware)
 
 for _app in (parent, tenant_app, admin_app):
     register_exception_handlers(_app)
@@ -0,0 +1,54 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils.metrics import observe_request
+
+
+def _route_label(scope: Scope) -> str:
+    """Route template (``/v1/basic/getinfofromid``, ``/v1/items/{id}``), never the raw path."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    return scope.get("root_path", "") + path
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request count and latency per tenant, method, route and status."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        status = 500
+
+        async def send_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            tenant = (scope.get("state") or {}).get("tenant")
+            observe_request(
+                getattr(tenant, "id", None) or "-",
+                scope["method"],
+                _route_label(scope),
+                status,
+                time.monotonic() - start,
+            )
@@ -1,41 +1,30 @@
-import asyncio
 import json
-import random
 import time
 import uuid
 from datetime import datetime, timezone
 from typing import Any
 
-from fastapi import HTTPException, Request
-from starlette.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from ..tenancy import state
 from ..core.config import global_settings
-from ..core.constants import ADMIN_PREFIX, GLOBAL_HEALTH_PATH, STATIC_PREFIX, TENANT_PREFIX
+from ..core.constants import ADMIN_PREFIX, GLOBAL_HEALTH_PATH, METRICS_PATH, STATIC_PREFIX, TENANT_PREFIX
 from ..db.context import DB_IDENTITY_CTX, REQUEST_ID_CTX
-from ..db.log_store import insert_api_log
+from ..db.log_sampling import PendingRequestLogs, begin_request, end_request, keep_request
+from ..db.log_store import submit_api_log
+from ..utils.redaction import looks_like_json, redact_json_prefix, redact_object
+from ..utils.server_timing import PHASE_TIMER_CTX, PhaseTimer
+from ..utils.tracing import Span, finish_trace, start_trace
+from .metrics import _route_label
 
 # Endpoints where request/response bodies are not worth storing (e.g. they
 # return log data itself, static content, or trivial health payloads).
 # Metadata (method, path, status, duration, user, IP) is still logged.
-_SKIP_BODY_PREFIXES = ("/logs", "/health", "/favicon.ico", "/docs", "/openapi.json")
+_SKIP_BODY_PREFIXES = ("/logs", "/health", "/metrics", "/favicon.ico", "/docs", "/openapi.json")
 _SKIP_BODY_CONTENT_TYPES = ("multipart/form-data", "application/octet-stream")
 _CAPTURE_FULL_BODY_STATUS_CODES = {400, 401, 403, 404, 409, 422, 429, 500, 502, 503, 504}
-_REDACTED = "***REDACTED***"
-_SENSITIVE_FIELD_MARKERS = (
-    "password",
-    "passwd",
-    "pwd",
-    "secret",
-    "token",
-    "authorization",
-    "api_key",
-    "apikey",
-    "keycloak",
-    "db_password",
-    "client_secret",
-)
-
 # When LOG_HTTP_BODY_CAPTURE is enabled but LOG_DB_MAX_BODY_BYTES=0, apply this cap (bytes).
 _DEFAULT_SAFE_BODY_CAP = 2048
 
@@ -69,36 +58,28 @@ def _filter_headers(headers: dict) -> dict:
     return {key: value for key, value in headers.items() if key in LOG_HEADER_ALLOWLIST}
 
 
-def _is_sensitive_key(key: str) -> bool:
-    lowered = key.lower()
-    return any(marker in lowered for marker in _SENSITIVE_FIELD_MARKERS)
-
-
-def _redact_object(value: Any) -> Any:
-    if isinstance(value, dict):
-        redacted: dict[str, Any] = {}
-        for key, item in value.items():
-            if _is_sensitive_key(str(key)):
-                redacted[key] = _REDACTED
-            else:
-                redacted[key] = _redact_object(item)
-        return redacted
-    if isinstance(value, list):
-        return [_redact_object(item) for item in value]
-    return value
-
-
-def _sanitize_body_text(body_bytes: bytes | None) -> str | None:
+def _sanitize_body_text(body_bytes: bytes | None, truncated: bool = False) -> str | None:
+    """Redacted, capped text of a captured body; cost is bounded by the cap, not the body size."""
     if not body_bytes:
         return None
-    body_text = body_bytes.decode("utf-8", errors="replace")
-    try:
-        parsed = json.loads(body_text)
-    except (TypeError, ValueError):
-        return _truncate_body(body_text.encode("utf-8", errors="replace")).decode("utf-8", errors="replace")
-    redacted = _redact_object(parsed)
-    sanitized = json.dumps(redacted, ensure_ascii=False, separators=(",", ":"))
-    return _truncate_body(sanitized.encode("utf-8", errors="replace")).decode("utf-8", errors="replace")
+    cap = _effective_body_byte_cap()
+    if not truncated and len(body_bytes) <= cap:
+        # Small complete body: a full parse is cheap and normalizes the stored JSON.
+        try:
+            parsed = json.loads(body_bytes)
+        except (TypeError, ValueError):
+            return body_bytes.decode("utf-8", errors="replace")
+        sanitized = json.dumps(redact_object(parsed), ensure_ascii=False, separators=(",", ":"))
+        return _truncate_body(sanitized.encode("utf-8")).decode("utf-8", errors="replace")
+    body_text = body_bytes[: cap * 2].decode("utf-8", errors="replace")
+    cut = truncated or len(body_bytes) > cap * 2
+    if looks_like_json(body_text):
+        body_text, redaction_cut = redact_json_prefix(body_text, cap)
+        cut = cut or redaction_cut
+    elif len(body_text.encode("utf-8")) > cap:
+        body_text = body_text.encode("utf-8")[:cap].decode("utf-8", errors="ignore")
+        cut = True
+    return body_text + "...[truncated]" if cut else body_text
 
 
 def _should_capture_body_for_status(status_code: int) -> bool:
@@ -110,18 +91,75 @@ def _should_skip_content_type(request: Request) -> bool:
     return any(marker in content_type for marker in _SKIP_BODY_CONTENT_TYPES)
 
 
-async def _resolve_api_logger(request: Request):
+class _BodyTee:
+    """Keeps the first `cap` bytes of a streamed body and counts the total."""
+
+    __slots__ = ("cap", "chunks", "kept", "total")
+
+    def __init__(self, cap: int):
+        self.cap = cap
+        self.chunks: list[bytes] = []
+        self.kept = 0
+        self.total = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        if self.kept < self.cap and chunk:
+            part = chunk[: self.cap - self.kept]
+            self.chunks.append(part)
+            self.kept += len(part)
+
+    @property
+    def data(self) -> bytes | None:
+        return b"".join(self.chunks) or None
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > self.kept
+
+
+def _server_timing_enabled(request: Request) -> bool:
+    tenant = getattr(request.state, "tenant", None)
+    return tenant is not None and tenant.settings.server_timing
+
+
+def _start_request_trace(request: Request, request_id: uuid.UUID) -> Span | None:
+    return start_trace(
+        request.method,
+        request_id=request_id,
+        traceparent=request.headers.get("traceparent"),
+        attributes={"http.request.method": request.method, "url.path": request.url.path, "request_id": str(request_id)},
+    )
+
+
+def _finish_request_trace(root: Span | None, request: Request, status_code: int, error: Exception | None) -> None:
+    """Name the root span after the matched route template and end the trace (kept on 5xx/errors)."""
+    if root is None:
+        return
+    route = _route_label(request.scope)
+    if route != "unmatched":
+        root.name = f"{request.method} {route}"
+        root.set("http.route", route)
+    root.set("http.response.status_code", status_code)
+    tenant = getattr(request.state, "tenant", None)
+    if tenant is not None:
+        root.set("tenant", tenant.id)
+    if error is not None or status_code >= 500:
+        root.fail(str(error) if error is not None else f"HTTP {status_code}")
+    finish_trace(root)
+
+
+def _resolve_api_logger(request: Request):
     """Return the appropriate file logger: tenant logger when present, else global."""
     tenant = getattr(request.state, "tenant", None)
     if tenant is not None:
-        await tenant.ensure_logger_fresh()
         return tenant.api_logger
     return state.global_logger
 
 
 def _is_global_path(path: str) -> bool:
     """Paths that must not write tenant-scoped rows to the API log DB."""
-    if path == "/" or _path_starts(path, GLOBAL_HEALTH_PATH) or _path_starts(path, STATIC_PREFIX):
+    if path in ("/", METRICS_PATH) or _path_starts(path, GLOBAL_HEALTH_PATH) or _path_starts(path, STATIC_PREFIX):
         return True
     if _path_starts(path, ADMIN_PREFIX):
         return True
@@ -166,14 +204,6 @@ def _get_body_size(request: Request) -> int | None:
     return None
 
 
-def _coerce_body_bytes(body) -> bytes | None:
-    if body is None:
-        return None
-    if isinstance(body, (bytes, bytearray)):
-        return bytes(body)
-    return str(body).encode()
-
-
 def _truncate_body(body_bytes: bytes) -> bytes:
     cap = _effective_body_byte_cap()
     if len(body_bytes) > cap:
@@ -187,68 +217,27 @@ def _body_to_text(body_bytes: bytes | None) -> str | None:
     return _truncate_body(body_bytes).decode("utf-8", errors="replace")
 
 
-def _get_response_size(response_body: bytes | None) -> int | None:
-    if not response_body:
-        return None
-    try:
-        return len(response_body)
-    except TypeError:
-        return None
-
-
-async def _capture_response_body(response):
-    if response is None:
-        return None, None
-    body = getattr(response, "body", None)
-    if body is not None:
-        return response, _coerce_body_bytes(body)
-    body_iterator = getattr(response, "body_iterator", None)
-    if body_iterator is None:
-        return response, None
-
-    chunks: list[bytes] = []
-    async for chunk in body_iterator:
-        if isinstance(chunk, (bytes, bytearray)):
-            chunks.append(bytes(chunk))
-        else:
-            chunks.append(str(chunk).encode())
-    body_bytes = b"".join(chunks)
-    headers = dict(response.headers)
-    headers.pop("content-length", None)
-    new_response = Response(
-        content=body_bytes,
-        status_code=response.status_code,
-        headers=headers,
-        media_type=response.media_type,
-        background=response.background,
-    )
-    return new_response, body_bytes
-
-
 def _build_log_record(
     request: Request,
-    response,
-    response_body: bytes | None,
+    response_headers: dict | None,
     request_id: uuid.UUID,
     status_code: int,
     duration_ms: int,
     error: Exception | None,
-    request_body: bytes,
+    request_body: _BodyTee,
+    response_body: _BodyTee,
     *,
     capture_bodies: bool,
-    skip_body_path: bool = False,
+    timings: dict | None = None,
 ):
     request_headers = _filter_headers({key.lower(): value for key, value in request.headers.items()})
-    response_headers = None
     response_body_text = None
     request_body_text = None
-    if response is not None:
-        response_headers = _filter_headers({key.lower(): value for key, value in response.headers.items()})
-        if capture_bodies and not skip_body_path:
-            response_body_text = _sanitize_body_text(response_body)
-    if capture_bodies and not skip_body_path:
-        request_body_text = _sanitize_body_text(request_body)
-    query_params = _redact_object(dict(request.query_params))
+    if capture_bodies:
+        request_body_text = _sanitize_body_text(request_body.data, request_body.truncated)
+        if response_headers is not None:
+            response_body_text = _sanitize_body_text(response_body.data, response_body.truncated)
+    query_params = redact_object(dict(request.query_params))
 
     return {
         "ts": datetime.now(timezone.utc),
@@ -260,85 +249,147 @@ def _build_log_record(
         "request_id": request_id,
         "client_ip": _get_client_ip(request),
         "query_params": query_params,
-        "body_size": _get_body_size(request),
-        "response_size": _get_response_size(response_body),
+        "body_size": _get_body_size(request) or request_body.total or None,
+        "response_size": response_body.total or None,
         "request_headers": request_headers,
         "request_body": request_body_text,
-        "response_headers": response_headers,
+        "response_headers": _filter_headers(response_headers) if response_headers is not None else None,
         "response_body": response_body_text,
+        "timings": timings,
         "error": str(error) if error else None,
     }
 
 
-def _should_log_db() -> bool:
-    if not global_settings.log_db_enabled or global_settings.log_db_sample_rate <= 0.0:
-        return False
-    return global_settings.log_db_sample_rate >= 1.0 or random.random() <= global_settings.log_db_sample_rate
-
-
-async def request_logging_middleware(request: Request, call_next):
-    start = time.monotonic()
-    request_id = uuid.uuid4()
-    request.state.request_id = request_id
-    token = REQUEST_ID_CTX.set(request_id)
-    DB_IDENTITY_CTX.set(None)
-    request_body = await request.body()
-
-    response = None
-    response_body = None
-    status_code = 500
-    error = None
-    try:
-        response = await call_next(request)
-        status_code = response.status_code
-    except HTTPException as exc:
-        status_code = exc.status_code
-        error = exc
-        raise
-    except Exception as exc:  # noqa: BLE001
-        status_code = 500
-        error = exc
-        raise
-    finally:
-        REQUEST_ID_CTX.reset(token)
-        DB_IDENTITY_CTX.set(None)
-        duration_ms = int((time.monotonic() - start) * 1000)
+class RequestLoggingMiddleware:
+    """
+    Pure ASGI request/response logger.
+
+    Tees the receive and send streams instead of buffering them: only the first
+    `LOG_DB_MAX_BODY_BYTES` of each body are kept (and only when body capture may
+    apply to the request), and every response chunk is forwarded as soon as the
+    app sends it, so uploads and streaming responses are never held in memory.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        request = Request(scope)
         path = request.url.path
+        request_id = uuid.uuid4()
+        request.state.request_id = request_id
+        token = REQUEST_ID_CTX.set(request_id)
+        DB_IDENTITY_CTX.set(None)
+        timer = PhaseTimer()
+        timer_token = PHASE_TIMER_CTX.set(timer)
+        begin_request(request_id)
+        root_span = _start_request_trace(request, request_id)
+
         skip_body_path = any(prefix in path for prefix in _SKIP_BODY_PREFIXES)
-        capture_bodies = (
-            global_settings.log_http_body_capture
-            and not skip_body_path
-            and not _should_skip_content_type(request)
-            and _should_capture_body_for_status(status_code)
+        may_capture = (
+            global_settings.log_http_body_capture and not skip_body_path and not _should_skip_content_type(request)
         )
-        if capture_bodies:
-            response, response_body = await _capture_response_body(response)
-        else:
-            response_body = None
+        cap = _effective_body_byte_cap() if may_capture else 0
+        request_body = _BodyTee(cap)
+        response_body = _BodyTee(0)
+        response: dict[str, Any] = {"status": 500, "headers": None}
+
+        async def receive_tee() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.feed(message.get("body", b""))
+            return message
+
+        async def send_tee(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = str(request_id)
+                if _server_timing_enabled(request):
+                    headers.append("Server-Timing", timer.header(time.monotonic() - start))
+                response["headers"] = {key.lower(): value for key, value in headers.items()}
+                if may_capture and _should_capture_body_for_status(message["status"]):
+                    response_body.cap = cap
+            elif message["type"] == "http.response.body":
+                response_body.feed(message.get("body", b""))
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive_tee, send_tee)
+        except Exception as exc:  # noqa: BLE001
+            error = exc
+            raise
+        finally:
+            REQUEST_ID_CTX.reset(token)
+            PHASE_TIMER_CTX.reset(timer_token)
+            DB_IDENTITY_CTX.set(None)
+            pending = end_request(request_id)
+            try:
+                # Still inside the trace: a direct audit insert becomes one of its spans.
+                await self._log(
+                    request,
+                    request_id,
+                    start,
+                    response,
+                    request_body,
+                    response_body,
+                    error,
+                    may_capture,
+                    pending,
+                    timer,
+                )
+            finally:
+                _finish_request_trace(root_span, request, response["status"], error)
+
+    @staticmethod
+    async def _log(
+        request, request_id, start, response, request_body, response_body, error, may_capture, pending, timer
+    ) -> None:
+        status_code = response["status"]
+        elapsed = time.monotonic() - start
         log_record = _build_log_record(
             request=request,
-            response=response,
-            response_body=response_body,
+            response_headers=response["headers"],
             request_id=request_id,
             status_code=status_code,
-            duration_ms=duration_ms,
+            duration_ms=int(elapsed * 1000),
             error=error,
             request_body=request_body,
-            capture_bodies=capture_bodies,
-            skip_body_path=skip_body_path,
+            response_body=response_body,
+            capture_bodies=may_capture and _should_capture_body_for_status(status_code),
+            timings=timer.as_ms(elapsed),
         )
 
-        api_logger = await _resolve_api_logger(request)
+        api_logger = _resolve_api_logger(request)
         if api_logger is not None:
             api_logger.info(json.dumps(log_record, default=str))
 
-        # DB API log: only for tenant-scoped requests. Global endpoints
-        # (admin, health, static) skip DB logging.
-        tenant = getattr(request.state, "tenant", None)
-        if tenant is not None and not _is_global_path(path) and _should_log_db():
-            asyncio.create_task(insert_api_log(tenant.db_manager, log_record))
+        _submit_sampled(request, log_record, pending)
 
-        if response is not None:
-            response.headers["X-Request-ID"] = str(request_id)
 
-    return response
+def _submit_sampled(request: Request, log_record: dict, pending: PendingRequestLogs) -> None:
+    """
+    DB API log, sampled after the response. Only tenant-scoped requests are
+    sampled and get an ``http_logs`` row (global endpoints: admin, health,
+    static); the procedure records they held follow the same decision.
+    """
+    tenant = getattr(request.state, "tenant", None)
+    if tenant is None or _is_global_path(request.url.path):
+        pending.flush()
+        return
+    keep = keep_request(
+        log_record["status"],
+        log_record["duration_ms"],
+        log_record["endpoint"],
+        error=log_record["error"] is not None,
+        failed=pending.failed,
+    )
+    if keep:
+        submit_api_log(tenant.db_manager.log_db, log_record)
+        pending.flush()
@@ -110,6 +110,12 @@ class PoolStatus(BaseModel):
     healthy: bool = False
 
 
+class RoutingCacheInvalidateOut(BaseModel):
+    tenant: str
+    point_sets: int
+    matrices: int
+
+
 class TenantOut(BaseModel):
     id: str
     api: dict[str, bool]
@@ -251,6 +257,15 @@ def build_tenant_settings_from_input(
         db_pool_max_waiting=db.pool_max_waiting,
         db_pool_max_idle=db.pool_max_idle,
         db_connect_timeout=db.connect_timeout,
+        # Not part of the admin payload yet; keep whatever the tenant file had.
+        routing_backend=existing.routing_backend if existing else "valhalla",
+        routing_fallback_local=existing.routing_fallback_local if existing else False,
+        routing_matrix_cache=existing.routing_matrix_cache if existing else False,
+        log_database_url=existing.log_database_url if existing else None,
+        log_retention_http_days=existing.log_retention_http_days if existing else 0,
+        log_retention_db_days=existing.log_retention_db_days if existing else 0,
+        log_archive_format=existing.log_archive_format if existing else "none",
+        server_timing=existing.server_timing if existing else False,
         auth_mode=auth_mode,
         auth_basic_bootstrap_user=bootstrap_user,
         auth_basic_bootstrap_password=bootstrap_password,
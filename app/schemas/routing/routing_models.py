@@ -10,7 +10,7 @@ from pydantic_geojson import FeatureCollectionModel
 from typing import Optional, List, Dict, Literal, Tuple, Union
 from typing_extensions import Self
 from ..common import BaseAPIResponse, Body, Data
-from pyproj import Transformer
+from ...utils.geo import WGS84_EPSG, get_transformer, transform_points
 
 
 class Location(BaseModel):
@@ -39,8 +39,7 @@ class Location(BaseModel):
         Returns:
             Tuple of (x, y) coordinates in the target EPSG system
         """
-        transformer = Transformer.from_crs(from_epsg, to_epsg, always_xy=True)
-        return transformer.transform(x, y)
+        return get_transformer(from_epsg, to_epsg).transform(x, y)
 
     @model_validator(mode="after")
     def validate_coordinates(self) -> Self:
@@ -76,6 +75,16 @@ class OptimalPathParams(BaseModel):
         "kilometers", title="Units", description="Units for distance measurements", examples=["kilometers"]
     )
 
+    def valhalla_locations(self) -> List[Dict[str, float]]:
+        """Locations as Valhalla ``{"lon", "lat"}`` dicts, reprojected in one batch per EPSG code"""
+        lons, lats = transform_points(
+            [loc.x for loc in self.locations],
+            [loc.y for loc in self.locations],
+            [loc.epsg for loc in self.locations],
+            WGS84_EPSG,
+        )
+        return [{"lon": float(lon), "lat": float(lat)} for lon, lat in zip(lons, lats, strict=True)]
+
 
 class ObjectFeature(BaseModel):
     """Get object parameter order feature"""
@@ -180,11 +189,22 @@ class Maneuver(BaseModel):
     lanes: Optional[List[dict]] = Field(None, description="Lanes")
 
 
+class EncodedLeg(BaseModel):
+    """Route leg with its geometry as an encoded polyline (precision 6)"""
+
+    shape: str = Field(..., description="Encoded polyline shape (precision 6, lat/lon order as in Valhalla)")
+    distance: Optional[float] = Field(None, description="Distance")
+    duration: Optional[float] = Field(None, description="Duration")
+    fromIndex: Optional[int] = Field(None, description="Index of the origin location")
+    toIndex: Optional[int] = Field(None, description="Index of the destination location")
+
+
 class GetObjectOptimalPathOrderData(Data):
     """Get object optimal path order data"""
 
     fields: None = Field(None, description="Fields")
     path: Optional[FeatureCollectionModel] = Field(None, description="Path")
+    legs: Optional[List[EncodedLeg]] = Field(None, description="Legs with encoded geometry (geometryFormat=polyline6)")
     distance: Optional[float] = Field(None, description="Distance")
     duration: Optional[float] = Field(None, description="Duration")
     maneuvers: Optional[List[Maneuver]] = Field(None, description="Maneuvers")
@@ -0,0 +1,230 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Replay of captured traffic (`gwapi.http_logs`) against a target instance (`giswater-api bench replay`).
+
+Requests are sent in their original order at real speed, scaled by a factor, or
+as fast as `concurrency` allows, and the report compares replay latencies and
+status codes with the logged `duration_ms` / `status`. Only safe methods are
+replayed unless writes are explicitly allowed, and a write is only sent when
+its full, unredacted body was captured.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+from app.utils.redaction import REDACTED
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Logged headers that describe the original connection rather than the request.
+_DROPPED_HEADERS = {"content-length", "x-forwarded-for", "x-real-ip", "x-request-id"}
+_TRUNCATED_MARKER = "...[truncated]"
+REPORT_ENDPOINTS = 20
+
+
+@dataclass(frozen=True)
+class ReplayRequest:
+    ts: datetime
+    method: str
+    endpoint: str
+    params: dict
+    headers: dict
+    content: str | None
+    status: int
+    duration_ms: int | None
+
+
+@dataclass(frozen=True)
+class ReplayResult:
+    request: ReplayRequest
+    status: int | None
+    duration_ms: float
+
+
+def parse_speed(value: str) -> float | None:
+    """``real`` (1.0), ``max`` (None: no pacing) or a positive factor such as ``2`` (twice as fast)."""
+    if value == "real":
+        return 1.0
+    if value == "max":
+        return None
+    try:
+        speed = float(value)
+    except ValueError:
+        speed = 0.0
+    if speed <= 0:
+        raise ValueError(f"Invalid speed '{value}'; expected 'real', 'max' or a positive factor")
+    return speed
+
+
+def _skip_reason(row: dict, include_writes: bool) -> str | None:
+    if row["method"] in SAFE_METHODS:
+        return None
+    if not include_writes:
+        return "write_method"
+    body = row.get("request_body")
+    if row.get("body_size") and body is None:
+        return "body_not_captured"
+    if body is not None and (body.endswith(_TRUNCATED_MARKER) or REDACTED in body):
+        return "body_incomplete"
+    return None
+
+
+def build_replay_request(row: dict, include_writes: bool = False) -> ReplayRequest | str:
+    """The request to send for one logged row, or the reason it cannot be replayed."""
+    reason = _skip_reason(row, include_writes)
+    if reason is not None:
+        return reason
+    params = row.get("query_params") or {}
+    if any(value == REDACTED for value in params.values()):
+        return "redacted_params"
+    headers = {
+        key: value for key, value in (row.get("request_headers") or {}).items() if key.lower() not in _DROPPED_HEADERS
+    }
+    return ReplayRequest(
+        ts=row["ts"],
+        method=row["method"],
+        endpoint=row["endpoint"],
+        params=params,
+        headers=headers,
+        content=row.get("request_body") if row["method"] not in SAFE_METHODS else None,
+        status=row["status"],
+        duration_ms=row.get("duration_ms"),
+    )
+
+
+def _latency_summary(values: list[float]) -> dict | None:
+    if not values:
+        return None
+    p50, p90, p99 = np.percentile(np.asarray(values, dtype=float), [50, 90, 99])
+    return {
+        "p50": round(float(p50), 1),
+        "p90": round(float(p90), 1),
+        "p99": round(float(p99), 1),
+        "max": round(float(max(values)), 1),
+        "avg": round(float(np.mean(values)), 1),
+    }
+
+
+def _status_class(status: int | None) -> str:
+    return "transport_error" if status is None else f"{status // 100}xx"
+
+
+def _endpoint_report(results: list[ReplayResult]) -> list[dict]:
+    by_endpoint: dict[str, list[ReplayResult]] = defaultdict(list)
+    for result in results:
+        by_endpoint[result.request.endpoint].append(result)
+    report = []
+    for endpoint, items in sorted(by_endpoint.items(), key=lambda item: -len(item[1]))[:REPORT_ENDPOINTS]:
+        replay = _latency_summary([r.duration_ms for r in items])
+        original = _latency_summary([r.request.duration_ms for r in items if r.request.duration_ms is not None])
+        report.append(
+            {
+                "endpoint": endpoint,
+                "count": len(items),
+                "errors": sum(1 for r in items if r.status is None or r.status >= 500),
+                "replay_ms": replay,
+                "original_ms": original,
+                "p99_ratio": round(replay["p99"] / original["p99"], 2) if original and original["p99"] else None,
+            }
+        )
+    return report
+
+
+def build_report(results: list[ReplayResult], skipped: Counter, wall_seconds: float, max_lag_ms: float) -> dict:
+    """Latency percentiles, status mix and error rate of the replay next to the logged originals."""
+    statuses = Counter(_status_class(r.status) for r in results)
+    errors = statuses["5xx"] + statuses["transport_error"]
+    return {
+        "replayed": len(results),
+        "skipped": dict(skipped),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(results) / wall_seconds, 1) if wall_seconds > 0 else None,
+        "max_lag_ms": round(max_lag_ms, 1),
+        "status": dict(statuses),
+        "error_rate": round(errors / len(results), 4) if results else None,
+        "status_mismatches": sum(1 for r in results if _status_class(r.status) != _status_class(r.request.status)),
+        "latency_ms": {
+            "replay": _latency_summary([r.duration_ms for r in results]),
+            "original": _latency_summary([r.request.duration_ms for r in results if r.request.duration_ms is not None]),
+        },
+        "endpoints": _endpoint_report(results),
+    }
+
+
+async def _send(client: httpx.AsyncClient, request: ReplayRequest) -> ReplayResult:
+    start = time.monotonic()
+    try:
+        response = await client.request(
+            request.method, request.endpoint, params=request.params, headers=request.headers, content=request.content
+        )
+        status: int | None = response.status_code
+    except httpx.HTTPError:
+        status = None
+    return ReplayResult(request, status, (time.monotonic() - start) * 1000)
+
+
+async def replay_requests(
+    rows: list[dict],
+    *,
+    target: str,
+    speed: float | None = 1.0,
+    concurrency: int = 10,
+    headers: dict | None = None,
+    timeout: float = 30.0,
+    include_writes: bool = False,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict:
+    """
+    Send logged requests to `target` and report on them.
+
+    With a `speed`, request *i* is sent ``(ts_i - ts_0) / speed`` seconds after the
+    start; ``None`` sends them back to back. At most `concurrency` requests are in
+    flight; ``max_lag_ms`` reports how far sending fell behind the schedule.
+    """
+    plan: list[ReplayRequest] = []
+    skipped: Counter[str] = Counter()
+    for row in rows:
+        request = build_replay_request(row, include_writes)
+        if isinstance(request, str):
+            skipped[request] += 1
+        else:
+            plan.append(request)
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    results: list[ReplayResult] = []
+    max_lag = 0.0
+
+    async def run(client: httpx.AsyncClient, request: ReplayRequest) -> None:
+        try:
+            results.append(await _send(client, request))
+        finally:
+            semaphore.release()
+
+    async with httpx.AsyncClient(
+        base_url=target, headers=headers, timeout=timeout, transport=transport, follow_redirects=False
+    ) as client:
+        start = time.monotonic()
+        tasks = []
+        for request in plan:
+            due = (request.ts - plan[0].ts).total_seconds() / speed if speed else 0.0
+            delay = due - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await semaphore.acquire()
+            max_lag = max(max_lag, time.monotonic() - start - due)
+            tasks.append(asyncio.create_task(run(client, request)))
+        await asyncio.gather(*tasks)
+        wall_seconds = time.monotonic() - start
+
+    return build_report(results, skipped, wall_seconds, max_lag * 1000)
@@ -0,0 +1,221 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Pluggable routing backends behind `RoutingService`.
+
+Every backend takes the Valhalla ``optimized_route`` request dict
+(``locations`` as ``{"lon", "lat"}``, ``costing``, ``units``, ``language``) and
+returns a Valhalla-shaped response, so GeoJSON/maneuver/summary handling in the
+service is backend-agnostic.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Protocol
+
+import requests
+
+from app.core.config import TenantSettings, global_settings
+from app.core.exceptions import RoutingProviderError
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.routing import get_valhalla_matrix, get_valhalla_optimized_route, get_valhalla_route
+from app.utils.routing_chunks import plan_chunks, stitch_trips
+from app.utils.routing_matrix import MatrixScope, assemble_cost, matrix_cache, matrix_from_rows, points_fingerprint
+from app.utils.routing_solver import solve_optimized_route, solve_path_order
+from app.utils.tracing import SPAN_KIND_CLIENT, span
+
+logger = logging.getLogger(__name__)
+
+valhalla_circuit = CircuitBreaker(
+    "valhalla",
+    failure_threshold=global_settings.routing_circuit_failure_threshold,
+    reset_seconds=global_settings.routing_circuit_reset_seconds,
+)
+
+
+class RoutingBackend(Protocol):
+    name: str
+
+    async def optimized_route(self, params: dict) -> dict: ...
+
+
+class ValhallaBackend:
+    """Remote Valhalla `optimized_route` (blocking HTTP runs in a worker thread)."""
+
+    name = "valhalla"
+
+    def __init__(self, circuit: CircuitBreaker = valhalla_circuit):
+        self.circuit = circuit
+
+    async def optimized_route(self, params: dict) -> dict:
+        return await self._request(get_valhalla_optimized_route, params)
+
+    async def matrix_optimized_route(self, params: dict, scope: MatrixScope) -> dict:
+        """
+        Order with the local solver over Valhalla road costs, then fetch geometry with ``/route``.
+
+        The network-to-network matrix comes from `matrix_cache` (recomputed when the
+        point set changes); only the start row and end column are requested per call.
+        """
+        locations = params["locations"]
+        start, network, end = locations[0], locations[1:-1], locations[-1]
+        common = {"costing": params.get("costing", "auto"), "units": params.get("units", "kilometers")}
+        fingerprint = points_fingerprint(network)
+        network_matrix = matrix_cache.get(scope, fingerprint)
+        pending = [
+            self._request(get_valhalla_matrix, {**common, "sources": [start], "targets": [*network, end]}),
+            self._request(get_valhalla_matrix, {**common, "sources": network, "targets": [end]}),
+        ]
+        if network_matrix is None:
+            pending.append(self._request(get_valhalla_matrix, {**common, "sources": network, "targets": network}))
+        results = await asyncio.gather(*pending)
+        start_row = matrix_from_rows(results[0]["sources_to_targets"])[0]
+        end_col = matrix_from_rows(results[1]["sources_to_targets"])[:, 0]
+        if network_matrix is None:
+            network_matrix = matrix_from_rows(results[2]["sources_to_targets"])
+            matrix_cache.set(scope, fingerprint, network_matrix)
+
+        cost = assemble_cost(network_matrix, start_row, end_col)
+        order = await asyncio.to_thread(
+            solve_path_order, cost, time_budget_seconds=global_settings.routing_local_time_budget
+        )
+        route_params = {**params, "locations": [{**locations[i], "type": "break"} for i in order]}
+        response = await self._request(get_valhalla_route, route_params)
+        trip_locations = (response.get("trip") or {}).get("locations") or []
+        for location, original_index in zip(trip_locations, order, strict=False):
+            location["original_index"] = original_index
+        return response
+
+    async def _request(self, fetch, params: dict) -> dict:
+        # The worker thread inherits the span, so the Valhalla session sends its traceparent.
+        with span(f"valhalla {getattr(fetch, '__name__', 'request')}", kind=SPAN_KIND_CLIENT):
+            return await self._fetch(fetch, params)
+
+    async def _fetch(self, fetch, params: dict) -> dict:
+        try:
+            response, _payload = await asyncio.to_thread(fetch, params)
+        except requests.RequestException as exc:
+            self.circuit.record_failure()
+            raise RoutingProviderError(f"Routing provider unavailable: {exc}") from exc
+        except Exception:
+            self.circuit.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (e.g. client disconnect): no outcome, but a half-open probe must not stay claimed.
+            self.circuit.release_probe()
+            raise
+        if isinstance(response, dict):
+            self.circuit.record_success()
+            return response
+        status_code = getattr(response, "status_code", None)
+        if status_code is not None and 400 <= status_code < 500 and status_code != 429:
+            # The provider answered; the request itself was rejected (e.g. no path found).
+            self.circuit.record_success()
+            raise RuntimeError("Invalid response from Valhalla API")
+        self.circuit.record_failure()
+        raise RoutingProviderError(f"Routing provider unavailable: HTTP {status_code}")
+
+
+class LocalBackend:
+    """Offline straight-line solver (`app/utils/routing_solver.py`)."""
+
+    name = "local"
+
+    async def optimized_route(self, params: dict) -> dict:
+        locations = params["locations"]
+        lons = [loc["lon"] for loc in locations]
+        lats = [loc["lat"] for loc in locations]
+        return await asyncio.to_thread(
+            solve_optimized_route,
+            lons,
+            lats,
+            costing=params.get("costing", "auto"),
+            units=params.get("units", "kilometers"),
+            language=params.get("language", "en-US"),
+            time_budget_seconds=global_settings.routing_local_time_budget,
+        )
+
+
+_BACKENDS: dict[str, RoutingBackend] = {
+    ValhallaBackend.name: ValhallaBackend(),
+    LocalBackend.name: LocalBackend(),
+}
+
+
+def get_routing_backend(name: str) -> RoutingBackend:
+    try:
+        return _BACKENDS[name]
+    except KeyError as exc:
+        raise ValueError(f"Unknown routing backend '{name}'") from exc
+
+
+async def optimized_route(
+    settings: TenantSettings, params: dict, *, scope: MatrixScope | None = None
+) -> tuple[dict, str]:
+    """Solve with the tenant's backend; fall back to the local solver when Valhalla is down.
+
+    With ``ROUTING_MATRIX_CACHE`` and a ``scope`` (tenant, schema, mapzone, object type,
+    costing), Valhalla is used through the cached cost matrix instead of ``optimized_route``.
+    Requests over ``ROUTING_CHUNK_SIZE`` network points are split into spatial chunks
+    solved concurrently (Valhalla limits the locations per request).
+    Returns ``(valhalla_shaped_response, backend_name)``.
+    """
+    chunk_size = global_settings.routing_chunk_size
+    if settings.routing_backend == ValhallaBackend.name and 0 < chunk_size < len(params["locations"]) - 2:
+        return await _chunked_optimized_route(settings, params, chunk_size, scope)
+    return await _optimized_route(settings, params, scope=scope)
+
+
+async def _chunked_optimized_route(
+    settings: TenantSettings, params: dict, chunk_size: int, scope: MatrixScope | None
+) -> tuple[dict, str]:
+    locations = params["locations"]
+    chunks = await asyncio.to_thread(
+        plan_chunks, [loc["lon"] for loc in locations], [loc["lat"] for loc in locations], chunk_size
+    )
+    semaphore = asyncio.Semaphore(max(global_settings.routing_chunk_concurrency, 1))
+
+    async def solve(chunk: list[int]) -> tuple[dict, str]:
+        chunk_locations = [locations[i] for i in chunk]
+        # Each chunk caches its own network matrix, keyed by its points (not its position,
+        # which depends on the request's initial and final points).
+        chunk_scope = (*scope, points_fingerprint(chunk_locations[1:-1])) if scope is not None else None
+        async with semaphore:
+            return await _optimized_route(settings, {**params, "locations": chunk_locations}, scope=chunk_scope)
+
+    results = await asyncio.gather(*(solve(chunk) for chunk in chunks))
+    backends = {backend for _response, backend in results}
+    logger.info("Solved %s locations in %s chunks (%s)", len(locations), len(chunks), ", ".join(sorted(backends)))
+    backend = settings.routing_backend if backends == {settings.routing_backend} else LocalBackend.name
+    return stitch_trips([response for response, _backend in results], chunks), backend
+
+
+async def _optimized_route(
+    settings: TenantSettings, params: dict, *, scope: MatrixScope | None = None
+) -> tuple[dict, str]:
+    primary = get_routing_backend(settings.routing_backend)
+    local = _BACKENDS[LocalBackend.name]
+    if primary.name == local.name:
+        return await local.optimized_route(params), local.name
+
+    if not valhalla_circuit.allow_request():
+        if settings.routing_fallback_local:
+            logger.info("Valhalla circuit open; using local routing solver")
+            return await local.optimized_route(params), local.name
+        raise RoutingProviderError("Routing provider unavailable: circuit open")
+
+    try:
+        use_matrix = scope is not None and settings.routing_matrix_cache and len(params["locations"]) > 3
+        if use_matrix and isinstance(primary, ValhallaBackend):
+            return await primary.matrix_optimized_route(params, scope), primary.name
+        return await primary.optimized_route(params), primary.name
+    except RoutingProviderError as exc:
+        if not settings.routing_fallback_local:
+            raise
+        logger.warning("Valhalla failed (%s); using local routing solver", exc)
+        return await local.optimized_route(params), local.name
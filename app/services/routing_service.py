@@ -7,23 +7,28 @@ or (at your option) any later version.
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from typing import Literal, Optional
 
-import requests
 from pydantic import ValidationError
 
+from app.core.config import global_settings
+from app.core.exceptions import DatabaseUnavailableError, ProcedureError
 from app.schemas.routing.routing_models import Location, OptimalPathParams
 from app.services.context import ServiceContext
-from app.services.procedure import run_procedure
+from app.services.procedure import run_procedure, run_procedure_raw
+from app.services.routing_backends import optimized_route
 from app.utils.body import create_body_dict
 from app.utils.routing import (
+    get_encoded_legs,
     get_geojson_from_optimized_route,
     get_maneuvers,
     get_network_points,
-    get_valhalla_optimized_route,
 )
+from app.utils.network_points import NetworkPointSet, changes_signature, network_point_cache
+from app.utils.routing_cache import route_cache, route_cache_key
 
 
 class RoutingService:
@@ -40,6 +45,7 @@ class RoutingService:
         transport_mode: Literal["auto", "pedestrian", "bicycle"],
         units: Literal["miles", "kilometers"],
         language: str,
+        geometry_format: Literal["geojson", "polyline6"] = "geojson",
     ) -> dict:
         try:
             final_point_value = initial_point if final_point is None else final_point
@@ -50,42 +56,36 @@ class RoutingService:
 
             mapzone_type_value = "EXPL" if mapzone_type == "EXPLOITATION" else mapzone_type
 
-            json_result, network_points = await get_network_points(
-                object_type,
-                mapzone_type_value,
-                mapzone_id,
-                self.ctx.logger,
-                self.ctx.db_manager,
-                self.ctx.schema,
-                api_version=self.ctx.api_version,
-            )
+            point_set = await self._network_points(object_type, mapzone_type_value, mapzone_id)
+            json_result = point_set.result
             features = json_result["body"]["data"]["features"]
-            locations_data = [initial, *network_points, final]
-            params = OptimalPathParams(locations=locations_data, costing=transport_mode, units=units)
+            # Only the two ad-hoc endpoints go through the Location model; network points stay array-backed.
+            params = OptimalPathParams(locations=[initial, final], costing=transport_mode, units=units)
+            endpoints = params.valhalla_locations()
             valhalla_params = {
-                "locations": [location.to_dict() for location in locations_data],
+                "locations": [endpoints[0], *point_set.valhalla_locations(), endpoints[1]],
                 "costing": params.costing,
                 "units": params.units,
                 "language": language,
             }
-            valhalla_response, _legs = get_valhalla_optimized_route(valhalla_params)
-            logging.getLogger(__name__).debug(
-                "Valhalla optimized_route response: %s", json.dumps(valhalla_response, default=str)
+            scope = (
+                self.ctx.tenant_id,
+                self.ctx.schema,
+                mapzone_type_value,
+                str(mapzone_id),
+                object_type,
+                params.costing,
             )
-            if not isinstance(valhalla_response, dict):
-                raise RuntimeError("Invalid response from Valhalla API")
-            try:
-                geojson_response = get_geojson_from_optimized_route(valhalla_response.get("trip", {}), params.costing)
-            except (KeyError, TypeError, ValueError):
-                logging.getLogger(__name__).warning("Error creating GeoJSON from optimized route", exc_info=True)
-                geojson_response = {}
+            valhalla_response, backend = await self._cached_optimized_route(valhalla_params, scope)
             trip = valhalla_response.get("trip") or {}
+            geometry = self._route_geometry(trip, params.costing, geometry_format)
             summary = trip.get("summary") or {}
             try:
                 maneuvers = get_maneuvers(valhalla_response)
             except (KeyError, TypeError, IndexError):
                 maneuvers = []
-            version = (json_result.get("version") or {}) if isinstance(json_result, dict) else {}
+            # `json_result` belongs to the cached point set: copy before adding the API version.
+            version = dict(json_result.get("version") or {}) if isinstance(json_result, dict) else {}
             version["api"] = self.ctx.api_version
             return {
                 "status": "Accepted",
@@ -95,19 +95,99 @@ class RoutingService:
                     "data": {
                         "distance": summary.get("length"),
                         "duration": summary.get("time"),
-                        "path": geojson_response,
+                        **geometry,
                         "maneuvers": maneuvers,
                         "features": features,
+                        # "local" when Valhalla was unavailable and the straight-line fallback answered.
+                        "backend": backend,
                     }
                 },
             }
         except json.JSONDecodeError as exc:
             raise ValueError("Invalid JSON format for initialPoint or finalPoint parameter") from exc
-        except requests.RequestException as exc:
-            raise RuntimeError(f"Routing provider unavailable: {exc}") from exc
         except ValidationError as exc:
             raise ValueError(str(exc)) from exc
 
+    async def _network_points(self, object_type: str, mapzone_type: str, mapzone_id: int) -> NetworkPointSet:
+        key = (self.ctx.tenant_id, self.ctx.schema, object_type, mapzone_type, str(mapzone_id))
+        await self._check_feature_changes()
+        point_set = network_point_cache.get(key)
+        if point_set is not None:
+            return point_set
+        point_set = await get_network_points(
+            object_type,
+            mapzone_type,
+            mapzone_id,
+            self.ctx.logger,
+            self.ctx.db_manager,
+            self.ctx.schema,
+            api_version=self.ctx.api_version,
+        )
+        if point_set is None:
+            raise ProcedureError({"status": "Failed", "message": {"level": 2, "text": "No network points found"}})
+        network_point_cache.set(key, point_set)
+        # First fill for the tenant records the change baseline.
+        await self._check_feature_changes()
+        return point_set
+
+    async def _check_feature_changes(self) -> None:
+        """Poll ``gw_fct_featurechanges`` when due; a new change set invalidates the tenant's point sets."""
+        since = network_point_cache.changes_due(self.ctx.tenant_id)
+        if since is None:
+            return
+        results = []
+        for action in ("INSERT", "UPDATE"):
+            body = create_body_dict(
+                device=self.ctx.device,
+                feature={"feature_type": "FEATURE"},
+                extras={"action": action, "lastFeeding": since.strftime("%Y-%m-%d")},
+                cur_user=self.ctx.user_id,
+            )
+            try:
+                results.append(await run_procedure_raw(self.ctx, "gw_fct_featurechanges", body))
+            except (DatabaseUnavailableError, ProcedureError):
+                logging.getLogger(__name__).warning("Feature change check failed; keeping cached network points")
+                return
+        if network_point_cache.record_changes(self.ctx.tenant_id, changes_signature(results)):
+            logging.getLogger(__name__).info("Network features changed; routing point sets invalidated")
+
+    async def _cached_optimized_route(self, valhalla_params: dict, scope: tuple[str, ...]) -> tuple[dict, str]:
+        """Valhalla-shaped response and the backend that produced it (cached answers are the configured one's)."""
+        settings = self.ctx.db_manager.settings
+        key = route_cache_key(
+            self.ctx.tenant_id,
+            valhalla_params["locations"],
+            backend=settings.routing_backend,
+            costing=valhalla_params["costing"],
+            units=valhalla_params["units"],
+            language=valhalla_params["language"],
+            grid_meters=global_settings.routing_cache_grid_meters,
+        )
+        # The cache may read/write its SQLite store: keep that off the event loop.
+        cached = await asyncio.to_thread(route_cache.get, key)
+        if cached is not None:
+            logging.getLogger(__name__).debug("optimized_route cache hit %s", key)
+            return cached, settings.routing_backend
+        valhalla_response, backend = await optimized_route(settings, valhalla_params, scope=scope)
+        logging.getLogger(__name__).debug(
+            "%s optimized_route response: %s", backend, json.dumps(valhalla_response, default=str)
+        )
+        # Only cache answers from the configured backend, never a degraded fallback.
+        if backend == settings.routing_backend:
+            await asyncio.to_thread(route_cache.set, key, valhalla_response)
+        return valhalla_response, backend
+
+    @staticmethod
+    def _route_geometry(trip: dict, costing: str, geometry_format: Literal["geojson", "polyline6"]) -> dict:
+        if geometry_format == "polyline6":
+            # Passthrough: clients decode the shapes themselves.
+            return {"legs": get_encoded_legs(trip)}
+        try:
+            return {"path": get_geojson_from_optimized_route(trip, costing)}
+        except (KeyError, TypeError, ValueError):
+            logging.getLogger(__name__).warning("Error creating GeoJSON from optimized route", exc_info=True)
+            return {"path": {}}
+
     async def get_object_parameter_order(
         self,
         object_type: str,
@@ -7,9 +7,15 @@ or (at your option) any later version.
 
 from __future__ import annotations
 
+import asyncio
+import base64
+import csv
+import io
+import json
 import logging
 import uuid
-from datetime import datetime
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime, timedelta, timezone
 
 import psycopg
 from fastapi import HTTPException
@@ -18,12 +24,70 @@ from psycopg.rows import dict_row
 
 from app.core.config import global_settings
 from app.core.exceptions import DatabaseUnavailableError
-from app.db.schema import resolve_log_targets
+from app.db.schema import LogTargets, resolve_log_targets
+from app.db.statements import StatementSnapshot, diff_snapshots, rank_statements, take_snapshot
 from app.db.version import get_db_version
 from app.services.context import ServiceContext
 from app.tenancy.registry import Tenant
 from app.utils.version import db_version_at_least
 
+# `group_by` values accepted by the stats endpoints -> log table column.
+HTTP_STATS_GROUPS = {"endpoint": "endpoint", "method": "method", "status": "status", "user": "user_name"}
+DB_STATS_GROUPS = {"function": "function_name", "schema": "schema_name", "status": "status"}
+STATS_SORT_KEYS = ("p99", "p90", "p50", "max_ms", "count", "error_rate")
+STATS_DEFAULT_WINDOW = timedelta(hours=24)
+LOG_EXPORT_FORMATS = ("ndjson", "csv")
+LOG_EXPORT_COLUMNS = (
+    "ts",
+    "method",
+    "endpoint",
+    "status",
+    "duration_ms",
+    "user_name",
+    "request_id",
+    "client_ip",
+    "query_params",
+    "body_size",
+    "response_size",
+    "request_headers",
+    "request_body",
+    "response_headers",
+    "response_body",
+    "timings",
+)
+
+
+def _timings_column(targets: LogTargets) -> str:
+    # Legacy `log` tables (DEPRECATED #28) and `gwapi` before migration 0004 have no `timings` column.
+    return "timings" if targets.has_timings else "NULL::jsonb AS timings"
+
+
+def encode_log_cursor(ts: datetime, row_id: int) -> str:
+    """Opaque `/logs` page cursor for the last row of a page."""
+    return base64.urlsafe_b64encode(f"{ts.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_log_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, _, row_id = raw.partition("|")
+        return datetime.fromisoformat(ts), int(row_id)
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _ndjson_line(values: Sequence) -> str:
+    return json.dumps(dict(zip(LOG_EXPORT_COLUMNS, values, strict=True)), default=str) + "\n"
+
+
+def _csv_line(values: Sequence) -> str:
+    """One CSV record; JSON columns (dicts) are written as JSON text."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(
+        json.dumps(value) if isinstance(value, (dict, list)) else "" if value is None else value for value in values
+    )
+    return buffer.getvalue()
+
 
 class SystemService:
     def __init__(self, tenant: Tenant, ctx: ServiceContext | None = None):
@@ -108,8 +172,17 @@ class SystemService:
         request_id: str | None = None,
         limit: int = 100,
         offset: int = 0,
+        cursor: str | None = None,
     ) -> dict:
-        db_manager = self.tenant.db_manager
+        """
+        One page of HTTP logs, newest first.
+
+        Pages are keyed on ``(ts, id)``: pass the previous page's `next_cursor`
+        to continue (constant cost at any depth). `offset` is kept for old
+        clients and only applies without a cursor. ``has_db_logs`` comes from one
+        semi-join over the page's request ids instead of an ``EXISTS`` per row.
+        """
+        db_manager = self.tenant.db_manager.log_db
         where_clauses: list[str] = []
         params: list = []
         self._manage_where_clauses(where_clauses, params, from_, to, endpoint, method, status, user)
@@ -119,6 +192,10 @@ class SystemService:
             except ValueError as exc:
                 raise ValueError("Invalid request_id") from exc
             where_clauses.append("request_id = %s")
+        if cursor:
+            where_clauses.append("(ts, id) < (%s, %s)")
+            params.extend(decode_log_cursor(cursor))
+            offset = 0
 
         where_sql = ""
         if where_clauses:
@@ -127,17 +204,24 @@ class SystemService:
         targets = await resolve_log_targets(db_manager)
         query = sql.SQL(
             f"""
-        SELECT ts, endpoint, method, status, duration_ms, user_name, request_id,
-               client_ip, query_params, body_size, response_size,
-               request_headers, request_body, response_headers, response_body,
-               EXISTS (
-                   SELECT 1 FROM {{schema}}.{{db_table}} d
-                   WHERE d.request_id = main.request_id
-               ) AS has_db_logs
-        FROM {{schema}}.{{table}} main
-        {where_sql}
-        ORDER BY ts DESC
-        LIMIT %s OFFSET %s
+        WITH page AS (
+            SELECT ts, id, endpoint, method, status, duration_ms, user_name, request_id,
+                   client_ip, query_params, body_size, response_size,
+                   request_headers, request_body, response_headers, response_body, {_timings_column(targets)}
+            FROM {{schema}}.{{table}}
+            {where_sql}
+            ORDER BY ts DESC, id DESC
+            LIMIT %s OFFSET %s
+        ),
+        linked AS (
+            SELECT DISTINCT d.request_id
+            FROM {{schema}}.{{db_table}} d
+            WHERE d.request_id IN (SELECT request_id FROM page)
+        )
+        SELECT page.*, linked.request_id IS NOT NULL AS has_db_logs
+        FROM page
+        LEFT JOIN linked ON linked.request_id = page.request_id
+        ORDER BY page.ts DESC, page.id DESC
         """
         ).format(
             schema=sql.Identifier(targets.schema),
@@ -150,18 +234,110 @@ class SystemService:
             if conn is None:
                 raise DatabaseUnavailableError()
             try:
-                async with conn.cursor(row_factory=dict_row) as cursor:
-                    await cursor.execute(query, tuple(params))
-                    rows = await cursor.fetchall()
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    await cur.execute(query, tuple(params))
+                    rows = await cur.fetchall()
                 await conn.commit()
             except psycopg.Error as exc:
                 await conn.rollback()
                 raise RuntimeError(str(exc)) from exc
 
-        return {"count": len(rows), "items": rows}
+        next_cursor = encode_log_cursor(rows[-1]["ts"], rows[-1]["id"]) if len(rows) == limit else None
+        for row in rows:
+            del row["id"]
+        return {"count": len(rows), "items": rows, "next_cursor": next_cursor}
+
+    async def export_logs(
+        self,
+        *,
+        fmt: str = "ndjson",
+        from_: datetime | None = None,
+        to: datetime | None = None,
+        endpoint: str | None = None,
+        method: str | None = None,
+        status: int | None = None,
+        user: str | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream HTTP logs oldest first as NDJSON lines or CSV rows.
+
+        Rows come from a server-side cursor in batches of `LOG_EXPORT_BATCH_ROWS`,
+        so a full day of logs is never held in memory. The generator yields an
+        empty string once the query is running: callers await that first item
+        before sending response headers, so a database outage is still a 503.
+        """
+        if fmt not in LOG_EXPORT_FORMATS:
+            raise ValueError(f"Invalid format '{fmt}'; expected one of {', '.join(LOG_EXPORT_FORMATS)}")
+        from_, to = self._log_window(from_, to)
+        db_manager = self.tenant.db_manager.log_db
+        where_clauses: list[str] = []
+        params: list = []
+        self._manage_where_clauses(where_clauses, params, from_, to, endpoint, method, status, user)
+        targets = await resolve_log_targets(db_manager)
+        query = sql.SQL(
+            f"""
+        SELECT {", ".join(LOG_EXPORT_COLUMNS[:-1])}, {_timings_column(targets)}
+        FROM {{schema}}.{{table}}
+        WHERE {" AND ".join(where_clauses)}
+        ORDER BY ts, id
+        """
+        ).format(schema=sql.Identifier(targets.schema), table=sql.Identifier(targets.http_table))
+
+        async with db_manager.get_db() as conn:
+            if conn is None:
+                raise DatabaseUnavailableError()
+            # Named cursor: rows stay on the server and arrive `itersize` at a time.
+            async with conn.transaction(), conn.cursor(name=f"log_export_{uuid.uuid4().hex}") as cur:
+                try:
+                    await cur.execute(query, tuple(params))
+                except psycopg.Error as exc:
+                    raise RuntimeError(str(exc)) from exc
+                cur.itersize = max(global_settings.log_export_batch_rows, 1)
+                yield ""
+                if fmt == "csv":
+                    yield _csv_line(LOG_EXPORT_COLUMNS)
+                encode = _csv_line if fmt == "csv" else _ndjson_line
+                async for row in cur:
+                    yield encode(row)
+
+    async def get_logged_requests(
+        self,
+        *,
+        from_: datetime | None = None,
+        to: datetime | None = None,
+        endpoint: str | None = None,
+        method: str | None = None,
+        limit: int = 10000,
+    ) -> list[dict]:
+        """Logged HTTP requests oldest first, with what is needed to send them again (`bench replay`)."""
+        from_, to = self._log_window(from_, to)
+        db_manager = self.tenant.db_manager.log_db
+        where_clauses: list[str] = []
+        params: list = []
+        self._manage_where_clauses(where_clauses, params, from_, to, endpoint, method, None, None)
+        targets = await resolve_log_targets(db_manager)
+        query = sql.SQL(
+            f"""
+        SELECT ts, method, endpoint, status, duration_ms, query_params, body_size, request_headers, request_body
+        FROM {{schema}}.{{table}}
+        WHERE {" AND ".join(where_clauses)}
+        ORDER BY ts, id
+        LIMIT %s
+        """
+        ).format(schema=sql.Identifier(targets.schema), table=sql.Identifier(targets.http_table))
+
+        async with db_manager.get_db() as conn:
+            if conn is None:
+                raise DatabaseUnavailableError()
+            async with conn.cursor(row_factory=dict_row) as cur:
+                try:
+                    await cur.execute(query, (*params, limit))
+                except psycopg.Error as exc:
+                    raise RuntimeError(str(exc)) from exc
+                return await cur.fetchall()
 
     async def get_db_logs(self, request_id: str, limit: int = 50) -> dict:
-        db_manager = self.tenant.db_manager
+        db_manager = self.tenant.db_manager.log_db
         try:
             rid = uuid.UUID(request_id)
         except ValueError as exc:
@@ -192,3 +368,180 @@ class SystemService:
                 raise RuntimeError(str(exc)) from exc
 
         return {"count": len(rows), "items": rows}
+
+    @staticmethod
+    def _log_window(from_: datetime | None, to: datetime | None) -> tuple[datetime, datetime]:
+        """Bounded time window (defaults to the last 24 h) so the planner prunes log partitions."""
+        to = to or datetime.now(timezone.utc)
+        from_ = from_ or to - STATS_DEFAULT_WINDOW
+        from_, to = (value if value.tzinfo else value.replace(tzinfo=timezone.utc) for value in (from_, to))
+        if from_ >= to:
+            raise ValueError("'from' must be earlier than 'to'")
+        return from_, to
+
+    @staticmethod
+    def _stats_query(schema: str, table: str, column: str, error_sql: str, where_sql: str, sort: str) -> sql.Composed:
+        """
+        Latency percentiles per group plus a total row, in one scan.
+
+        `GROUPING SETS ((column), ())` yields the per-group rows and the overall
+        totals (``is_total``) together; the total row always sorts first.
+        """
+        return sql.SQL(
+            f"""
+        SELECT {{column}}::text AS key,
+               GROUPING({{column}}) = 1 AS is_total,
+               count(*) AS count,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms) AS p50,
+               percentile_cont(0.9) WITHIN GROUP (ORDER BY duration_ms) AS p90,
+               percentile_cont(0.99) WITHIN GROUP (ORDER BY duration_ms) AS p99,
+               max(duration_ms) AS max_ms,
+               avg(duration_ms)::float8 AS avg_ms,
+               count(*) FILTER (WHERE {error_sql}) AS errors,
+               (count(*) FILTER (WHERE {error_sql}))::float8 / count(*) AS error_rate
+        FROM {{schema}}.{{table}}
+        WHERE ts >= %s AND ts < %s{where_sql}
+        GROUP BY GROUPING SETS (({{column}}), ())
+        ORDER BY is_total DESC, {sort} DESC NULLS LAST, key
+        LIMIT %s
+        """
+        ).format(column=sql.Identifier(column), schema=sql.Identifier(schema), table=sql.Identifier(table))
+
+    async def _fetch_stats(self, kind: str, column: str, error_sql: str, filters: dict, window, sort, limit) -> dict:
+        if sort not in STATS_SORT_KEYS:
+            raise ValueError(f"Invalid sort '{sort}'; expected one of {', '.join(STATS_SORT_KEYS)}")
+        db_manager = self.tenant.db_manager.log_db
+        from_, to = window
+        where_sql = "".join(f" AND {name} = %s" for name in filters)
+        targets = await resolve_log_targets(db_manager)
+        table = targets.http_table if kind == "http" else targets.db_table
+        query = self._stats_query(targets.schema, table, column, error_sql, where_sql, sort)
+        params = (from_, to, *filters.values(), limit + 1)
+
+        async with db_manager.get_db() as conn:
+            if conn is None:
+                raise DatabaseUnavailableError()
+            try:
+                async with conn.cursor(row_factory=dict_row) as cursor:
+                    await cursor.execute(query, params)
+                    rows = await cursor.fetchall()
+                await conn.commit()
+            except psycopg.Error as exc:
+                await conn.rollback()
+                raise RuntimeError(str(exc)) from exc
+
+        total = next((row for row in rows if row.pop("is_total")), None)
+        for row in rows:
+            for key in ("p50", "p90", "p99", "avg_ms", "error_rate"):
+                if row[key] is not None:
+                    row[key] = round(row[key], 4 if key == "error_rate" else 1)
+        groups = [row for row in rows if row is not total]
+        if total is not None:
+            total.pop("key")
+        return {"from": from_, "to": to, "total": total, "count": len(groups), "items": groups}
+
+    async def get_log_stats(
+        self,
+        *,
+        from_: datetime | None = None,
+        to: datetime | None = None,
+        group_by: str = "endpoint",
+        endpoint: str | None = None,
+        method: str | None = None,
+        status: int | None = None,
+        user: str | None = None,
+        sort: str = "p99",
+        limit: int = 50,
+    ) -> dict:
+        """HTTP latency percentiles, counts and 5xx rate per `group_by` over a time window."""
+        column = HTTP_STATS_GROUPS.get(group_by)
+        if column is None:
+            raise ValueError(f"Invalid group_by '{group_by}'; expected one of {', '.join(HTTP_STATS_GROUPS)}")
+        filters = {
+            name: value
+            for name, value in (
+                ("endpoint", endpoint),
+                ("method", method.upper() if method else None),
+                ("status", status),
+                ("user_name", user),
+            )
+            if value is not None
+        }
+        result = await self._fetch_stats(
+            "http", column, "status >= 500", filters, self._log_window(from_, to), sort, limit
+        )
+        return {"group_by": group_by, **result}
+
+    async def get_db_log_stats(
+        self,
+        *,
+        from_: datetime | None = None,
+        to: datetime | None = None,
+        group_by: str = "function",
+        function_name: str | None = None,
+        schema_name: str | None = None,
+        sort: str = "p99",
+        limit: int = 50,
+    ) -> dict:
+        """Database call latency percentiles, counts and failure rate per `group_by` over a time window."""
+        column = DB_STATS_GROUPS.get(group_by)
+        if column is None:
+            raise ValueError(f"Invalid group_by '{group_by}'; expected one of {', '.join(DB_STATS_GROUPS)}")
+        filters = {
+            name: value
+            for name, value in (("function_name", function_name), ("schema_name", schema_name))
+            if value is not None
+        }
+        result = await self._fetch_stats(
+            "db",
+            column,
+            "error IS NOT NULL OR status = 'Failed'",
+            filters,
+            self._log_window(from_, to),
+            sort,
+            limit,
+        )
+        return {"group_by": group_by, **result}
+
+    async def snapshot_statements(self) -> StatementSnapshot:
+        return await take_snapshot(self.tenant.db_manager)
+
+    async def get_statement_stats(
+        self, *, window_seconds: float = 60, sort: str = "total_time", limit: int = 20
+    ) -> dict:
+        """`pg_stat_statements` activity over the next `window_seconds` (two snapshots, diffed)."""
+        before = await self.snapshot_statements()
+        await asyncio.sleep(window_seconds)
+        return await self.compare_statements(before, await self.snapshot_statements(), sort=sort, limit=limit)
+
+    async def compare_statements(
+        self, before: StatementSnapshot, after: StatementSnapshot, *, sort: str = "total_time", limit: int = 20
+    ) -> dict:
+        """
+        Rank the statements run between two snapshots and attach, per called
+        function, the API-side latency recorded in ``db_logs`` over the same window.
+        """
+        ranked = rank_statements(diff_snapshots(before, after), sort, limit)
+        report = {
+            "database": after.database,
+            "from": before.taken_at,
+            "to": after.taken_at,
+            "window_seconds": round((after.taken_at - before.taken_at).total_seconds(), 1),
+            **ranked,
+        }
+        functions = {item["function"] for item in ranked["items"]} - {None}
+        if not functions:
+            return report
+        try:
+            api_stats = await self.get_db_log_stats(from_=before.taken_at, to=after.taken_at, limit=500)
+        except (DatabaseUnavailableError, RuntimeError) as exc:
+            # The audit log may live in another database; the statement ranking stands on its own.
+            report["api_stats_error"] = str(exc)
+            return report
+        by_function = {row["key"]: row for row in api_stats["items"] if row["key"] in functions}
+        for item in ranked["items"]:
+            row = by_function.get(item["function"])
+            item["api"] = (
+                {key: row[key] for key in ("count", "p50", "p99", "max_ms", "errors")} if row is not None else None
+            )
+        return report
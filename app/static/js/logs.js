@@ -5,7 +5,10 @@
 // ── Constants & State ─────────────────────────────────────────────
 const API_BASE = resolveApiBase();
 let gridApi = null;
-let currentOffset = 0;
+let currentCursor = null; // cursor of the page being shown (null = newest)
+let previousCursors = []; // cursors of the pages before it, for "Prev"
+let nextCursor = null;
+let pageIndex = 0;
 let currentLimit = 200;
 let lastFetchedCount = 0;
 
@@ -189,7 +192,8 @@ const gridOptions = {
 };
 
 // ── API Calls ─────────────────────────────────────────────────────
-async function fetchLogs() {
+/** Filter-bar values as `/logs` query parameters (shared by the list and the export). */
+function filterParams() {
     const params = new URLSearchParams();
 
     const from = document.getElementById("filter-from").value;
@@ -198,7 +202,6 @@ async function fetchLogs() {
     const method = document.getElementById("filter-method").value;
     const status = document.getElementById("filter-status").value.trim();
     const user = document.getElementById("filter-user").value.trim();
-    const limit = document.getElementById("filter-limit").value.trim();
 
     if (from) params.set("from", new Date(from).toISOString());
     if (to) params.set("to", new Date(to).toISOString());
@@ -206,10 +209,15 @@ async function fetchLogs() {
     if (method) params.set("method", method);
     if (status) params.set("status", status);
     if (user) params.set("user", user);
+    return params;
+}
 
+async function fetchLogs() {
+    const params = filterParams();
+    const limit = document.getElementById("filter-limit").value.trim();
     currentLimit = parseInt(limit, 10) || 200;
     params.set("limit", currentLimit);
-    params.set("offset", currentOffset);
+    if (currentCursor) params.set("cursor", currentCursor);
 
     try {
         const resp = await fetch(`${API_BASE}/logs?${params}`);
@@ -219,6 +227,7 @@ async function fetchLogs() {
         }
         const data = await resp.json();
         lastFetchedCount = data.count || 0;
+        nextCursor = data.next_cursor || null;
         const items = markDayBoundaries(data.items || []);
         gridApi.setGridOption("rowData", items);
         updatePagination();
@@ -242,19 +251,145 @@ async function fetchDbLogs(requestId) {
     }
 }
 
+// ── Latency Stats ─────────────────────────────────────────────────
+const STATS_GROUPS = {
+    http: { endpoint: "Endpoint", method: "Method", status: "Status", user: "User" },
+    db: { function: "Function", schema: "Schema", status: "Status" },
+};
+
+function fillStatsGroups() {
+    const source = document.getElementById("stats-source").value;
+    const select = document.getElementById("stats-group");
+    select.innerHTML = Object.entries(STATS_GROUPS[source])
+        .map(([value, label]) => `<option value="${value}">${label}</option>`)
+        .join("");
+}
+
+function statsPanelOpen() {
+    return !document.getElementById("stats-panel").hidden;
+}
+
+async function fetchStats() {
+    if (!statsPanelOpen()) return;
+    const source = document.getElementById("stats-source").value;
+    const groupBy = document.getElementById("stats-group").value;
+    const filters = filterParams();
+    // DB call stats only share the time window with the request filters.
+    const params = source === "http" ? filters : new URLSearchParams();
+    if (source !== "http") {
+        if (filters.has("from")) params.set("from", filters.get("from"));
+        if (filters.has("to")) params.set("to", filters.get("to"));
+    }
+    params.set("group_by", groupBy);
+    params.set("sort", document.getElementById("stats-sort").value);
+    params.set("limit", "50");
+
+    const path = source === "http" ? "logs/stats" : "logs/db/stats";
+    try {
+        const resp = await fetch(`${API_BASE}/${path}?${params}`);
+        if (!resp.ok) {
+            console.error("Fetch stats failed:", resp.status, resp.statusText);
+            return;
+        }
+        renderStats(await resp.json(), source, groupBy);
+    } catch (err) {
+        console.error("Fetch stats error:", err);
+    }
+}
+
+function formatMs(value) {
+    if (value == null) return "—";
+    return value >= 1000 ? `${(value / 1000).toFixed(2)} s` : `${Math.round(value)} ms`;
+}
+
+function renderStats(data, source, groupBy) {
+    const chart = document.getElementById("stats-chart");
+    const total = data.total;
+    document.getElementById("stats-total").textContent = total
+        ? `${total.count} calls · p50 ${formatMs(total.p50)} · p90 ${formatMs(total.p90)} · ` +
+          `p99 ${formatMs(total.p99)} · max ${formatMs(total.max_ms)} · ` +
+          `errors ${(total.error_rate * 100).toFixed(1)}%`
+        : "";
+
+    const items = data.items || [];
+    if (items.length === 0) {
+        chart.innerHTML = '<div class="stats-empty">No logs in this window.</div>';
+        return;
+    }
+
+    const scale = Math.max(...items.map((item) => item.p99 || 0), 1);
+    const width = (value) => `${Math.max(((value || 0) / scale) * 100, 0.5).toFixed(2)}%`;
+    chart.innerHTML = items
+        .map((item, idx) => {
+            const errors = item.errors
+                ? ` · <span class="errors">${(item.error_rate * 100).toFixed(1)}% err</span>`
+                : "";
+            return `
+            <div class="stats-row" data-idx="${idx}" title="${escapeHtml(item.key ?? "(none)")}">
+                <span class="stats-key">${escapeHtml(item.key ?? "(none)")}</span>
+                <span class="stats-bars">
+                    <span class="stats-bar p99" style="width:${width(item.p99)}"></span>
+                    <span class="stats-bar p90" style="width:${width(item.p90)}"></span>
+                    <span class="stats-bar p50" style="width:${width(item.p50)}"></span>
+                </span>
+                <span class="stats-numbers">
+                    ${formatMs(item.p50)} / ${formatMs(item.p90)} / ${formatMs(item.p99)}
+                    · n=${item.count}${errors}
+                </span>
+            </div>
+        `;
+        })
+        .join("");
+
+    // Clicking an HTTP endpoint/user/status row narrows the request list to it.
+    const filterFor = { endpoint: "filter-endpoint", user: "filter-user", status: "filter-status", method: "filter-method" };
+    if (source !== "http" || !filterFor[groupBy]) return;
+    chart.querySelectorAll(".stats-row").forEach((row) => {
+        row.addEventListener("click", () => {
+            const item = items[parseInt(row.dataset.idx, 10)];
+            if (item?.key == null) return;
+            document.getElementById(filterFor[groupBy]).value = item.key;
+            resetPagination();
+            fetchLogs();
+        });
+    });
+}
+
+function toggleStats() {
+    const panel = document.getElementById("stats-panel");
+    const button = document.getElementById("btn-stats");
+    panel.hidden = !panel.hidden;
+    button.setAttribute("aria-expanded", String(!panel.hidden));
+    fetchStats();
+}
+
 // ── Pagination ────────────────────────────────────────────────────
 function nextPage() {
-    currentOffset += currentLimit;
+    if (!nextCursor) return;
+    previousCursors.push(currentCursor);
+    currentCursor = nextCursor;
+    pageIndex += 1;
     fetchLogs();
 }
 
 function prevPage() {
-    currentOffset = Math.max(0, currentOffset - currentLimit);
+    if (pageIndex === 0) return;
+    currentCursor = previousCursors.pop() ?? null;
+    pageIndex -= 1;
     fetchLogs();
 }
 
 function resetPagination() {
-    currentOffset = 0;
+    currentCursor = null;
+    previousCursors = [];
+    nextCursor = null;
+    pageIndex = 0;
+}
+
+function exportLogs(format) {
+    const params = filterParams();
+    params.set("format", format);
+    window.location.href = `${API_BASE}/logs/export?${params}`;
 }
 
 function updatePagination() {
@@ -262,11 +397,11 @@ function updatePagination() {
     const btnNext = document.getElementById("btn-next");
     const pageInfo = document.getElementById("page-info");
 
-    btnPrev.disabled = currentOffset === 0;
-    btnNext.disabled = lastFetchedCount < currentLimit;
+    btnPrev.disabled = pageIndex === 0;
+    btnNext.disabled = !nextCursor;
 
-    const pageStart = currentOffset + 1;
-    const pageEnd = currentOffset + lastFetchedCount;
+    const pageStart = pageIndex * currentLimit + 1;
+    const pageEnd = pageIndex * currentLimit + lastFetchedCount;
     pageInfo.textContent =
         lastFetchedCount > 0
             ? `Showing ${pageStart}–${pageEnd}`
@@ -672,6 +807,7 @@ document.addEventListener("DOMContentLoaded", () => {
     document.getElementById("btn-search").addEventListener("click", () => {
         resetPagination();
         fetchLogs();
+        fetchStats();
     });
 
     // Wire up Enter key on filter inputs
@@ -680,10 +816,25 @@ document.addEventListener("DOMContentLoaded", () => {
             if (e.key === "Enter") {
                 resetPagination();
                 fetchLogs();
+                fetchStats();
             }
         });
     });
 
+    // Latency stats panel
+    fillStatsGroups();
+    document.getElementById("btn-stats").addEventListener("click", toggleStats);
+    document.getElementById("stats-source").addEventListener("change", () => {
+        fillStatsGroups();
+        fetchStats();
+    });
+    document.getElementById("stats-group").addEventListener("change", fetchStats);
+    document.getElementById("stats-sort").addEventListener("change", fetchStats);
+
+    // Export (same filters, whole window)
+    document.getElementById("btn-export-ndjson").addEventListener("click", () => exportLogs("ndjson"));
+    document.getElementById("btn-export-csv").addEventListener("click", () => exportLogs("csv"));
+
     // Pagination
     document.getElementById("btn-prev").addEventListener("click", prevPage);
     document.getElementById("btn-next").addEventListener("click", nextPage);
@@ -10,7 +10,7 @@ from fastapi.responses import JSONResponse
 
 from . import state
 from ..core.config import global_settings
-from ..core.constants import ADMIN_PREFIX, GLOBAL_HEALTH_PATH, STATIC_PREFIX, TENANT_PREFIX
+from ..core.constants import ADMIN_PREFIX, GLOBAL_HEALTH_PATH, METRICS_PATH, STATIC_PREFIX, TENANT_PREFIX
 from .registry import RESERVED_IDS, TENANT_ID_RE
 
 
@@ -67,7 +67,7 @@ async def host_middleware(request: Request, call_next):  # noqa: C901
     if path == GLOBAL_HEALTH_PATH or path.startswith(GLOBAL_HEALTH_PATH + "/"):
         return await call_next(request)
 
-    if _path_starts(path, STATIC_PREFIX):
+    if _path_starts(path, STATIC_PREFIX) or path == METRICS_PATH:
         return await call_next(request)
 
     # Single-tenant mode: path-based routing, no Host requirement.
@@ -10,8 +10,7 @@ import logging
 import os
 import re
 import time
-from dataclasses import dataclass, field
-from datetime import date
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
@@ -20,6 +19,7 @@ from fastapi_keycloak import FastAPIKeycloak
 from ..core.config import TenantSettings, global_settings, load_tenant_settings
 from ..db.manager import DatabaseManager
 from ..auth.keycloak import build_idp
+from ..utils.log_setup import create_log
 
 TENANT_ID_RE = re.compile(r"^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$")
 RESERVED_IDS = {"www", "api", "admin", "static", "traefik", "localhost"}
@@ -42,34 +42,12 @@ class Tenant:
     db_manager: DatabaseManager
     idp: Optional[FastAPIKeycloak]
     api_logger: logging.Logger
-    api_log_date: str
-    log_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
-
-    async def ensure_logger_fresh(self) -> None:
-        """Refresh the per-tenant file logger when the day rolls over."""
-        today = date.today().strftime("%Y%m%d")
-        if self.api_log_date == today:
-            return
-        async with self.log_lock:
-            if self.api_log_date == today:
-                return
-            from ..utils.log_setup import create_log
-
-            self.api_logger = create_log("api", _tenant_log_dir(self.id))
-            self.api_log_date = today
 
 
 def _tenant_log_dir(tid: str) -> str:
     return os.path.join(global_settings.log_dir, tid)
 
 
-def _build_tenant_logger(tid: str) -> tuple[logging.Logger, str]:
-    from ..utils.log_setup import create_log
-
-    today = date.today().strftime("%Y%m%d")
-    return create_log("api", _tenant_log_dir(tid)), today
-
-
 def _atomic_write_env(path: Path, contents: str) -> None:
     tmp = path.with_suffix(path.suffix + f".tmp.{os.getpid()}.{int(time.time() * 1000)}")
     tmp.write_text(contents, encoding="utf-8")
@@ -106,12 +84,20 @@ def serialize_tenant_settings(settings: TenantSettings) -> str:
         ("DB_PASSWORD", settings.db_password),
         ("DB_SCHEMA", settings.db_schema),
         ("DATABASE_URL", settings.database_url),
+        ("LOG_DATABASE_URL", settings.log_database_url),
         ("DB_POOL_MIN_SIZE", settings.db_pool_min_size),
         ("DB_POOL_MAX_SIZE", settings.db_pool_max_size),
         ("DB_POOL_TIMEOUT", settings.db_pool_timeout),
         ("DB_POOL_MAX_WAITING", settings.db_pool_max_waiting),
         ("DB_POOL_MAX_IDLE", settings.db_pool_max_idle),
         ("DB_CONNECT_TIMEOUT", settings.db_connect_timeout),
+        ("ROUTING_BACKEND", settings.routing_backend),
+        ("ROUTING_FALLBACK_LOCAL", settings.routing_fallback_local),
+        ("ROUTING_MATRIX_CACHE", settings.routing_matrix_cache),
+        ("LOG_RETENTION_HTTP_DAYS", settings.log_retention_http_days),
+        ("LOG_RETENTION_DB_DAYS", settings.log_retention_db_days),
+        ("LOG_ARCHIVE_FORMAT", settings.log_archive_format),
+        ("SERVER_TIMING", settings.server_timing),
         ("AUTH_MODE", settings.auth_mode),
         ("AUTH_BASIC_BOOTSTRAP_USER", settings.auth_basic_bootstrap_user),
         ("AUTH_BASIC_BOOTSTRAP_PASSWORD", settings.auth_basic_bootstrap_password),
@@ -203,14 +189,12 @@ class TenantRegistry:
             except Exception as exc:
                 logger.warning("[%s] tenant database init failed: %s", tid, exc)
         idp = build_idp(settings)
-        api_logger, api_log_date = _build_tenant_logger(tid)
         return Tenant(
             id=tid,
             settings=settings,
             db_manager=db,
             idp=idp,
-            api_logger=api_logger,
-            api_log_date=api_log_date,
+            api_logger=create_log("api", _tenant_log_dir(tid)),
         )
 
     async def reload_one(self, tid: str) -> Tenant:
@@ -0,0 +1,54 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Per-tenant invalidation generations shared by the workers of a host.
+
+The in-process routing caches (network point sets, cost matrices) live in each
+gunicorn worker, while the admin invalidation request reaches only one of them.
+`bump()` touches ``<directory>/<tenant_id>``; the file's mtime (ns) is the
+tenant's generation. Each cache entry remembers the generation it was stored
+under and is treated as a miss once `current()` differs, so every worker drops
+it on its next lookup. A missing directory or file is generation 0.
+"""
+
+import os
+import time
+
+from ..core.config import global_settings
+
+
+class SharedGeneration:
+    """Tenant generation markers kept as file mtimes in one directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, tenant_id: str) -> str:
+        return os.path.join(self.directory, tenant_id)
+
+    def current(self, tenant_id: str) -> int:
+        try:
+            return os.stat(self._path(tenant_id)).st_mtime_ns
+        except OSError:
+            return 0
+
+    def bump(self, tenant_id: str) -> int:
+        """Start a new generation for the tenant and return it."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(tenant_id)
+        # Strictly increasing even when two bumps land within the filesystem's timestamp resolution.
+        generation = max(time.time_ns(), self.current(tenant_id) + 1)
+        with open(path, "a"):
+            pass
+        os.utime(path, ns=(generation, generation))
+        return self.current(tenant_id)
+
+
+routing_generations = SharedGeneration(
+    os.path.abspath(
+        global_settings.routing_cache_generation_dir or os.path.join(global_settings.log_dir, "routing-generations")
+    )
+)
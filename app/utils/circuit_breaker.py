@@ -0,0 +1,90 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+
+import logging
+import threading
+import time
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for an outbound provider.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    `allow_request()` returns False for `reset_seconds`. Then a single probe
+    request is let through (half-open); its outcome closes or re-opens the
+    circuit. A probe that never reports back (cancelled, or still running after
+    `probe_timeout_seconds`) does not block later probes. State is per process
+    (each gunicorn worker trips independently).
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float, probe_timeout_seconds: float = 120.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_started: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._state_locked(time.monotonic())
+
+    def _state_locked(self, now: float) -> CircuitState:
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        """True when a call to the provider may be attempted."""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            state = self._state_locked(now)
+            if state == "closed":
+                return True
+            if state == "half_open" and (
+                self._probe_started is None or now - self._probe_started >= self.probe_timeout_seconds
+            ):
+                self._probe_started = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Circuit '%s' closed", self.name)
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self.failure_threshold > 0 and self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Circuit '%s' opened after %s consecutive failures", self.name, self._failures)
+                self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """End a call without an outcome (e.g. cancelled): the next request may probe again."""
+        with self._lock:
+            self._probe_started = None
+
+    def reset(self) -> None:
+        self.record_success()
@@ -0,0 +1,64 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+
+from functools import lru_cache
+from typing import Sequence
+
+import numpy as np
+from pyproj import Transformer
+
+WGS84_EPSG = 4326
+
+
+@lru_cache(maxsize=64)
+def get_transformer(from_epsg: int, to_epsg: int = WGS84_EPSG) -> Transformer:
+    """
+    Process-wide cached ``Transformer`` for an EPSG pair (always x/y order).
+
+    Building a transformer hits the PROJ database; reusing it is what makes
+    per-point reprojection cheap. pyproj transformers are thread safe (>= 3.1).
+    """
+    return Transformer.from_crs(from_epsg, to_epsg, always_xy=True)
+
+
+def transform_xy(
+    xs: Sequence[float] | np.ndarray,
+    ys: Sequence[float] | np.ndarray,
+    from_epsg: int,
+    to_epsg: int = WGS84_EPSG,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Reproject coordinate arrays in a single PROJ call."""
+    x = np.asarray(xs, dtype=np.float64)
+    y = np.asarray(ys, dtype=np.float64)
+    if from_epsg == to_epsg or x.size == 0:
+        return x, y
+    return get_transformer(from_epsg, to_epsg).transform(x, y)
+
+
+def transform_points(
+    xs: Sequence[float],
+    ys: Sequence[float],
+    epsgs: Sequence[int],
+    to_epsg: int = WGS84_EPSG,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reproject points that may come in mixed EPSG codes.
+
+    Points are grouped by source EPSG and each group is transformed in one
+    call; the output keeps the input order.
+    """
+    x = np.asarray(xs, dtype=np.float64)
+    y = np.asarray(ys, dtype=np.float64)
+    codes = np.asarray(epsgs, dtype=np.int64)
+    out_x = x.copy()
+    out_y = y.copy()
+    for epsg in np.unique(codes):
+        if int(epsg) == to_epsg:
+            continue
+        mask = codes == epsg
+        out_x[mask], out_y[mask] = transform_xy(x[mask], y[mask], int(epsg), to_epsg)
+    return out_x, out_y
@@ -3,77 +3,178 @@ Copyright © 2026 by BGEO. All rights reserved.
 The program is free software: you can redistribute it and/or modify it under the terms of the GNU
 General Public License as published by the Free Software Foundation, either version 3 of the License,
 or (at your option) any later version.
+
+Per-worker registry of file loggers.
+
+Each (logger name, base directory) gets one logger, built on first use. Loggers
+only enqueue records (`QueueHandler`); a single `QueueListener` thread writes
+them to ``<log_dir>/<YYYYMMDD>/<service>_<YYYYMMDD>.log`` through one
+`DailyFileHandler` per base directory, which also switches to the next day's
+file and prunes day directories older than `LOG_ROTATE_DAYS`. Request handling
+therefore never opens files or touches the disk.
 """
 
+import atexit
 import logging
 import os
-from datetime import date
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import re
+import shutil
+import threading
+import time
+from datetime import date, timedelta
+from logging.handlers import QueueHandler, QueueListener
 
 from ..core.config import global_settings
 
 logger = logging.getLogger(__name__)
 
-
-# Create log pointer
-def create_log(class_name: str, log_dir: str | None = None):
-    """Build a `TimedRotatingFileHandler`-backed logger.
-
-    `log_dir` is the *base* directory; today's date is appended automatically
-    so daily rotation lands in `<log_dir>/<YYYYMMDD>/`. When omitted, falls
-    back to `global_settings.log_dir` for legacy callers (transitional)."""
-    today = date.today().strftime("%Y%m%d")
-
-    logs_directory = log_dir or global_settings.log_dir
-
-    logger_name = f"{class_name.split('.')[-1]}"
-    log = logging.getLogger(logger_name)
-    remove_handlers(log)
-
-    def _fallback_stream_logger(reason: Exception):
-        logger.warning("File logging disabled (%s). Falling back to stdout logging.", reason)
-        stream_handler = logging.StreamHandler()
-        formatter = logging.Formatter("[%(asctime)s] %(levelname)s:%(name)s:%(message)s", datefmt="%d/%m/%y %H:%M:%S")
-        stream_handler.setFormatter(formatter)
-        log.addHandler(stream_handler)
-        log.setLevel(getattr(logging, global_settings.log_level.upper(), logging.INFO))
-        return log
-
-    try:
-        if not os.path.exists(logs_directory):
-            os.makedirs(logs_directory, exist_ok=True)
-
-        today_directory = os.path.join(logs_directory, today)
-        os.makedirs(today_directory, exist_ok=True)
-
-        service_name = os.getcwd().split(os.sep)[-1]
-        log_file = f"{service_name}_{today}.log"
-
-        log_path = os.path.join(today_directory, log_file)
-        if not os.path.exists(log_path):
-            open(log_path, "a", encoding="utf-8").close()
-
-        fileh = TimedRotatingFileHandler(
-            log_path,
-            when="midnight",
-            interval=1,
-            backupCount=global_settings.log_rotate_days,
-            encoding="utf-8",
-            utc=False,
-        )
-        formatter = logging.Formatter("[%(asctime)s] %(levelname)s:%(name)s:%(message)s", datefmt="%d/%m/%y %H:%M:%S")
-        fileh.setFormatter(formatter)
-    except OSError as e:
-        return _fallback_stream_logger(e)
-
-    log.addHandler(fileh)
-    log.setLevel(getattr(logging, global_settings.log_level.upper(), logging.INFO))
-    return log
-
-
-# Removes previous handlers on root Logger
-def remove_handlers(log=None):
-    if log is None:
-        log = logging.getLogger()
-    for hdlr in log.handlers[:]:
-        log.removeHandler(hdlr)
+_FORMATTER = logging.Formatter("[%(asctime)s] %(levelname)s:%(name)s:%(message)s", datefmt="%d/%m/%y %H:%M:%S")
+_DAY_DIR_RE = re.compile(r"^\d{8}$")
+
+
+class DailyFileHandler(logging.Handler):
+    """Append to today's file under `base_dir`; the first record of a new day opens the next file."""
+
+    def __init__(self, base_dir: str, service_name: str, retain_days: int):
+        super().__init__()
+        self.base_dir = base_dir
+        self.service_name = service_name
+        self.retain_days = retain_days
+        self._day: str | None = None
+        self._stream = None
+
+    def _roll(self, day: str) -> None:
+        if self._stream is not None:
+            self._stream.close()
+        day_dir = os.path.join(self.base_dir, day)
+        os.makedirs(day_dir, exist_ok=True)
+        self._stream = open(os.path.join(day_dir, f"{self.service_name}_{day}.log"), "a", encoding="utf-8")
+        self._day = day
+        self._prune(day)
+
+    def _prune(self, day: str) -> None:
+        """Remove day directories older than `retain_days` (0 keeps everything)."""
+        if self.retain_days <= 0:
+            return
+        oldest = (date(int(day[:4]), int(day[4:6]), int(day[6:])) - timedelta(days=self.retain_days)).strftime("%Y%m%d")
+        for name in os.listdir(self.base_dir):
+            if _DAY_DIR_RE.match(name) and name < oldest:
+                shutil.rmtree(os.path.join(self.base_dir, name), ignore_errors=True)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            day = time.strftime("%Y%m%d", time.localtime(record.created))
+            if day != self._day:
+                self._roll(day)
+            self._stream.write(self.format(record) + "\n")
+            self._stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        with self.lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+                self._day = None
+        super().close()
+
+
+class _DirectoryQueueHandler(QueueHandler):
+    """Tag queued records with their base directory so the listener can route them."""
+
+    def __init__(self, log_queue: queue.SimpleQueue, directory: str):
+        super().__init__(log_queue)
+        self.directory = directory
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        record.log_directory = self.directory
+        return record
+
+
+class _DirectoryRouter(logging.Handler):
+    """Listener-side handler: dispatch each record to its directory's handler."""
+
+    def __init__(self, handlers: dict[str, logging.Handler]):
+        super().__init__()
+        self.handlers = handlers
+
+    def emit(self, record: logging.LogRecord) -> None:
+        handler = self.handlers.get(getattr(record, "log_directory", ""))
+        if handler is not None:
+            handler.handle(record)
+
+
+class LoggerRegistry:
+    """One queue-backed logger per (name, directory) and one file handler per directory."""
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._loggers: dict[tuple[str, str], logging.Logger] = {}
+        self._handlers: dict[str, logging.Handler] = {}
+        self._listener: QueueListener | None = None
+        self._lock = threading.Lock()
+
+    def _build_handler(self, directory: str) -> logging.Handler:
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            logger.warning("File logging disabled (%s). Falling back to stdout logging.", e)
+            handler: logging.Handler = logging.StreamHandler()
+        else:
+            service_name = os.getcwd().split(os.sep)[-1]
+            handler = DailyFileHandler(directory, service_name, global_settings.log_rotate_days)
+        handler.setFormatter(_FORMATTER)
+        return handler
+
+    def _ensure_listener(self) -> None:
+        if self._listener is None:
+            self._listener = QueueListener(self._queue, _DirectoryRouter(self._handlers))
+            self._listener.start()
+
+    def get(self, class_name: str, log_dir: str | None = None) -> logging.Logger:
+        directory = os.path.abspath(log_dir or global_settings.log_dir)
+        name = class_name.split(".")[-1]
+        key = (name, directory)
+        log = self._loggers.get(key)
+        if log is not None and self._listener is not None:
+            return log
+        with self._lock:
+            self._ensure_listener()
+            log = self._loggers.get(key)
+            if log is None:
+                if directory not in self._handlers:
+                    self._handlers[directory] = self._build_handler(directory)
+                # Not registered with `logging.getLogger`: several directories share a name ("api").
+                log = logging.Logger(name, getattr(logging, global_settings.log_level.upper(), logging.INFO))
+                log.addHandler(_DirectoryQueueHandler(self._queue, directory))
+                # Still a child of the root logger, so records also reach root handlers (console)
+                # as before, unless `propagate` is turned off on the returned logger.
+                log.parent = logging.getLogger()
+                self._loggers[key] = log
+            return log
+
+    def stop(self) -> None:
+        """Write out queued records and close the files; the next `get` restarts the listener."""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+            for handler in self._handlers.values():
+                handler.flush()
+                if isinstance(handler, DailyFileHandler):
+                    handler.close()
+
+
+logger_registry = LoggerRegistry()
+atexit.register(logger_registry.stop)
+
+
+def create_log(class_name: str, log_dir: str | None = None) -> logging.Logger:
+    """Cached queue-backed logger writing to ``<log_dir>/<YYYYMMDD>/``.
+
+    `log_dir` is the *base* directory; when omitted, falls back to
+    `global_settings.log_dir` for legacy callers (transitional)."""
+    return logger_registry.get(class_name, log_dir)
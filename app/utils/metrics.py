@@ -0,0 +1,137 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Prometheus metrics (`METRICS_ENABLED`), served by the parent app at ``<API_ROOT>/metrics``.
+
+Under gunicorn every worker has its own counters. Set `PROMETHEUS_MULTIPROC_DIR`
+(an empty directory, cleared by `gunicorn.conf.py` on start) and each worker
+writes its samples to mmap'd files there; a scrape of any worker merges all of
+them, so counters and histograms are totals and gauges are summed over live
+workers. Pool gauges and the audit-log queue depth are sampled by each worker
+every `METRICS_REFRESH_SECONDS`. All helpers are no-ops when metrics are off.
+"""
+
+import asyncio
+import logging
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import generate_latest, multiprocess
+
+from ..core.config import global_settings
+
+logger = logging.getLogger(__name__)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = Counter(
+    "gwapi_http_requests_total", "HTTP requests by tenant, route and status.", ["tenant", "method", "route", "status"]
+)
+HTTP_DURATION = Histogram(
+    "gwapi_http_request_duration_seconds",
+    "HTTP request latency by tenant and route.",
+    ["tenant", "method", "route"],
+    buckets=_LATENCY_BUCKETS,
+)
+PROCEDURE_DURATION = Histogram(
+    "gwapi_db_procedure_duration_seconds",
+    "execute_procedure latency by database function and result status.",
+    ["tenant", "function", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+POOL_WAIT = Histogram(
+    "gwapi_db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ["tenant", "database"],
+    buckets=_WAIT_BUCKETS,
+)
+POOL_SIZE = Gauge("gwapi_db_pool_size", "Open pool connections.", ["tenant", "database"], multiprocess_mode="livesum")
+POOL_AVAILABLE = Gauge(
+    "gwapi_db_pool_available", "Idle pool connections.", ["tenant", "database"], multiprocess_mode="livesum"
+)
+POOL_WAITING = Gauge(
+    "gwapi_db_pool_waiting", "Requests queued for a connection.", ["tenant", "database"], multiprocess_mode="livesum"
+)
+LOG_QUEUE_DEPTH = Gauge(
+    "gwapi_audit_log_queue_depth", "Records waiting in the audit-log writer.", ["tenant"], multiprocess_mode="livesum"
+)
+CACHE_LOOKUPS = Counter(
+    "gwapi_cache_lookups_total", "Cache lookups by cache and result (hit/miss).", ["cache", "result"]
+)
+
+
+def enabled() -> bool:
+    return global_settings.metrics_enabled
+
+
+def observe_request(tenant: str, method: str, route: str, status: int, seconds: float) -> None:
+    if not enabled():
+        return
+    HTTP_REQUESTS.labels(tenant, method, route, str(status)).inc()
+    HTTP_DURATION.labels(tenant, method, route).observe(seconds)
+
+
+def observe_procedure(tenant: str, function: str, status: str, seconds: float) -> None:
+    if enabled():
+        PROCEDURE_DURATION.labels(tenant, function, status).observe(seconds)
+
+
+def observe_pool_wait(tenant: str, database: str, seconds: float) -> None:
+    if enabled():
+        POOL_WAIT.labels(tenant, database).observe(seconds)
+
+
+def count_cache_lookup(cache: str, hit: bool) -> None:
+    if enabled():
+        CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def _sample_pool(tenant_id: str, db_manager) -> None:
+    pool, database = db_manager.connection_pool, db_manager.dbname
+    stats = pool.get_stats() if pool is not None else {}
+    POOL_SIZE.labels(tenant_id, database).set(stats.get("pool_size", 0))
+    POOL_AVAILABLE.labels(tenant_id, database).set(stats.get("pool_available", 0))
+    POOL_WAITING.labels(tenant_id, database).set(stats.get("requests_waiting", 0))
+
+
+def sample_gauges(registry) -> None:
+    """Set this worker's pool and audit-queue gauges for every loaded tenant."""
+    for tenant in registry.all():
+        db_manager = tenant.db_manager
+        _sample_pool(tenant.id, db_manager)
+        if db_manager.has_separate_log_db:
+            _sample_pool(tenant.id, db_manager.log_db)
+        writer = db_manager.log_db.log_writer
+        LOG_QUEUE_DEPTH.labels(tenant.id).set(writer.stats()["queued"] if writer is not None else 0)
+
+
+async def _refresh_loop(registry, interval: float) -> None:
+    while True:
+        try:
+            sample_gauges(registry)
+        except Exception as exc:
+            logger.warning("metrics sampling failed: %s", exc)
+        await asyncio.sleep(interval)
+
+
+def start_metrics_refresh(registry) -> asyncio.Task | None:
+    """Schedule periodic gauge sampling, or None when metrics are off."""
+    if not enabled():
+        return None
+    interval = max(global_settings.metrics_refresh_seconds, 1.0)
+    return asyncio.get_running_loop().create_task(_refresh_loop(registry, interval), name="metrics-refresh")
+
+
+def render_metrics(registry=None) -> tuple[bytes, str]:
+    """Exposition text: the merged samples of every worker in multiprocess mode, else this process."""
+    if registry is not None:
+        sample_gauges(registry)
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        collector_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry)
+        return generate_latest(collector_registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,163 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Per-worker cache of routing network point sets (``gw_fct_getfeatures`` results).
+
+Point sets are stored array-backed (x/y/epsg plus the WGS84 lon/lat used for
+routing) instead of as ``Location`` models. Entries are keyed by
+``(tenant_id, schema, object_type, mapzone_type, mapzone_id)`` and dropped on
+TTL expiry, when ``gw_fct_featurechanges`` reports a new change set for the
+tenant, or through the admin invalidation endpoint (in every worker, through
+the tenant's `SharedGeneration` marker).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+import numpy as np
+
+from app.core.config import global_settings
+
+from .cache_generation import SharedGeneration, routing_generations
+from .geo import WGS84_EPSG, transform_points
+from .metrics import count_cache_lookup
+
+PointSetKey = tuple[str, str, str, str, str]
+
+
+@dataclass(frozen=True)
+class NetworkPointSet:
+    """``gw_fct_getfeatures`` result with coordinates as NumPy arrays."""
+
+    result: dict
+    x: np.ndarray
+    y: np.ndarray
+    epsg: np.ndarray
+    lon: np.ndarray
+    lat: np.ndarray
+
+    @classmethod
+    def from_result(cls, result: dict) -> "NetworkPointSet":
+        coordinates = [feature["coordinates"] for feature in result["body"]["data"]["features"]]
+        x = np.array([coord["x"] for coord in coordinates], dtype=np.float64)
+        y = np.array([coord["y"] for coord in coordinates], dtype=np.float64)
+        epsg = np.array([coord["epsg"] for coord in coordinates], dtype=np.int32)
+        lon, lat = transform_points(x, y, epsg, WGS84_EPSG)
+        return cls(result=result, x=x, y=y, epsg=epsg, lon=lon, lat=lat)
+
+    def __len__(self) -> int:
+        return int(self.x.size)
+
+    def valhalla_locations(self) -> list[dict[str, float]]:
+        return [{"lon": lon, "lat": lat} for lon, lat in zip(self.lon.tolist(), self.lat.tolist(), strict=True)]
+
+
+@dataclass
+class _TenantChanges:
+    since: date
+    signature: str | None = None
+    checked_at: float = field(default_factory=time.monotonic)
+
+
+def changes_signature(results: list[dict | None]) -> str:
+    """Stable hash of ``gw_fct_featurechanges`` results (one per action)."""
+    features = [((r or {}).get("body") or {}).get("feature") for r in results]
+    return hashlib.sha256(json.dumps(features, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class NetworkPointCache:
+    """TTL cache of `NetworkPointSet` per key, with per-tenant change tracking."""
+
+    def __init__(self, ttl_seconds: float, check_seconds: float, generations: SharedGeneration | None = None):
+        self.ttl_seconds = ttl_seconds
+        self.check_seconds = check_seconds
+        self.generations = generations
+        self._entries: dict[PointSetKey, tuple[float, int, NetworkPointSet]] = {}
+        self._changes: dict[str, _TenantChanges] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _generation(self, tenant_id: str) -> int:
+        return self.generations.current(tenant_id) if self.generations is not None else 0
+
+    def get(self, key: PointSetKey) -> NetworkPointSet | None:
+        if not self.enabled:
+            return None
+        generation = self._generation(key[0])
+        with self._lock:
+            point_set = self._lookup(key, generation)
+        count_cache_lookup("network_points", point_set is not None)
+        return point_set
+
+    def _lookup(self, key: PointSetKey, generation: int) -> NetworkPointSet | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, stored_generation, point_set = entry
+        if time.monotonic() - stored_at > self.ttl_seconds or stored_generation != generation:
+            del self._entries[key]
+            return None
+        return point_set
+
+    def set(self, key: PointSetKey, point_set: NetworkPointSet) -> None:
+        if not self.enabled:
+            return
+        generation = self._generation(key[0])
+        with self._lock:
+            self._entries[key] = (time.monotonic(), generation, point_set)
+            self._changes.setdefault(key[0], _TenantChanges(since=date.today()))
+
+    def changes_due(self, tenant_id: str) -> date | None:
+        """``lastFeeding`` date to poll with when the tenant's change check is due, else None."""
+        if self.check_seconds <= 0:
+            return None
+        with self._lock:
+            changes = self._changes.get(tenant_id)
+            if changes is None:
+                return None
+            if changes.signature is not None and time.monotonic() - changes.checked_at < self.check_seconds:
+                return None
+            changes.checked_at = time.monotonic()
+            return changes.since
+
+    def record_changes(self, tenant_id: str, signature: str) -> bool:
+        """Store the latest change signature; invalidate the tenant when it differs. Returns True if invalidated."""
+        with self._lock:
+            changes = self._changes.get(tenant_id)
+            if changes is None:
+                return False
+            previous = changes.signature
+            changes.signature = signature
+            if previous is None or previous == signature:
+                return False
+        self.invalidate(tenant_id)
+        return True
+
+    def invalidate(self, tenant_id: str | None = None) -> int:
+        """Drop all entries (or one tenant's). Returns how many point sets were removed."""
+        with self._lock:
+            keys = [key for key in self._entries if tenant_id is None or key[0] == tenant_id]
+            for key in keys:
+                del self._entries[key]
+            if tenant_id is None:
+                self._changes.clear()
+            else:
+                self._changes.pop(tenant_id, None)
+            return len(keys)
+
+
+network_point_cache = NetworkPointCache(
+    ttl_seconds=global_settings.routing_points_cache_ttl_seconds,
+    check_seconds=global_settings.routing_points_change_check_seconds,
+    generations=routing_generations,
+)
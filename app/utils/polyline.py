@@ -0,0 +1,69 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+"""
+
+from typing import Iterable, Sequence
+
+import numpy as np
+
+# Valhalla shapes use polyline encoding with 6 decimal digits of precision.
+POLYLINE_PRECISION = 1e6
+
+
+def _encode_value(value: int, out: list[str]) -> None:
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode(coordinates: Iterable[Sequence[float]]) -> str:
+    """
+    Encode ``[lon, lat]`` pairs as a Valhalla (precision 6) polyline shape.
+
+    Inverse of ``decode_array``.
+    """
+    out: list[str] = []
+    prev_lat = 0
+    prev_lon = 0
+    for lon, lat in coordinates:
+        lat_i = int(round(lat * POLYLINE_PRECISION))
+        lon_i = int(round(lon * POLYLINE_PRECISION))
+        _encode_value(lat_i - prev_lat, out)
+        _encode_value(lon_i - prev_lon, out)
+        prev_lat = lat_i
+        prev_lon = lon_i
+    return "".join(out)
+
+
+def decode_array(encoded: str, precision: float = POLYLINE_PRECISION) -> np.ndarray:
+    """
+    Decode a polyline shape into an ``(n, 2)`` float64 array of ``[lon, lat]``.
+
+    Vectorized: the whole string is read as one ``uint8`` buffer, varint
+    chunks are summed with ``np.add.reduceat`` and deltas are accumulated with
+    ``np.cumsum``, so no Python loop runs per character or per point.
+    """
+    if not encoded:
+        return np.empty((0, 2), dtype=np.float64)
+    chunks = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    is_last = chunks < 0x20
+    ends = np.flatnonzero(is_last)
+    if ends.size == 0 or ends[-1] != chunks.size - 1 or ends.size % 2:
+        raise ValueError("Truncated polyline")
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    # Position of every chunk inside its varint -> 5-bit shift.
+    shifts = 5 * (np.arange(chunks.size, dtype=np.int64) - np.repeat(starts, ends - starts + 1))
+    values = np.add.reduceat((chunks & 0x1F) << shifts, starts)
+    deltas = (values >> 1) ^ -(values & 1)
+    coords = np.cumsum(deltas.reshape(-1, 2), axis=0, dtype=np.int64)
+    out = np.empty(coords.shape, dtype=np.float64)
+    np.divide(coords[:, 1], precision, out=out[:, 0])
+    np.divide(coords[:, 0], precision, out=out[:, 1])
+    return out
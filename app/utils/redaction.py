@@ -0,0 +1,137 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Bounded-cost redaction of sensitive values in captured request/response bodies.
+
+`redact_json_prefix` scans JSON text token by token (no ``json.loads`` /
+``json.dumps`` round trip), replaces the value of every sensitive key with
+``***REDACTED***`` and stops once the output reaches the byte cap, so its cost
+depends on the cap and not on the body size. It also works on truncated
+prefixes that are not valid JSON.
+"""
+
+import re
+from typing import Any
+
+REDACTED = "***REDACTED***"
+SENSITIVE_FIELD_MARKERS = (
+    "password",
+    "passwd",
+    "pwd",
+    "secret",
+    "token",
+    "authorization",
+    "api_key",
+    "apikey",
+    "keycloak",
+    "db_password",
+    "client_secret",
+)
+_SENSITIVE_KEY_RE = re.compile("|".join(re.escape(marker) for marker in SENSITIVE_FIELD_MARKERS), re.IGNORECASE)
+
+# One JSON token per match: string (possibly unterminated at the end of a prefix),
+# structural character, whitespace run, or a literal run (numbers, true/false/null, garbage).
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*(?:"|\\?$)|[{}\[\]:,]|\s+|[^\s{}\[\]:,"]+', re.DOTALL)
+_REDACTED_TOKEN = f'"{REDACTED}"'
+# Input scanned per output byte; bounds the work spent skipping large redacted containers.
+_SCAN_FACTOR = 4
+
+
+def is_sensitive_key(key: str) -> bool:
+    return _SENSITIVE_KEY_RE.search(key) is not None
+
+
+def redact_object(value: Any) -> Any:
+    """Redact sensitive keys in an already-parsed structure (e.g. query parameters)."""
+    if isinstance(value, dict):
+        return {key: REDACTED if is_sensitive_key(str(key)) else redact_object(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact_object(item) for item in value]
+    return value
+
+
+def looks_like_json(text: str) -> bool:
+    stripped = text.lstrip()
+    return stripped[:1] in ("{", "[")
+
+
+class _Scanner:
+    """Token-level state: container stack, key position, and the value being skipped."""
+
+    __slots__ = ("stack", "expect_key", "key", "redact_next", "skip_depth")
+
+    def __init__(self):
+        self.stack: list[str] = []
+        self.expect_key = False
+        self.key: str | None = None
+        self.redact_next = False
+        self.skip_depth: int | None = None
+
+    def structural(self, token: str) -> None:
+        if token in "{[":
+            self.stack.append(token)
+            self.expect_key = token == "{"
+        elif token in "}]":
+            if self.stack:
+                self.stack.pop()
+            self.expect_key = False
+        elif token == ",":
+            self.expect_key = bool(self.stack) and self.stack[-1] == "{"
+        elif token == ":":
+            self.redact_next = self.key is not None and is_sensitive_key(self.key)
+            self.key = None
+            self.expect_key = False
+
+    def feed(self, token: str) -> str:
+        """Output for one token ('' while a redacted container is being skipped)."""
+        if self.skip_depth is not None:
+            if token in "{}[]" and len(token) == 1:
+                self.structural(token)
+            if len(self.stack) <= self.skip_depth:
+                self.skip_depth = None
+            return ""
+        if token.isspace():
+            return token
+        if len(token) == 1 and token in "{}[]:,":
+            if self.redact_next and token in "{[":
+                self.redact_next = False
+                self.skip_depth = len(self.stack)
+                self.structural(token)
+                return _REDACTED_TOKEN
+            self.structural(token)
+            return token
+        if self.redact_next:
+            self.redact_next = False
+            return _REDACTED_TOKEN
+        if self.expect_key and token.startswith('"'):
+            self.key = token.strip('"')
+        return token
+
+
+def redact_json_prefix(text: str, max_bytes: int) -> tuple[str, bool]:
+    """
+    Redact sensitive values in (possibly truncated) JSON text, emitting at most ~`max_bytes`.
+
+    Returns ``(output, cut)`` where `cut` is True when the output stopped before
+    the end of `text` (cap reached or scan budget spent).
+    """
+    budget = max(max_bytes, 1) * _SCAN_FACTOR
+    scanner = _Scanner()
+    out: list[str] = []
+    size = 0
+    consumed = 0
+    for match in _TOKEN_RE.finditer(text, 0, min(len(text), budget)):
+        piece = scanner.feed(match.group())
+        consumed = match.end()
+        if not piece:
+            continue
+        encoded = piece.encode("utf-8")
+        if size + len(encoded) > max_bytes:
+            out.append(encoded[: max_bytes - size].decode("utf-8", errors="ignore"))
+            return "".join(out), True
+        size += len(encoded)
+        out.append(piece)
+    return "".join(out), consumed < len(text)
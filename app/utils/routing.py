@@ -11,9 +11,10 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
 from urllib.parse import quote
-from typing import List, Tuple
-from ..schemas.routing.routing_models import Location
 from .body import create_body_dict
+from .network_points import NetworkPointSet
+from .polyline import decode_array
+from .tracing import trace_headers
 from ..db.execution import execute_procedure
 
 logger = logging.getLogger(__name__)
@@ -33,32 +34,16 @@ def _valhalla_http_session() -> requests.Session:
     adapter = HTTPAdapter(max_retries=retry)
     session = requests.Session()
     session.mount("https://", adapter)
+    session.headers.update(trace_headers())
     return session
 
 
 def decode(encoded):
     """
-    Decode Valhalla encoded polyline shape
+    Decode Valhalla encoded polyline shape into ``[lon, lat]`` lists
     https://valhalla.github.io/valhalla/decoding/#python
     """
-    inv = 1.0 / 1e6
-    decoded = []
-    previous = [0, 0]
-    i = 0
-    while i < len(encoded):
-        ll = [0, 0]
-        for j in [0, 1]:
-            shift = 0
-            byte = 0x20
-            while byte >= 0x20:
-                byte = ord(encoded[i]) - 63
-                i += 1
-                ll[j] |= (byte & 0x1F) << shift
-                shift += 5
-            ll[j] = previous[j] + (~(ll[j] >> 1) if ll[j] & 1 else (ll[j] >> 1))
-            previous[j] = ll[j]
-        decoded.append([float("%.6f" % (ll[1] * inv)), float("%.6f" % (ll[0] * inv))])
-    return decoded
+    return decode_array(encoded).tolist()
 
 
 def get_geojson_from_route(route, mode):
@@ -204,6 +189,44 @@ def get_valhalla_optimized_route(input_parameters):
         return response_json, {}
 
 
+def get_encoded_legs(trip_data):
+    """
+    Get the legs of an optimized route with their shapes left as encoded polylines (precision 6)
+    """
+    legs = []
+    for leg in (trip_data or {}).get("legs") or []:
+        summary = leg.get("summary") or {}
+        legs.append(
+            {
+                "shape": leg.get("shape", ""),
+                "distance": summary.get("length"),
+                "duration": summary.get("time"),
+                "fromIndex": leg.get("from_index"),
+                "toIndex": leg.get("to_index"),
+            }
+        )
+    return legs
+
+
+def get_valhalla_matrix(input_parameters):
+    """
+    Get the cost matrix (sources_to_targets) from Valhalla API
+    """
+    base_url = "https://valhalla1.openstreetmap.de/sources_to_targets"
+    json_string = json.dumps(input_parameters).replace(" ", "")
+    encoded_json = quote(json_string, safe="[],:")
+    url = f"{base_url}?json={encoded_json}"
+    with _valhalla_http_session() as session:
+        response = session.get(url, timeout=(_VALHALLA_CONNECT_TIMEOUT_SECONDS, _VALHALLA_READ_TIMEOUT_SECONDS))
+    if response.status_code != 200:
+        return response, []
+    response_json = response.json()
+    rows = response_json.get("sources_to_targets")
+    if not isinstance(rows, list):
+        return response_json, []
+    return response_json, rows
+
+
 def get_maneuvers(valhalla_response):
     """
     Get the maneuvers from the Valhalla response
@@ -217,23 +240,13 @@ def get_maneuvers(valhalla_response):
 
 async def get_network_points(
     object_type, mapzone_type, mapzone_id, log, db_manager, schema, api_version=None
-) -> Tuple[dict, List[Location]]:
-    points = []
-
-    # Get the network points from the database
+) -> NetworkPointSet | None:
+    """Network points of a mapzone from ``gw_fct_getfeatures``, reprojected to WGS84 in one batch."""
     body = create_body_dict(extras={"sysType": object_type, "mapzoneType": mapzone_type, "mapzoneId": mapzone_id})
 
     result = await execute_procedure(
         log, db_manager, "gw_fct_getfeatures", body, schema=schema, api_version=api_version
     )
     if not result:
-        return {}, []
-
-    points_data = result["body"]["data"]["features"]
-    for point in points_data:
-        point_coordinates = point["coordinates"]
-        points.append(
-            Location(x=point_coordinates["x"], y=point_coordinates["y"], epsg=point_coordinates["epsg"], street=None)
-        )
-
-    return result, points
+        return None
+    return NetworkPointSet.from_result(result)
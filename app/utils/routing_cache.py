@@ -0,0 +1,187 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Bounded LRU + TTL cache of optimized-route responses.
+
+Keys are built from the tenant and its routing backend, the ordered network
+point set, the initial/final points snapped to a metric grid, ``costing``,
+``units`` and ``language``. Entries live in memory and, when ``ROUTING_CACHE_PATH`` is set, in a local SQLite
+file shared by all workers on the host so they survive worker recycling.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Mapping, Sequence
+
+from app.core.config import global_settings
+from app.utils.metrics import count_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+_METERS_PER_DEGREE = 111_320.0
+
+
+def _snap(lon: float, lat: float, grid_meters: float) -> tuple[float, float]:
+    """Snap a WGS84 point to a ~``grid_meters`` grid (lon step shrinks with latitude)."""
+    if grid_meters <= 0:
+        return round(lon, 6), round(lat, 6)
+    lat_step = grid_meters / _METERS_PER_DEGREE
+    lat_q = round(lat / lat_step) * lat_step
+    lon_step = grid_meters / (_METERS_PER_DEGREE * max(math.cos(math.radians(lat_q)), 1e-6))
+    lon_q = round(lon / lon_step) * lon_step
+    return round(lon_q, 7), round(lat_q, 7)
+
+
+def route_cache_key(
+    tenant_id: str,
+    locations: Sequence[Mapping[str, float]],
+    *,
+    backend: str,
+    costing: str,
+    units: str,
+    language: str,
+    grid_meters: float,
+) -> str:
+    """
+    Cache key for a Valhalla ``optimized_route`` request.
+
+    ``locations`` is ``[initial, *network_points, final]`` in WGS84. Network
+    points are hashed exactly (6 decimals); only the ad-hoc endpoints are snapped.
+    """
+    first, *middle, last = locations
+    payload = {
+        "tenant": tenant_id,
+        "backend": backend,
+        "start": _snap(first["lon"], first["lat"], grid_meters),
+        "end": _snap(last["lon"], last["lat"], grid_meters),
+        "points": [(round(loc["lon"], 6), round(loc["lat"], 6)) for loc in middle],
+        "costing": costing,
+        "units": units,
+        "language": language,
+    }
+    return hashlib.sha256(json.dumps(payload, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class RouteCache:
+    """In-memory LRU with per-entry TTL, optionally backed by a SQLite file."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, path: str | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self._open_store(path)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def _open_store(self, path: str) -> None:
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(path, timeout=1.0, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS routes (key TEXT PRIMARY KEY, expires_at REAL, response TEXT)")
+            db.execute("DELETE FROM routes WHERE expires_at < ?", (time.time(),))
+            self._db = db
+        except sqlite3.Error:
+            logger.warning("Route cache store %s unavailable; using memory only", path, exc_info=True)
+            self._db = None
+
+    def get(self, key: str) -> dict | None:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    count_cache_lookup("routes", True)
+                    return response
+                del self._entries[key]
+            stored = self._load(key, now)
+            if stored is None:
+                self.misses += 1
+                count_cache_lookup("routes", False)
+                return None
+            self._remember(key, *stored)
+            self.hits += 1
+            count_cache_lookup("routes", True)
+            return stored[1]
+
+    def set(self, key: str, response: dict) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, response)
+            self._store(key, expires_at, response)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM routes")
+                except sqlite3.Error:
+                    logger.warning("Route cache store clear failed", exc_info=True)
+
+    def _remember(self, key: str, expires_at: float, response: dict) -> None:
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str, now: float) -> tuple[float, dict] | None:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT expires_at, response FROM routes WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        except sqlite3.Error:
+            logger.warning("Route cache store read failed", exc_info=True)
+            return None
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _store(self, key: str, expires_at: float, response: dict) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO routes (key, expires_at, response) VALUES (?, ?, ?)",
+                (key, expires_at, json.dumps(response, separators=(",", ":"))),
+            )
+            # Keep the file bounded: drop expired rows and anything beyond the newest max_entries.
+            self._db.execute(
+                "DELETE FROM routes WHERE expires_at < ? OR key NOT IN "
+                "(SELECT key FROM routes ORDER BY expires_at DESC LIMIT ?)",
+                (time.time(), self.max_entries),
+            )
+        except sqlite3.Error:
+            logger.warning("Route cache store write failed", exc_info=True)
+
+
+route_cache = RouteCache(
+    max_entries=global_settings.routing_cache_max_entries,
+    ttl_seconds=global_settings.routing_cache_ttl_seconds,
+    path=global_settings.routing_cache_path,
+)
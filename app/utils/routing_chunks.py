@@ -0,0 +1,150 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Split large optimized-route requests into spatial chunks and stitch the results.
+
+Network points are clustered with k-means on locally projected coordinates
+(oversized clusters are bisected), clusters are ordered from the initial to the
+final point, and each chunk becomes an independent open-path request whose
+first location is the previous chunk's exit point. Chunks can then be solved
+concurrently and their trips concatenated into one.
+"""
+
+import math
+from typing import Sequence
+
+import numpy as np
+
+from .routing_solver import solve_path_order
+
+_EARTH_RADIUS_M = 6_371_008.8
+_KMEANS_ITERATIONS = 25
+
+
+def _project(lons: Sequence[float], lats: Sequence[float]) -> tuple[np.ndarray, np.ndarray]:
+    """Equirectangular projection in meters around the mean latitude (fine at mapzone scale)."""
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    return lon * math.cos(float(lat.mean())) * _EARTH_RADIUS_M, lat * _EARTH_RADIUS_M
+
+
+def kmeans(points: np.ndarray, k: int, iterations: int = _KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means with k-means++ seeding. Returns a label per row of ``points``."""
+    rng = np.random.default_rng(seed)
+    n = points.shape[0]
+    k = max(1, min(k, n))
+    centers = np.empty((k, points.shape[1]), dtype=np.float64)
+    centers[0] = points[rng.integers(n)]
+    nearest = ((points - centers[0]) ** 2).sum(axis=1)
+    for c in range(1, k):
+        total = nearest.sum()
+        idx = rng.choice(n, p=nearest / total) if total > 0 else rng.integers(n)
+        centers[c] = points[idx]
+        nearest = np.minimum(nearest, ((points - centers[c]) ** 2).sum(axis=1))
+
+    labels = np.zeros(n, dtype=np.intp)
+    for iteration in range(iterations):
+        dist = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        new_labels = dist.argmin(axis=1)
+        if iteration > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = points[labels == c]
+            if members.size:
+                centers[c] = members.mean(axis=0)
+    return labels
+
+
+def _bisect(indices: np.ndarray, points: np.ndarray, max_size: int) -> list[np.ndarray]:
+    """Split a cluster at the median of its widest axis until every part fits ``max_size``."""
+    if indices.size <= max_size:
+        return [indices]
+    sub = points[indices]
+    axis = int(np.argmax(np.ptp(sub, axis=0)))
+    ranked = indices[np.argsort(sub[:, axis], kind="stable")]
+    half = ranked.size // 2
+    return _bisect(ranked[:half], points, max_size) + _bisect(ranked[half:], points, max_size)
+
+
+def plan_chunks(lons: Sequence[float], lats: Sequence[float], max_points: int) -> list[list[int]]:
+    """
+    Chunk ``[initial, *network, final]`` into open-path requests of at most ``max_points`` network points.
+
+    Returns location index lists. Chunk ``i`` starts at the exit point of chunk
+    ``i-1`` (the initial point for the first chunk) and ends at its own exit
+    point (the final point for the last chunk), so consecutive chunks share
+    exactly one location and concatenating their trips visits every point once.
+    """
+    n = len(lons)
+    x, y = _project(lons, lats)
+    xy = np.column_stack((x, y))
+    network = np.arange(1, n - 1)
+    labels = kmeans(xy[network], math.ceil(network.size / max_points))
+    groups = [part for label in np.unique(labels) for part in _bisect(network[labels == label], xy, max_points)]
+    centroids = np.array([xy[group].mean(axis=0) for group in groups])
+
+    # Visit the clusters in the order that best connects the initial and final points.
+    anchors = np.vstack((xy[0], centroids, xy[n - 1]))
+    cost = np.sqrt(((anchors[:, None, :] - anchors[None, :, :]) ** 2).sum(axis=2))
+    sequence = [groups[i - 1] for i in solve_path_order(cost)[1:-1]]
+
+    chunks = []
+    entry = 0
+    for pos, group in enumerate(sequence):
+        if pos + 1 < len(sequence):
+            target = xy[sequence[pos + 1]].mean(axis=0)
+            exit_point = int(group[np.argmin(((xy[group] - target) ** 2).sum(axis=1))])
+            middle = [int(i) for i in group if i != exit_point]
+        else:
+            exit_point = n - 1
+            middle = [int(i) for i in group]
+        chunks.append([entry, *middle, exit_point])
+        entry = exit_point
+    return chunks
+
+
+def stitch_trips(responses: Sequence[dict], chunks: Sequence[Sequence[int]]) -> dict:
+    """Merge per-chunk Valhalla ``optimized_route`` responses into a single trip response."""
+    locations: list[dict] = []
+    legs: list[dict] = []
+    length = 0.0
+    duration = 0.0
+    bounds: dict[str, list[float]] = {"min_lat": [], "min_lon": [], "max_lat": [], "max_lon": []}
+    for chunk_pos, (response, chunk) in enumerate(zip(responses, chunks, strict=True)):
+        trip = response.get("trip") or {}
+        chunk_locations = trip.get("locations") or []
+        for loc_pos, location in enumerate(chunk_locations):
+            if chunk_pos > 0 and loc_pos == 0:
+                continue  # shared with the previous chunk's exit point
+            original = location.get("original_index", loc_pos)
+            locations.append({**location, "original_index": chunk[original]})
+        for leg in trip.get("legs") or []:
+            merged = dict(leg)
+            if "from_index" in leg:
+                merged["from_index"] = len(legs)
+                merged["to_index"] = len(legs) + 1
+            legs.append(merged)
+        summary = trip.get("summary") or {}
+        length += summary.get("length") or 0.0
+        duration += summary.get("time") or 0.0
+        for key, values in bounds.items():
+            if summary.get(key) is not None:
+                values.append(summary[key])
+
+    first_trip = (responses[0].get("trip") or {}) if responses else {}
+    merged_summary = {"length": round(length, 3), "time": round(duration, 3)}
+    for key, values in bounds.items():
+        if values:
+            merged_summary[key] = min(values) if key.startswith("min") else max(values)
+    return {
+        "trip": {
+            **{k: v for k, v in first_trip.items() if k not in ("locations", "legs", "summary")},
+            "locations": locations,
+            "legs": legs,
+            "summary": merged_summary,
+        }
+    }
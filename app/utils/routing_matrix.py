@@ -0,0 +1,132 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Cache of network point-to-point cost matrices (Valhalla ``sources_to_targets``).
+
+The matrix over a mapzone's network points only changes when the point set
+does, so it is kept per ``(tenant, schema, mapzone_type, mapzone_id,
+object_type, costing)`` scope and recomputed lazily when the fingerprint of the
+point set returned by ``gw_fct_getfeatures`` changes. A request then only needs
+the O(n) rows/columns for its ad-hoc start and end points. Entries stored
+before the tenant's `SharedGeneration` marker was bumped (admin invalidation in
+any worker) are misses.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Mapping, Sequence
+
+import numpy as np
+
+from .cache_generation import SharedGeneration, routing_generations
+from .metrics import count_cache_lookup
+
+# Cost used for pairs Valhalla could not connect; large but finite so 2-opt deltas stay defined.
+UNREACHABLE_COST = 1e9
+_MAX_SCOPES = 128
+
+MatrixScope = tuple[str, ...]
+
+
+def points_fingerprint(locations: Sequence[Mapping[str, float]]) -> str:
+    """Order-sensitive hash of WGS84 ``{"lon", "lat"}`` points (6 decimals)."""
+    coords = np.array([(loc["lon"], loc["lat"]) for loc in locations], dtype=np.float64).reshape(-1, 2)
+    return hashlib.sha256(np.round(coords * 1e6).astype(np.int64).tobytes()).hexdigest()
+
+
+def matrix_from_rows(rows: Sequence[Sequence[Mapping | None]], metric: str = "time") -> np.ndarray:
+    """Valhalla ``sources_to_targets`` rows to a dense float64 matrix."""
+    n_rows = len(rows)
+    n_cols = len(rows[0]) if n_rows else 0
+    out = np.full((n_rows, n_cols), UNREACHABLE_COST, dtype=np.float64)
+    for i, row in enumerate(rows):
+        for j, cell in enumerate(row):
+            value = cell.get(metric) if cell else None
+            if value is not None:
+                out[i, j] = value
+    return out
+
+
+def assemble_cost(
+    network: np.ndarray,
+    start_to_targets: np.ndarray,
+    network_to_end: np.ndarray,
+) -> np.ndarray:
+    """
+    Full ``(n+2)x(n+2)`` cost matrix: index 0 is the start, ``1..n`` the network, ``n+1`` the end.
+
+    ``start_to_targets`` is the start row over ``[*network, end]``;
+    ``network_to_end`` is the column from every network point to the end.
+    """
+    n = network.shape[0]
+    cost = np.full((n + 2, n + 2), UNREACHABLE_COST, dtype=np.float64)
+    cost[1 : n + 1, 1 : n + 1] = network
+    cost[0, 1:] = start_to_targets
+    cost[1 : n + 1, n + 1] = network_to_end
+    np.fill_diagonal(cost, 0.0)
+    return cost
+
+
+@dataclass(frozen=True)
+class MatrixEntry:
+    fingerprint: str
+    matrix: np.ndarray
+    created_at: float
+    generation: int = 0
+
+
+class MatrixCache:
+    """Bounded per-scope store of network cost matrices (per worker)."""
+
+    def __init__(self, max_scopes: int = _MAX_SCOPES, generations: SharedGeneration | None = None):
+        self.max_scopes = max_scopes
+        self.generations = generations
+        self._entries: OrderedDict[MatrixScope, MatrixEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _generation(self, scope: MatrixScope) -> int:
+        return self.generations.current(scope[0]) if self.generations is not None else 0
+
+    def get(self, scope: MatrixScope, fingerprint: str) -> np.ndarray | None:
+        """Cached matrix for ``scope`` if its point set still matches ``fingerprint``."""
+        generation = self._generation(scope)
+        with self._lock:
+            matrix = self._lookup(scope, fingerprint, generation)
+        count_cache_lookup("routing_matrix", matrix is not None)
+        return matrix
+
+    def _lookup(self, scope: MatrixScope, fingerprint: str, generation: int) -> np.ndarray | None:
+        entry = self._entries.get(scope)
+        if entry is None:
+            return None
+        if entry.fingerprint != fingerprint or entry.generation != generation:
+            # Point set changed (features added/moved/removed) or invalidated: recompute lazily.
+            del self._entries[scope]
+            return None
+        self._entries.move_to_end(scope)
+        return entry.matrix
+
+    def set(self, scope: MatrixScope, fingerprint: str, matrix: np.ndarray) -> None:
+        generation = self._generation(scope)
+        with self._lock:
+            self._entries[scope] = MatrixEntry(fingerprint, matrix, time.time(), generation)
+            self._entries.move_to_end(scope)
+            while len(self._entries) > self.max_scopes:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tenant_id: str | None = None) -> int:
+        """Drop all entries (or one tenant's). Returns how many were removed."""
+        with self._lock:
+            keys = [key for key in self._entries if tenant_id is None or key[0] == tenant_id]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+
+matrix_cache = MatrixCache(generations=routing_generations)
@@ -0,0 +1,284 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Local (offline) route optimizer used when Valhalla is unavailable or when a
+tenant selects ``ROUTING_BACKEND=local``.
+
+Solves the open-path TSP Valhalla's ``optimized_route`` solves: the first and
+last locations are fixed, intermediate locations are reordered. Construction
+is nearest-neighbor, improved by 2-opt and Or-opt moves over a NumPy cost
+matrix. The matrix may be asymmetric (Valhalla times: one-way streets, turn
+costs), so a reversed segment is priced with its reversed interior edges, not
+only the edges at its ends. The output mimics the Valhalla response (``trip.legs[*].shape``,
+maneuvers, summary) with straight-line legs.
+"""
+
+import math
+import time
+from typing import Sequence
+
+import numpy as np
+
+from .polyline import encode
+
+_EARTH_RADIUS_KM = 6371.0088
+_KM_PER_MILE = 1.609344
+_IMPROVEMENT_EPSILON = 1e-9
+
+# Average straight-line travel speeds (km/h) per Valhalla costing.
+_COSTING_SPEED_KMH = {"auto": 30.0, "bicycle": 15.0, "pedestrian": 5.0}
+_COSTING_TRAVEL = {
+    "auto": ("drive", "car"),
+    "bicycle": ("bicycle", "road"),
+    "pedestrian": ("pedestrian", "foot"),
+}
+
+# Valhalla maneuver types (see valhalla/odin/maneuver.h).
+_MANEUVER_START = 1
+_MANEUVER_DESTINATION = 4
+
+
+def haversine_matrix(lons: Sequence[float], lats: Sequence[float]) -> np.ndarray:
+    """Great-circle distance matrix in kilometers for WGS84 ``lons``/``lats``."""
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    cos_lat = np.cos(lat)
+    a = np.sin(dlat / 2.0) ** 2 + cos_lat[:, None] * cos_lat[None, :] * np.sin(dlon / 2.0) ** 2
+    return 2.0 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def path_cost(order: Sequence[int], cost: np.ndarray) -> float:
+    route = np.asarray(order, dtype=np.intp)
+    if route.size < 2:
+        return 0.0
+    return float(cost[route[:-1], route[1:]].sum())
+
+
+def nearest_neighbor_order(cost: np.ndarray) -> np.ndarray:
+    """Greedy path from node 0 through every intermediate node, ending at node n-1."""
+    n = cost.shape[0]
+    if n <= 2:
+        return np.arange(n, dtype=np.intp)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    visited[n - 1] = True
+    order = np.empty(n, dtype=np.intp)
+    order[0] = 0
+    order[n - 1] = n - 1
+    current = 0
+    for pos in range(1, n - 1):
+        row = np.where(visited, np.inf, cost[current])
+        current = int(np.argmin(row))
+        visited[current] = True
+        order[pos] = current
+    return order
+
+
+def _reversal_prefix(route: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    """``p[j] - p[i]``: cost change of traversing ``route[i:j+1]`` backwards (0 for symmetric costs)."""
+    forward = cost[route[:-1], route[1:]]
+    backward = cost[route[1:], route[:-1]]
+    return np.concatenate(([0.0], np.cumsum(backward - forward)))
+
+
+def two_opt(order: np.ndarray, cost: np.ndarray, deadline: float) -> tuple[np.ndarray, bool]:
+    """Segment reversal moves; endpoints stay fixed. Returns (order, improved)."""
+    route = order.copy()
+    n = route.size
+    improved_any = False
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        reversal = _reversal_prefix(route, cost)
+        for i in range(1, n - 2):
+            a = route[i - 1]
+            b = route[i]
+            c = route[i + 1 : n - 1]
+            e = route[i + 2 : n]
+            delta = cost[a, c] + cost[b, e] - cost[a, b] - cost[c, e] + reversal[i + 1 : n - 1] - reversal[i]
+            k = int(np.argmin(delta))
+            if delta[k] < -_IMPROVEMENT_EPSILON:
+                j = i + 1 + k
+                route[i : j + 1] = route[i : j + 1][::-1].copy()
+                reversal = _reversal_prefix(route, cost)
+                improved = improved_any = True
+            if time.monotonic() >= deadline:
+                break
+    return route, improved_any
+
+
+def _or_opt_move(route: np.ndarray, cost: np.ndarray, i: int, seg_len: int) -> np.ndarray | None:
+    """Best relocation of ``route[i:i+seg_len]`` (optionally reversed), or None."""
+    prev_node = route[i - 1]
+    first = route[i]
+    last = route[i + seg_len - 1]
+    next_node = route[i + seg_len]
+    gain = cost[prev_node, first] + cost[last, next_node] - cost[prev_node, next_node]
+    rest = np.concatenate((route[:i], route[i + seg_len :]))
+    u = rest[:-1]
+    v = rest[1:]
+    segment = route[i : i + seg_len]
+    reversed_interior = cost[segment[1:], segment[:-1]].sum() - cost[segment[:-1], segment[1:]].sum()
+    add_fwd = cost[u, first] + cost[last, v] - cost[u, v]
+    add_rev = cost[u, last] + cost[first, v] - cost[u, v] + reversed_interior
+    k_fwd = int(np.argmin(add_fwd))
+    k_rev = int(np.argmin(add_rev))
+    if add_fwd[k_fwd] <= add_rev[k_rev]:
+        k, best, reverse = k_fwd, add_fwd[k_fwd], False
+    else:
+        k, best, reverse = k_rev, add_rev[k_rev], True
+    # Reinserting at the edge the segment was cut from is a no-op.
+    if (k == i - 1 and not reverse) or best >= gain - _IMPROVEMENT_EPSILON:
+        return None
+    if reverse:
+        segment = segment[::-1]
+    return np.concatenate((rest[: k + 1], segment, rest[k + 1 :]))
+
+
+def or_opt(order: np.ndarray, cost: np.ndarray, deadline: float, max_segment: int = 3) -> tuple[np.ndarray, bool]:
+    """Relocate chains of 1..``max_segment`` nodes; endpoints stay fixed."""
+    route = order.copy()
+    n = route.size
+    improved_any = False
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for seg_len in range(1, max_segment + 1):
+            i = 1
+            while i + seg_len <= n - 1:
+                moved = _or_opt_move(route, cost, i, seg_len)
+                if moved is not None:
+                    route = moved
+                    improved = improved_any = True
+                i += 1
+                if time.monotonic() >= deadline:
+                    return route, improved_any
+    return route, improved_any
+
+
+def solve_path_order(cost: np.ndarray, time_budget_seconds: float = 2.0) -> list[int]:
+    """Order for visiting every node from 0 to n-1 minimizing ``cost`` (heuristic)."""
+    n = cost.shape[0]
+    if n <= 3:
+        return list(range(n))
+    deadline = time.monotonic() + max(time_budget_seconds, 0.0)
+    route = nearest_neighbor_order(cost)
+    while time.monotonic() < deadline:
+        route, improved_2opt = two_opt(route, cost, deadline)
+        route, improved_oropt = or_opt(route, cost, deadline)
+        if not (improved_2opt or improved_oropt):
+            break
+    return [int(node) for node in route]
+
+
+def _bearing(lon1: float, lat1: float, lon2: float, lat2: float) -> int:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dlon = math.radians(lon2 - lon1)
+    x = math.sin(dlon) * math.cos(phi2)
+    y = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlon)
+    return int(round(math.degrees(math.atan2(x, y)))) % 360
+
+
+def build_trip(
+    lons: Sequence[float],
+    lats: Sequence[float],
+    order: Sequence[int],
+    leg_km: Sequence[float],
+    *,
+    costing: str = "auto",
+    units: str = "kilometers",
+    language: str = "en-US",
+) -> dict:
+    """Build a Valhalla-shaped ``optimized_route`` response with straight-line legs."""
+    speed_kmh = _COSTING_SPEED_KMH.get(costing, _COSTING_SPEED_KMH["auto"])
+    travel_mode, travel_type = _COSTING_TRAVEL.get(costing, _COSTING_TRAVEL["auto"])
+    unit_factor = 1.0 / _KM_PER_MILE if units == "miles" else 1.0
+
+    locations = [
+        {"type": "break", "lon": float(lons[idx]), "lat": float(lats[idx]), "original_index": int(idx)} for idx in order
+    ]
+    legs = []
+    total_length = 0.0
+    total_time = 0.0
+    for leg_index, (src, dst) in enumerate(zip(order[:-1], order[1:], strict=True)):
+        length = round(float(leg_km[leg_index]) * unit_factor, 3)
+        seconds = round(float(leg_km[leg_index]) / speed_kmh * 3600.0, 3)
+        total_length += length
+        total_time += seconds
+        shape = encode([(lons[src], lats[src]), (lons[dst], lats[dst])])
+        maneuvers = [
+            {
+                "type": _MANEUVER_START,
+                "instruction": f"Head to stop {leg_index + 1} in a straight line.",
+                "time": seconds,
+                "length": length,
+                "begin_shape_index": 0,
+                "end_shape_index": 1,
+                "travel_mode": travel_mode,
+                "travel_type": travel_type,
+                "bearing_after": _bearing(lons[src], lats[src], lons[dst], lats[dst]),
+            },
+            {
+                "type": _MANEUVER_DESTINATION,
+                "instruction": "You have arrived at your destination.",
+                "time": 0.0,
+                "length": 0.0,
+                "begin_shape_index": 1,
+                "end_shape_index": 1,
+                "travel_mode": travel_mode,
+                "travel_type": travel_type,
+            },
+        ]
+        legs.append(
+            {
+                "shape": shape,
+                "summary": {"length": length, "time": seconds},
+                "maneuvers": maneuvers,
+                "from_index": leg_index,
+                "to_index": leg_index + 1,
+            }
+        )
+
+    return {
+        "trip": {
+            "locations": locations,
+            "legs": legs,
+            "summary": {
+                "length": round(total_length, 3),
+                "time": round(total_time, 3),
+                "min_lat": float(min(lats)),
+                "min_lon": float(min(lons)),
+                "max_lat": float(max(lats)),
+                "max_lon": float(max(lons)),
+            },
+            "status_message": "Found route between points (local straight-line solver)",
+            "status": 0,
+            "units": units,
+            "language": language,
+        }
+    }
+
+
+def solve_optimized_route(
+    lons: Sequence[float],
+    lats: Sequence[float],
+    *,
+    costing: str = "auto",
+    units: str = "kilometers",
+    language: str = "en-US",
+    time_budget_seconds: float = 2.0,
+) -> dict:
+    """Offline equivalent of Valhalla ``optimized_route`` over WGS84 locations."""
+    if len(lons) < 2:
+        raise ValueError("At least two locations are required")
+    dist = haversine_matrix(lons, lats)
+    order = solve_path_order(dist, time_budget_seconds=time_budget_seconds)
+    route = np.asarray(order, dtype=np.intp)
+    leg_km = dist[route[:-1], route[1:]]
+    return build_trip(lons, lats, order, leg_km, costing=costing, units=units, language=language)
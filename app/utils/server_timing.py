@@ -0,0 +1,119 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Request-scoped phase timers for the `Server-Timing` header and the audit record.
+
+`RequestLoggingMiddleware` puts a `PhaseTimer` in `PHASE_TIMER_CTX` for every
+request; code on the request path charges its time to a named phase with
+`phase()` or `record_phase()`. Phases hold self time: a nested phase pauses its
+parent (pool wait inside schema validation is charged to ``pool`` only), so the
+phases add up to at most ``total``. Phase names:
+
+    auth       get_current_user (bcrypt check or Keycloak token)
+    schema     DatabaseManager.validate_schema
+    pool       waiting for a pooled connection
+    role       SET ROLE
+    db         gw_fct_* / SQL execution and commit
+    version    get_db_version
+    validate   request parsing, Pydantic validation and other dependencies
+    app        endpoint and service code not covered by another phase
+    serialize  response model validation and JSON encoding
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Header order; unknown phases follow in the order they were first recorded.
+PHASES = ("auth", "schema", "pool", "role", "db", "version", "validate", "app", "serialize")
+
+
+class _Entry:
+    __slots__ = ("name", "since")
+
+    def __init__(self, name: str, since: float):
+        self.name = name
+        self.since = since
+
+
+class PhaseTimer:
+    """Self time per phase (seconds) of one request."""
+
+    __slots__ = ("phases", "_stack")
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self._stack: list[_Entry] = []
+
+    def _charge_current(self, now: float) -> None:
+        if self._stack:
+            entry = self._stack[-1]
+            self.phases[entry.name] = self.phases.get(entry.name, 0.0) + now - entry.since
+            entry.since = now
+
+    def enter(self, name: str) -> _Entry:
+        now = time.monotonic()
+        self._charge_current(now)
+        entry = _Entry(name, now)
+        self._stack.append(entry)
+        return entry
+
+    def exit(self, entry: _Entry) -> None:
+        now = time.monotonic()
+        self._charge_current(now)
+        # Identity removal: concurrent tasks of one request may exit out of order.
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index] is entry:
+                del self._stack[index]
+                break
+        if self._stack:
+            self._stack[-1].since = now
+
+    def switch(self, name: str) -> None:
+        """Charge the current phase and continue timing under `name`."""
+        if self._stack:
+            self._charge_current(time.monotonic())
+            self._stack[-1].name = name
+
+    def add(self, name: str, seconds: float) -> None:
+        """Charge an already measured duration to `name`, taking it out of the current phase."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        if self._stack:
+            self._stack[-1].since += seconds
+
+    def as_ms(self, total_seconds: float | None = None) -> dict[str, float]:
+        ordered = sorted(self.phases, key=lambda name: PHASES.index(name) if name in PHASES else len(PHASES))
+        timings = {name: round(self.phases[name] * 1000, 2) for name in ordered}
+        if total_seconds is not None:
+            timings["total"] = round(total_seconds * 1000, 2)
+        return timings
+
+    def header(self, total_seconds: float) -> str:
+        """`Server-Timing` value, e.g. ``auth;dur=0.4, db;dur=12.1, total;dur=14.0``."""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.as_ms(total_seconds).items())
+
+
+PHASE_TIMER_CTX: contextvars.ContextVar[PhaseTimer | None] = contextvars.ContextVar("phase_timer", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    """Charge the enclosed block to `name` (no-op outside a request)."""
+    timer = PHASE_TIMER_CTX.get()
+    if timer is None:
+        yield
+        return
+    entry = timer.enter(name)
+    try:
+        yield
+    finally:
+        timer.exit(entry)
+
+
+def record_phase(name: str, seconds: float) -> None:
+    timer = PHASE_TIMER_CTX.get()
+    if timer is not None:
+        timer.add(name, seconds)
@@ -0,0 +1,221 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+OTLP-JSON file export of finished traces (see `tracing`).
+
+Kept traces are queued and written by one thread per worker, batched every
+`TRACE_EXPORT_FLUSH_SECONDS`. Each line of ``<trace_dir>/traces-<pid>.jsonl`` is
+one OTLP ``ExportTraceServiceRequest`` in JSON, the format read by the
+OpenTelemetry Collector's ``otlpjsonfile`` receiver. Past `TRACE_FILE_MAX_BYTES`
+the file is renamed to ``traces-<pid>-<timestamp>.jsonl`` (complete, safe to ship)
+and only the newest `TRACE_FILE_KEEP` rotated files are kept. When the queue is
+full spans are dropped and counted rather than blocking a request.
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from datetime import datetime
+from importlib.metadata import version as pkg_version
+
+from ..core.config import global_settings
+
+logger = logging.getLogger(__name__)
+
+_QUEUE_SIZE = 10000
+_BATCH_SPANS = 2048
+_STATUS_UNSET = 0
+_STATUS_ERROR = 2
+
+
+def _value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(values: dict) -> list[dict]:
+    return [{"key": key, "value": _value(value)} for key, value in values.items() if value is not None]
+
+
+def _encode_span(span) -> dict:
+    encoded = {
+        "traceId": span.trace.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _attributes(span.attributes),
+        "status": {"code": _STATUS_ERROR, "message": span.error} if span.error else {"code": _STATUS_UNSET},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+
+def encode_spans(spans: list, resource: dict) -> dict:
+    """One OTLP ``ExportTraceServiceRequest`` (JSON mapping) holding `spans`."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _attributes(resource)},
+                "scopeSpans": [{"scope": {"name": "giswater-api"}, "spans": [_encode_span(s) for s in spans]}],
+            }
+        ]
+    }
+
+
+def _resource() -> dict:
+    return {
+        "service.name": "giswater-api",
+        "service.version": pkg_version("giswater-api"),
+        "host.name": socket.gethostname(),
+        "process.pid": os.getpid(),
+    }
+
+
+class TraceFileExporter:
+    """Queue finished spans and append them, in batches, to a size-rotated file."""
+
+    def __init__(self, directory: str, max_bytes: int, keep: int, flush_seconds: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.flush_seconds = max(flush_seconds, 0.05)
+        self.dropped = 0
+        self._queue: queue.Queue[list | None] = queue.Queue(maxsize=_QUEUE_SIZE)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._stream = None
+        self._size = 0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"traces-{os.getpid()}.jsonl")
+
+    def export(self, spans: list) -> None:
+        if self._thread is None or self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # A forked worker inherits neither the thread nor a usable stream.
+            self._pid, self._stream, self._size = os.getpid(), None, 0
+            self._queue = queue.Queue(maxsize=_QUEUE_SIZE)
+            self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+            self._thread.start()
+
+    def _collect(self) -> tuple[list, bool]:
+        """Block for spans, then gather more for up to `flush_seconds`; True once asked to stop."""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = list(first)
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < _BATCH_SPANS:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.extend(item)
+        return batch, False
+
+    def _run(self) -> None:
+        resource = _resource()
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if not batch:
+                continue
+            try:
+                self._write(json.dumps(encode_spans(batch, resource), separators=(",", ":")) + "\n")
+            except Exception as exc:
+                self.dropped += len(batch)
+                logger.warning("trace export failed: %s", exc)
+        self._close_stream()
+
+    def _write(self, line: str) -> None:
+        data = line.encode("utf-8")
+        if self._stream is not None and self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        if self._stream is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._stream = open(self.path, "ab")
+            self._size = self._stream.tell()
+        self._stream.write(data)
+        self._stream.flush()
+        self._size += len(data)
+
+    def _rotate(self) -> None:
+        self._close_stream()
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        os.replace(self.path, os.path.join(self.directory, f"traces-{os.getpid()}-{stamp}.jsonl"))
+        self._prune()
+
+    def _prune(self) -> None:
+        """Keep the newest `keep` rotated files of all workers (0 keeps everything)."""
+        if self.keep <= 0:
+            return
+        rotated = sorted(glob.glob(os.path.join(self.directory, "traces-*-*.jsonl")), key=os.path.getmtime)
+        for path in rotated[: -self.keep]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _close_stream(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+            self._size = 0
+
+    def stop(self) -> None:
+        """Write out queued spans and close the file; the next export restarts the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None or self._pid != os.getpid():
+                return
+            self._queue.put(None)
+            thread.join(timeout=10)
+
+
+_exporter: TraceFileExporter | None = None
+
+
+def get_exporter() -> TraceFileExporter:
+    global _exporter
+    if _exporter is None:
+        _exporter = TraceFileExporter(
+            os.path.abspath(global_settings.trace_dir or os.path.join(global_settings.log_dir, "traces")),
+            global_settings.trace_file_max_bytes,
+            global_settings.trace_file_keep,
+            global_settings.trace_export_flush_seconds,
+        )
+        atexit.register(_exporter.stop)
+    return _exporter
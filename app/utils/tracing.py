@@ -0,0 +1,249 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Lightweight request tracing (`TRACING_ENABLED`) exported to local OTLP-JSON files.
+
+`RequestLoggingMiddleware` opens a root span per request. Its trace id comes from
+the caller's W3C ``traceparent`` header, or else is the request id
+(`REQUEST_ID_CTX`), so an audit row and its trace share one key. `span()` opens
+child spans (auth, schema checks, execute_procedure, Valhalla and Keycloak calls,
+audit-log writes), `record_span()` adds one that was already timed (pool
+acquisition) and `traceparent()` is the header for outbound calls.
+
+Spans stay in memory until the root span ends. The trace is then exported when
+it was head-sampled (`TRACE_SAMPLE_RATE`, or the caller's sampled flag) or, tail
+sampling, when it failed (`TRACE_KEEP_ERRORS`) or took at least `TRACE_SLOW_MS`;
+otherwise it is dropped. Files are written off the event loop by
+`trace_export.TraceFileExporter`. With tracing off every helper returns after a
+single context-variable lookup.
+"""
+
+import contextvars
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+from ..core.config import global_settings
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Trace:
+    """Spans of one trace, held until its root span ends."""
+
+    __slots__ = ("trace_id", "sampled", "spans", "dropped_spans", "finished", "kept", "token")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: list[Span] = []
+        self.dropped_spans = 0
+        self.finished = False
+        self.kept = False
+        self.token: contextvars.Token | None = None
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(
+        self,
+        trace: Trace,
+        name: str,
+        parent_id: str | None = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: dict | None = None,
+        start_ns: int | None = None,
+    ):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64) or 1:016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes = attributes or {}
+        self.error: str | None = None
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def fail(self, message: str) -> None:
+        self.error = message
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    """Yielded by `span()` outside a trace, so callers never need a None check."""
+
+    __slots__ = ()
+
+    def set(self, key: str, value) -> None:
+        pass
+
+    def fail(self, message: str) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+CURRENT_SPAN_CTX: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    """``(trace_id, parent_span_id, sampled)`` of a version-00 ``traceparent``, or None when absent or invalid."""
+    match = _TRACEPARENT_RE.match(value.strip().lower()) if value else None
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def _head_sampled() -> bool:
+    return random.random() < global_settings.trace_sample_rate
+
+
+def start_trace(
+    name: str,
+    *,
+    request_id: uuid.UUID | None = None,
+    traceparent: str | None = None,
+    kind: int = SPAN_KIND_SERVER,
+    attributes: dict | None = None,
+) -> Span | None:
+    """Open a root span and make it current; None when tracing is off. End it with `finish_trace`."""
+    if not global_settings.tracing_enabled:
+        return None
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, parent_sampled = parent
+        trace = Trace(trace_id, parent_sampled or _head_sampled())
+    else:
+        parent_id = None
+        trace = Trace((request_id or uuid.uuid4()).hex, _head_sampled())
+    root = Span(trace, name, parent_id, kind, attributes)
+    trace.token = CURRENT_SPAN_CTX.set(root)
+    return root
+
+
+def _keep(trace: Trace, root: Span) -> bool:
+    if trace.sampled:
+        return True
+    if global_settings.trace_keep_errors and any(span.error for span in trace.spans):
+        return True
+    slow_ms = global_settings.trace_slow_ms
+    return slow_ms > 0 and root.duration_ms >= slow_ms
+
+
+def _end(span: Span, end_ns: int | None = None) -> None:
+    span.end_ns = end_ns if end_ns is not None else time.time_ns()
+    trace = span.trace
+    if trace.finished:
+        # Outlived its root (e.g. a fire-and-forget audit insert): export alone if the trace was kept.
+        if trace.kept:
+            _export([span])
+        return
+    if len(trace.spans) < global_settings.trace_max_spans:
+        trace.spans.append(span)
+    else:
+        trace.dropped_spans += 1
+
+
+def finish_trace(root: Span | None) -> None:
+    """End the root span, restore the previous current span, then export or drop the trace."""
+    if root is None:
+        return
+    trace = root.trace
+    if trace.token is not None:
+        CURRENT_SPAN_CTX.reset(trace.token)
+        trace.token = None
+    if trace.dropped_spans:
+        root.set("giswater.dropped_spans", trace.dropped_spans)
+    _end(root)
+    trace.finished = True
+    trace.kept = _keep(trace, root)
+    if trace.kept:
+        _export(trace.spans)
+    trace.spans = []
+
+
+def _export(spans: list[Span]) -> None:
+    from .trace_export import get_exporter
+
+    get_exporter().export(spans)
+
+
+def _failed(exc: BaseException) -> bool:
+    # Client errors raised as exceptions (401, 404, ...) are normal outcomes, not trace failures.
+    return getattr(exc, "status_code", 500) >= 500
+
+
+@contextmanager
+def span(name: str, attributes: dict | None = None, *, kind: int = SPAN_KIND_INTERNAL):
+    """Child span of the current one for the enclosed block (`NOOP_SPAN` outside a trace)."""
+    parent = CURRENT_SPAN_CTX.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = Span(parent.trace, name, parent.span_id, kind, attributes)
+    token = CURRENT_SPAN_CTX.set(child)
+    try:
+        yield child
+    except Exception as exc:
+        if _failed(exc):
+            child.fail(f"{type(exc).__name__}: {exc}")
+        raise
+    finally:
+        CURRENT_SPAN_CTX.reset(token)
+        _end(child)
+
+
+@contextmanager
+def background_trace(name: str, attributes: dict | None = None):
+    """Root span of a new trace for work outside a request (e.g. an audit-log batch)."""
+    root = start_trace(name, kind=SPAN_KIND_INTERNAL, attributes=attributes)
+    if root is None:
+        yield NOOP_SPAN
+        return
+    try:
+        yield root
+    except Exception as exc:
+        root.fail(f"{type(exc).__name__}: {exc}")
+        raise
+    finally:
+        finish_trace(root)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, attributes: dict | None = None) -> None:
+    """Add an already measured child span of the current one."""
+    parent = CURRENT_SPAN_CTX.get()
+    if parent is None:
+        return
+    child = Span(parent.trace, name, parent.span_id, SPAN_KIND_INTERNAL, attributes, start_ns)
+    _end(child, end_ns)
+
+
+def traceparent() -> str | None:
+    """``traceparent`` header value that makes an outbound call a child of the current span."""
+    current = CURRENT_SPAN_CTX.get()
+    if current is None:
+        return None
+    return f"00-{current.trace.trace_id}-{current.span_id}-{'01' if current.trace.sampled else '00'}"
+
+
+def trace_headers() -> dict[str, str]:
+    value = traceparent()
+    return {"traceparent": value} if value else {}
@@ -2,10 +2,13 @@
 Gunicorn config for production ASGI (FastAPI via UvicornWorker).
 
 Override worker count with WEB_CONCURRENCY (integer); otherwise uses min(2 * CPUs + 1, 8).
+With METRICS_ENABLED, set PROMETHEUS_MULTIPROC_DIR so /metrics aggregates all workers; the
+directory is emptied on start and dead workers are dropped from the live gauges.
 """
 
 import multiprocessing
 import os
+import shutil
 
 bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
 
@@ -26,3 +29,18 @@ accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-")
 errorlog = os.environ.get("GUNICORN_ERRORLOG", "-")
 loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
 capture_output = os.environ.get("GUNICORN_CAPTURE_OUTPUT", "true").lower() in ("1", "true", "yes", "on")
+
+
+def on_starting(server):
+    """Start from an empty multiprocess dir: stale files from a previous run would be summed in."""
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,94 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Micro-benchmark: Valhalla polyline decoding and GeoJSON assembly for long multi-leg trips.
+
+Usage: python scripts/bench_polyline.py [--legs 200] [--points-per-leg 1500] [--repeat 5]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.utils.polyline import decode_array, encode  # noqa: E402
+from app.utils.routing import get_geojson_from_optimized_route  # noqa: E402
+
+
+def _legacy_decode(encoded):
+    """Character-by-character decoder the API used before ``decode_array``."""
+    inv = 1.0 / 1e6
+    decoded = []
+    previous = [0, 0]
+    i = 0
+    while i < len(encoded):
+        ll = [0, 0]
+        for j in [0, 1]:
+            shift = 0
+            byte = 0x20
+            while byte >= 0x20:
+                byte = ord(encoded[i]) - 63
+                i += 1
+                ll[j] |= (byte & 0x1F) << shift
+                shift += 5
+            ll[j] = previous[j] + (~(ll[j] >> 1) if ll[j] & 1 else (ll[j] >> 1))
+            previous[j] = ll[j]
+        decoded.append([float("%.6f" % (ll[1] * inv)), float("%.6f" % (ll[0] * inv))])
+    return decoded
+
+
+def _synthetic_trip(legs: int, points_per_leg: int, seed: int = 1) -> dict:
+    rng = np.random.default_rng(seed)
+    trip_legs = []
+    for _ in range(legs):
+        steps = rng.normal(0.0, 0.0002, size=(points_per_leg, 2))
+        coords = np.cumsum(steps, axis=0) + (2.17, 41.38)
+        trip_legs.append({"shape": encode(coords.tolist()), "summary": {"length": 1.0, "time": 60.0}})
+    return {"legs": trip_legs}
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[-1])
+    parser.add_argument("--legs", type=int, default=200)
+    parser.add_argument("--points-per-leg", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    trip = _synthetic_trip(args.legs, args.points_per_leg)
+    shapes = [leg["shape"] for leg in trip["legs"]]
+    total_points = args.legs * args.points_per_leg
+    chars = sum(len(shape) for shape in shapes)
+
+    for shape in shapes[:5]:
+        assert decode_array(shape).tolist() == _legacy_decode(shape)
+
+    legacy = _best_of(args.repeat, lambda: [_legacy_decode(shape) for shape in shapes])
+    vectorized = _best_of(args.repeat, lambda: [decode_array(shape) for shape in shapes])
+    as_lists = _best_of(args.repeat, lambda: [decode_array(shape).tolist() for shape in shapes])
+    geojson = _best_of(args.repeat, lambda: get_geojson_from_optimized_route(trip, "auto"))
+
+    print(f"{args.legs} legs, {total_points:,} points, {chars:,} chars (best of {args.repeat})")
+    print(f"  legacy decode           {legacy * 1000:9.1f} ms")
+    print(f"  decode_array            {vectorized * 1000:9.1f} ms  ({legacy / vectorized:5.1f}x)")
+    print(f"  decode_array + tolist   {as_lists * 1000:9.1f} ms  ({legacy / as_lists:5.1f}x)")
+    print(f"  GeoJSON FeatureCollection {geojson * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Micro-benchmark: redaction of captured request/response bodies in the request logger.
+
+Usage: python scripts/bench_redaction.py [--cap 2048] [--sizes 2048,65536,1048576,8388608] [--repeat 5]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.middleware import request_logging  # noqa: E402
+from app.utils.redaction import REDACTED, is_sensitive_key  # noqa: E402
+
+
+def _legacy_redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: REDACTED if is_sensitive_key(str(key)) else _legacy_redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_legacy_redact(item) for item in value]
+    return value
+
+
+def _legacy_sanitize(body: bytes, cap: int) -> str:
+    """Full parse, redact and re-serialize, then truncate (what the logger did before)."""
+    sanitized = json.dumps(_legacy_redact(json.loads(body.decode("utf-8"))), ensure_ascii=False, separators=(",", ":"))
+    encoded = sanitized.encode("utf-8")
+    return (encoded[:cap] + b"...[truncated]" if len(encoded) > cap else encoded).decode("utf-8", errors="replace")
+
+
+def _error_payload(size: int) -> bytes:
+    """JSON error body of about `size` bytes: validation details with nested credentials."""
+    item = {"loc": ["body", "feature"], "msg": "field required", "ctx": {"token": "abc", "value": "x" * 40}}
+    count = max(size // len(json.dumps(item)), 1)
+    return json.dumps({"detail": [item] * count, "password": "hunter2"}).encode("utf-8")
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[-1])
+    parser.add_argument("--cap", type=int, default=2048)
+    parser.add_argument("--sizes", default="2048,65536,1048576,8388608")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    request_logging._effective_body_byte_cap = lambda: args.cap
+    print(f"body cap {args.cap:,} bytes (best of {args.repeat})")
+    for size in (int(s) for s in args.sizes.split(",")):
+        body = _error_payload(size)
+        legacy = _best_of(args.repeat, lambda body=body: _legacy_sanitize(body, args.cap))
+        bounded = _best_of(args.repeat, lambda body=body: request_logging._sanitize_body_text(body))
+        print(
+            f"  {len(body):>11,} bytes  legacy {legacy * 1000:9.3f} ms"
+            f"  incremental {bounded * 1000:7.3f} ms  ({legacy / bounded:7.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,9 @@ def test_alembic_ini_exists():
     assert ini.is_file()
     assert (ini.parent / "alembic" / "env.py").is_file()
     assert (ini.parent / "alembic" / "versions" / "0001_gwapi_initial.py").is_file()
+    assert (ini.parent / "alembic" / "versions" / "0002_audit_log_indexes.py").is_file()
+    assert (ini.parent / "alembic" / "versions" / "0003_audit_log_lz4.py").is_file()
+    assert (ini.parent / "alembic" / "versions" / "0004_http_log_timings.py").is_file()
 
 
 def test_build_alembic_config_uses_project_ini():
@@ -29,4 +32,4 @@ def test_build_alembic_config_escapes_percent_in_database_url():
 
 
 def test_head_revision_is_latest():
-    assert head_revision() == "0001_gwapi_initial"
+    assert head_revision() == "0004_http_log_timings"
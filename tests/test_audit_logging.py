@@ -0,0 +1,826 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Offline tests for the audit-log pipeline (no DB).
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from types import SimpleNamespace
+
+import httpx
+import psycopg
+import pytest
+from fastapi import APIRouter, Depends, FastAPI, Request
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+from app.api.route_timing import TimedRoute
+from app.core.config import TenantSettings, load_tenant_settings
+from app.db import log_sampling, log_spill, log_store, log_writer, manager, partitions
+from app.db.context import REQUEST_ID_CTX
+from app.db.log_spill import LogSpill
+from app.db.log_store import HTTP_LOG_COLUMNS, http_log_row, replay_spilled_logs
+from app.db.log_writer import AuditLogWriter
+from app.db.manager import DatabaseManager
+from app.db.migrate import migration_targets
+from app.db.partitions import ensure_known_partitions, invalidate_partition_cache
+from app.db import retention
+from app.db.retention import LogPartition, _csv_to_parquet, archive_partition, is_expired, retention_cutoff
+from app.db.schema import LogTargets
+from app.middleware import request_logging
+from app.middleware.request_logging import RequestLoggingMiddleware
+from app.schemas.admin import DbSettingsIn, TenantIn, build_tenant_settings_from_input
+from app.services import replay_service, system_service
+from app.services.system_service import SystemService, decode_log_cursor, encode_log_cursor
+from app.tenancy.registry import serialize_tenant_settings
+from app.utils.log_setup import DailyFileHandler, LoggerRegistry
+from app.utils.redaction import redact_json_prefix
+from app.utils.server_timing import phase, record_phase
+
+
+def _http_record(i: int = 0) -> dict:
+    return {
+        "ts": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        "request_id": f"req-{i}",
+        "method": "GET",
+        "endpoint": "/basic/getinfofromid",
+        "status": 200,
+        "duration_ms": 12,
+        "query_params": {"id": i},
+    }
+
+
+def _writer(**kwargs) -> tuple[AuditLogWriter, list[list]]:
+    writer = AuditLogWriter(SimpleNamespace(tenant_id="t1"), **kwargs)
+    flushed: list[list] = []
+
+    async def fake_flush(batch):
+        if batch:
+            flushed.append(batch)
+            writer.written["http"] += len(batch)
+
+    writer._flush = fake_flush
+    return writer, flushed
+
+
+def test_http_log_row_follows_copy_columns():
+    row = http_log_row(_http_record(3))
+    assert len(row) == len(HTTP_LOG_COLUMNS)
+    assert row[HTTP_LOG_COLUMNS.index("request_id")] == "req-3"
+
+
+def test_http_logs_without_timings_column_are_written_and_read_without_it():
+    # `gwapi` not upgraded to 0004 yet (DB_AUTO_MIGRATE=false or a failed upgrade).
+    behind = LogTargets("gwapi", "http_logs", "db_logs", has_timings=False)
+    table, columns, to_row = log_store._table_for(behind, "http")
+    assert table == "http_logs" and "timings" not in columns and len(to_row(_http_record())) == len(columns)
+    assert log_store._table_for(LogTargets("gwapi", "http_logs", "db_logs"), "http")[1] == HTTP_LOG_COLUMNS
+    assert system_service._timings_column(behind) == "NULL::jsonb AS timings"
+
+
+def test_writer_batches_by_size_and_flushes_on_stop():
+    async def scenario():
+        writer, flushed = _writer(batch_size=4, flush_interval=60)
+        for i in range(10):
+            assert writer.submit("http", _http_record(i))
+        await asyncio.sleep(0.05)
+        assert [len(batch) for batch in flushed] == [4, 4]
+        await writer.stop()
+        return writer, flushed
+
+    writer, flushed = asyncio.run(scenario())
+    assert sum(len(batch) for batch in flushed) == 10
+    assert writer.stats()["written"] == {"http": 10}
+
+
+def test_writer_drops_when_queue_is_full():
+    async def scenario():
+        writer, _ = _writer(max_queue=2, batch_size=100, flush_interval=60)
+        results = [writer.submit("http", _http_record(i)) for i in range(5)]
+        await writer.stop()
+        return writer, results
+
+    writer, results = asyncio.run(scenario())
+    assert results.count(False) == 3
+    assert writer.stats()["dropped"] == {"http": 3}
+
+
+def test_submit_falls_back_to_direct_insert_without_writer(monkeypatch):
+    inserted = []
+
+    async def fake_insert(db_manager, record):
+        inserted.append(record)
+
+    monkeypatch.setattr(log_store, "insert_api_log", fake_insert)
+
+    async def scenario():
+        log_store.submit_api_log(SimpleNamespace(log_writer=None), _http_record())
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert len(inserted) == 1
+
+
+def _partition_known(tenant_id: str, schema: str, table_name: str, ts: datetime) -> bool:
+    return (schema, table_name, date(ts.year, ts.month, 1)) in partitions._known_partitions.get(tenant_id, ())
+
+
+def test_known_partitions_skip_maintenance_on_the_write_path(monkeypatch):
+    calls = []
+
+    async def fake_create(conn, tenant_id, targets, wanted):
+        calls.append((conn, wanted[0]))
+        if wanted[0].year == 2030:
+            raise RuntimeError("permission denied")
+        for month in wanted:
+            partitions._remember_partition(tenant_id, targets.schema, targets.http_table, month)
+
+    monkeypatch.setattr(partitions, "_create_partitions", fake_create)
+    invalidate_partition_cache()
+    db_manager = SimpleNamespace(tenant_id="t1")
+    conn = SimpleNamespace(rollback=lambda: asyncio.sleep(0))
+    targets = LogTargets("gwapi", "http_logs", "db_logs")
+    november = datetime(2026, 11, 20, tzinfo=timezone.utc)
+
+    asyncio.run(ensure_known_partitions(db_manager, conn, targets, "http_logs", [november]))
+    asyncio.run(ensure_known_partitions(db_manager, conn, targets, "http_logs", [november, datetime(2027, 1, 3)]))
+
+    assert calls == [(conn, november.date().replace(day=1))]  # on the caller's connection, once
+    assert _partition_known("t1", "gwapi", "http_logs", datetime(2027, 1, 31))
+    assert not _partition_known("t1", "gwapi", "db_logs", november)
+
+    # A failed creation is not retried on every write for a while.
+    far = datetime(2030, 5, 1, tzinfo=timezone.utc)
+    asyncio.run(ensure_known_partitions(db_manager, conn, targets, "http_logs", [far]))
+    asyncio.run(ensure_known_partitions(db_manager, conn, targets, "http_logs", [far]))
+    assert len(calls) == 2
+
+    invalidate_partition_cache("t1")
+    assert not _partition_known("t1", "gwapi", "http_logs", november)
+    asyncio.run(ensure_known_partitions(db_manager, conn, targets, "http_logs", [far]))
+    assert len(calls) == 3
+
+
+def test_partition_maintenance_skips_tables_locked_by_another_worker():
+    executed = []
+    locked_elsewhere = {"gwapi.log_maintenance:gwapi.http_logs"}
+
+    class Cursor:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, query, params=None):
+            executed.append((query if isinstance(query, str) else query.as_string(None), params))
+
+        async def fetchone(self):
+            query, params = executed[-1]
+            return (params[0] not in locked_elsewhere,) if "advisory" in query else (False,)
+
+        async def fetchall(self):
+            return [("http_logs_2026_11",)] if executed[-1][1] == ("gwapi.http_logs",) else []
+
+    conn = SimpleNamespace(cursor=Cursor, commit=lambda: asyncio.sleep(0))
+    invalidate_partition_cache()
+    targets = LogTargets("gwapi", "http_logs", "db_logs")
+    wanted = [date(2026, 11, 1), date(2026, 12, 1)]
+
+    created = asyncio.run(partitions._create_partitions(conn, "t1", targets, wanted, serialize=True))
+
+    assert created == 2  # db_logs only
+    ddl = [query for query, _ in executed if "CREATE TABLE" in query]
+    assert ddl and all('"db_logs"' in query.split("PARTITION OF")[1] for query in ddl)
+    assert _partition_known("t1", "gwapi", "http_logs", datetime(2026, 11, 5))
+    assert not _partition_known("t1", "gwapi", "http_logs", datetime(2026, 12, 5))
+    assert _partition_known("t1", "gwapi", "db_logs", datetime(2026, 12, 5))
+    invalidate_partition_cache()
+
+
+def test_add_months_rolls_over_year():
+    assert partitions.add_months(datetime(2026, 11, 1).date(), 2) == datetime(2027, 1, 1).date()
+
+
+def test_retention_expires_only_whole_months_past_the_cutoff():
+    now = datetime(2026, 10, 19, tzinfo=timezone.utc)
+    cutoff = retention_cutoff(30, now)  # 2026-09-19
+
+    def partition(year, month):
+        return LogPartition("gwapi", "http_logs", f"http_logs_{year}_{month:02d}", date(year, month, 1), True, 8192)
+
+    assert is_expired(partition(2026, 8), cutoff)
+    assert not is_expired(partition(2026, 9), cutoff)
+    assert retention_cutoff(0, now) is None
+    assert not is_expired(partition(2020, 1), None)
+
+
+def test_archive_csv_is_gzipped_as_it_streams(tmp_path, monkeypatch):
+    chunks = [b"ts,request_body\n", b'2026-01-01,"line1\nline2"\n', b"2026-01-02,\n"]
+
+    class Copy:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def __aiter__(self):
+            for chunk in chunks:
+                yield memoryview(chunk)
+
+    class Cursor(Copy):
+        def copy(self, statement):
+            return Copy()
+
+    monkeypatch.setattr(retention, "archive_dir", lambda tenant_id: tmp_path / tenant_id)
+    monkeypatch.setattr(retention, "_ARCHIVE_WRITE_BYTES", 20)
+    partition = LogPartition("gwapi", "http_logs", "http_logs_2026_01", date(2026, 1, 1), attached=False, bytes=0)
+
+    dest = asyncio.run(archive_partition(SimpleNamespace(cursor=Cursor), "t1", partition, "csv"))
+
+    assert dest == tmp_path / "t1" / "gwapi.http_logs_2026_01.csv.gz"
+    assert gzip.decompress(dest.read_bytes()) == b"".join(chunks)
+    assert [path.name for path in (tmp_path / "t1").iterdir()] == [dest.name]  # no temporary files left
+
+
+def test_archive_parquet_keeps_multiline_values(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    src = tmp_path / "part.csv"
+    src.write_text('ts,request_body\n2026-01-01,"line1\nline2"\n2026-01-02,\n', encoding="utf-8")
+    _csv_to_parquet(src, tmp_path / "part.parquet")
+    table = pq.read_table(tmp_path / "part.parquet")
+    assert table.column("request_body").to_pylist() == ["line1\nline2", None]
+
+
+def _spill(tmp_path, **kwargs) -> LogSpill:
+    options = {"max_bytes": 1 << 20, "segment_bytes": 1 << 16, "retry_seconds": 60}
+    return LogSpill("t1", tmp_path / "spill", **{**options, **kwargs})
+
+
+def test_spill_segments_round_trip_and_respect_the_size_cap(tmp_path):
+    spill = _spill(tmp_path, max_bytes=600)
+    written = spill.append([("http", _http_record(i)) for i in range(10)])
+    assert 0 < written < 10
+    assert spill.stats()["dropped"] == {"http": 10 - written}
+
+    (segment,) = spill.sealed_segments()
+    records = LogSpill.read_segment(segment)
+    assert len(records) == written
+    assert records[0][1]["ts"] == _http_record()["ts"]
+
+    # The cap is tracked with a running count, without rescanning the directory per append.
+    assert spill.stats()["pending_bytes"] == segment.stat().st_size and spill.has_pending()
+    spill.release(spill.claim(segment))
+    assert spill.stats()["pending_bytes"] == 0 and not spill.has_pending()
+    assert spill.append([("http", _http_record())]) == 1
+
+
+def test_spill_seals_segments_left_by_dead_workers(tmp_path):
+    directory = tmp_path / "spill"
+    directory.mkdir()
+    token = log_spill._process_token()
+    (directory / "1-999999999.open").write_text("")
+    (directory / f"2-{token}.open").write_text("")  # this process: still being written
+    if "-" in token:
+        # Same pid as this process, but from an earlier process (e.g. before a container restart).
+        (directory / f"3-{os.getpid()}-1.open").write_text("")
+    spill = _spill(tmp_path)
+    assert not list(directory.glob("*.jsonl"))  # construction touches no files
+
+    sealed = spill.sealed_segments()
+    assert [path.name for path in directory.glob("*.open")] == [f"2-{token}.open"]
+    assert len(sealed) == (2 if "-" in token else 1)
+
+
+def test_spill_seals_its_open_segment_on_close(tmp_path):
+    spill = _spill(tmp_path)
+    spill.append([("http", _http_record())])
+    spill.close()
+    assert [path.suffix for path in (tmp_path / "spill").iterdir()] == [".jsonl"]
+    assert len(_spill(tmp_path).sealed_segments()) == 1
+
+
+class _RowInsertConn:
+    """Connection stub whose inserts reject values containing a NUL byte."""
+
+    def __init__(self):
+        self.inserted = []
+
+    def cursor(self):
+        return self
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, params):
+        if any(isinstance(value, str) and "\x00" in value for value in params):
+            raise psycopg.DataError("invalid byte sequence for encoding UTF8: 0x00")
+        self.inserted.append(params)
+
+    async def rollback(self):
+        pass
+
+    async def commit(self):
+        pass
+
+
+def test_writer_retries_a_rejected_batch_row_by_row(monkeypatch):
+    async def rejecting_copy(conn, targets, records):
+        raise psycopg.DataError("invalid byte sequence for encoding UTF8: 0x00")
+
+    async def no_partitions(*args):
+        pass
+
+    conn = _RowInsertConn()
+    targets = LogTargets("audit", "http_logs", "db_logs")
+    writer = AuditLogWriter(SimpleNamespace(tenant_id="t1", log_spill=None), batch_size=10, flush_interval=60)
+    writer._connection = lambda: asyncio.sleep(0, conn)
+    monkeypatch.setattr(log_writer, "resolve_log_targets", lambda db_manager: asyncio.sleep(0, targets))
+    monkeypatch.setattr(log_writer, "prepare_log_partitions", no_partitions)
+    monkeypatch.setattr(log_writer, "copy_log_records", rejecting_copy)
+    monkeypatch.setattr(log_writer, "record_log_db_result", lambda *args: None)
+    batch = [("http", _http_record(i)) for i in range(3)]
+    batch[1][1]["request_id"] = "bad\x00id"
+
+    asyncio.run(writer._flush(batch))
+    assert len(conn.inserted) == 2
+    assert writer.stats()["written"] == {"http": 2} and writer.stats()["failed"] == {"http": 1}
+
+
+def test_writer_spills_when_database_is_down_and_replays_after(tmp_path, monkeypatch):
+    spill = _spill(tmp_path)
+    db_manager = SimpleNamespace(tenant_id="t1", log_spill=spill)
+    writer = AuditLogWriter(db_manager, batch_size=10, flush_interval=60)
+    replayed = []
+
+    async def down(batch):
+        raise psycopg.OperationalError("connection refused")
+
+    async def up(batch):
+        return []
+
+    async def fake_replay_segment(db_manager, records):
+        replayed.extend(records)
+
+    monkeypatch.setattr(log_store, "_replay_segment", fake_replay_segment)
+
+    async def scenario():
+        writer._write = down
+        await writer._flush([("http", _http_record(i)) for i in range(3)])
+        # Outage circuit open: the next batch goes straight to disk.
+        writer._write = up
+        await writer._flush([("db", _http_record(3))])
+        spill.outage.reset()
+        await writer._flush([("http", _http_record(4))])
+        # The success starts a background replay (segment I/O runs in worker threads).
+        await asyncio.sleep(0)
+        while spill.replaying:
+            await asyncio.sleep(0.01)
+        return await replay_spilled_logs(db_manager)
+
+    asyncio.run(scenario())
+    assert writer.stats()["spilled"] == {"http": 3, "db": 1}
+    assert writer.stats()["written"] == {"http": 1}
+    assert len(replayed) == 4
+    assert not spill.has_pending()
+
+
+def test_separate_log_database_gets_its_own_manager(monkeypatch):
+    monkeypatch.setattr(
+        manager, "global_settings", replace(manager.global_settings, log_database_url="postgresql://logs/{tenant}_logs")
+    )
+    db = DatabaseManager(TenantSettings(database_url="postgresql://gis/gw_db"), "acme")
+
+    assert db.has_separate_log_db
+    assert db.log_db.database_url == "postgresql://logs/acme_logs"
+    assert db.log_db.dbname == "acme_logs"
+    assert db.log_writer is None and db.log_spill is None
+    assert db.log_db.log_db is db.log_db
+    assert migration_targets(db) == [db, db.log_db]
+
+    override = DatabaseManager(TenantSettings(log_database_url="postgresql://other/acme"), "acme")
+    assert override.log_db.database_url == "postgresql://other/acme"
+
+
+def test_audit_logs_share_the_tenant_database_by_default():
+    db = DatabaseManager(TenantSettings(), "acme")
+    assert db.log_db is db
+    assert migration_targets(db) == [db]
+
+
+def _logged_app(monkeypatch, routes) -> tuple[TestClient, list[dict]]:
+    records: list[dict] = []
+
+    def fake_logger(request):
+        return SimpleNamespace(info=lambda line: records.append(json.loads(line)))
+
+    monkeypatch.setattr(request_logging, "_resolve_api_logger", fake_logger)
+    monkeypatch.setattr(request_logging, "_effective_body_byte_cap", lambda: 64)
+    app = Starlette(routes=routes)
+    app.add_middleware(RequestLoggingMiddleware)
+    return TestClient(app), records
+
+
+def test_request_logging_streams_and_keeps_only_a_body_prefix(monkeypatch):
+    async def upload(request):
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+        return JSONResponse({"received": size, "password": "hunter2", "filler": "x" * 500}, status_code=422)
+
+    async def stream(request):
+        async def chunks():
+            for _ in range(100):
+                yield b"0123456789"
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    client, records = _logged_app(monkeypatch, [Route("/upload", upload, methods=["POST"]), Route("/stream", stream)])
+
+    response = client.post("/upload", content=b'{"token": "abc", "data": "' + b"y" * 10_000 + b'"}')
+    assert response.status_code == 422
+    assert response.json()["received"] == 10_028
+    record = records[-1]
+    assert record["status"] == 422
+    assert record["request_id"] == response.headers["x-request-id"]
+    assert record["body_size"] == 10_028
+    assert "abc" not in record["request_body"] and record["request_body"].endswith("...[truncated]")
+    assert "hunter2" not in record["response_body"]
+
+    response = client.get("/stream")
+    assert response.content == b"0123456789" * 100
+    assert records[-1]["response_size"] == 1000
+    assert records[-1]["response_body"] is None  # 200: bodies are not captured
+
+
+def test_tail_sampling_keeps_interesting_requests_and_their_procedure_logs(monkeypatch):
+    settings = replace(
+        log_sampling.global_settings,
+        log_db_enabled=True,
+        log_db_sample_rate=0.0,
+        log_db_slow_ms=1000,
+        log_db_slow_ms_endpoints=(("/slow", 0), ("/slow/report", 1)),
+    )
+    monkeypatch.setattr(log_sampling, "global_settings", settings)
+    http_rows: list[dict] = []
+    db_rows: list[dict] = []
+    monkeypatch.setattr(request_logging, "submit_api_log", lambda db, record: http_rows.append(record))
+    monkeypatch.setattr(log_sampling, "submit_api_db_log", lambda db, record: db_rows.append(record))
+
+    async def endpoint(request):
+        request.state.tenant = SimpleNamespace(settings=TenantSettings(), db_manager=SimpleNamespace(log_db="log-db"))
+        failed = request.query_params.get("fail") == "1"
+        record = {"request_id": REQUEST_ID_CTX.get(), "status": "Failed" if failed else "Accepted", "error": None}
+        assert log_sampling.hold_db_log("log-db", record)
+        if request.url.path == "/slow/report":
+            await asyncio.sleep(0.01)
+        return JSONResponse({}, status_code=int(request.query_params.get("status", 200)))
+
+    routes = [Route("/fast", endpoint), Route("/slow", endpoint), Route("/slow/report", endpoint)]
+    client, _ = _logged_app(monkeypatch, routes)
+
+    client.get("/fast")
+    client.get("/slow")  # threshold 0: no slow rule for this endpoint
+    assert http_rows == [] and db_rows == []
+
+    client.get("/fast?fail=1")
+    client.get("/fast?status=404")
+    client.get("/slow/report")  # longest fragment wins: over 1 ms
+    assert [row["endpoint"] for row in http_rows] == ["/fast", "/fast", "/slow/report"]
+    assert [row["request_id"] for row in db_rows] == [row["request_id"] for row in http_rows]
+    assert log_sampling._pending == {}
+    assert not log_sampling.hold_db_log("log-db", {"request_id": None})
+
+    monkeypatch.setattr(log_sampling, "global_settings", replace(settings, log_db_sample_rate=1.0))
+    client.get("/fast")
+    assert len(http_rows) == 4 and len(db_rows) == 4
+
+
+def test_server_timing_header_and_audit_timings_per_tenant(monkeypatch):
+    settings = {"server_timing": True}
+
+    async def tenant(request: Request) -> None:
+        request.state.tenant = SimpleNamespace(settings=TenantSettings(**settings), db_manager=None)
+        with phase("auth"):
+            await asyncio.sleep(0.005)
+
+    router = APIRouter(route_class=TimedRoute, dependencies=[Depends(tenant)])
+
+    @router.get("/info")
+    async def info() -> dict:
+        with phase("schema"):
+            record_phase("pool", 0.002)
+            with phase("db"):
+                await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    api = FastAPI()
+    api.include_router(router)
+    client, records = _logged_app(monkeypatch, [Mount("/v1", app=api)])
+
+    response = client.get("/v1/info")
+    assert response.json() == {"ok": True}
+    header = dict(part.split(";dur=") for part in response.headers["server-timing"].split(", "))
+    assert list(header) == ["auth", "schema", "pool", "db", "validate", "app", "serialize", "total"]
+    assert float(header["auth"]) >= 5 and float(header["db"]) >= 10 and float(header["pool"]) == 2
+    assert float(header["schema"]) < 5  # nested phases are charged to themselves, not their parent
+    assert sum(float(ms) for name, ms in header.items() if name != "total") <= float(header["total"])
+    timings = records[-1]["timings"]
+    assert list(timings) == list(header) and timings["total"] >= float(header["total"])
+
+    settings["server_timing"] = False
+    response = client.get("/v1/info")
+    assert "server-timing" not in response.headers
+    assert records[-1]["timings"]["db"] >= 10
+
+
+def test_server_timing_survives_an_admin_update(tmp_path):
+    env = tmp_path / "acme.env"
+    env.write_text(serialize_tenant_settings(TenantSettings(server_timing=True)), encoding="utf-8")
+    existing = load_tenant_settings(env)
+    assert existing.server_timing
+
+    updated = build_tenant_settings_from_input(TenantIn(db=DbSettingsIn()), existing=existing)
+    env.write_text(serialize_tenant_settings(updated), encoding="utf-8")
+    assert load_tenant_settings(env).server_timing
+    assert not build_tenant_settings_from_input(TenantIn(db=DbSettingsIn())).server_timing
+
+
+def test_redact_json_prefix_handles_nested_and_truncated_values():
+    text = '{"a": 1, "Password": "x\\"y", "auth": {"token": {"k": [1, {"b": "}"}]}, "ok": [1]}, "secret": "abc'
+    redacted, cut = redact_json_prefix(text, 2048)
+    assert not cut
+    assert redacted == (
+        '{"a": 1, "Password": "***REDACTED***", "auth": {"token": "***REDACTED***", "ok": [1]}, '
+        '"secret": "***REDACTED***"'
+    )
+    assert redact_json_prefix('{"note": "password", "x": "' + "y" * 100 + '"}', 32) == (
+        '{"note": "password", "x": "yyyyy',
+        True,
+    )
+
+
+def test_sanitize_body_text_only_scans_a_bounded_prefix(monkeypatch):
+    monkeypatch.setattr(request_logging, "_effective_body_byte_cap", lambda: 64)
+    scanned = []
+
+    def spy(text, max_bytes):
+        scanned.append(len(text))
+        return redact_json_prefix(text, max_bytes)
+
+    monkeypatch.setattr(request_logging, "redact_json_prefix", spy)
+    body = json.dumps({"client_secret": {"nested": "z" * 5_000_000}, "x": 1}).encode()
+    assert request_logging._sanitize_body_text(body) == '{"client_secret": "***REDACTED***"...[truncated]'
+    assert scanned == [128]
+    assert request_logging._sanitize_body_text(b'{"token": "t", "a": [1, 2]}') == '{"token":"***REDACTED***","a":[1,2]}'
+
+
+def test_logger_registry_builds_each_logger_once_and_writes_off_thread(tmp_path, caplog):
+    registry = LoggerRegistry()
+    first = registry.get("app.services.basic_service", str(tmp_path / "t1"))
+    assert registry.get("basic_service", str(tmp_path / "t1")) is first
+    other = registry.get("basic_service", str(tmp_path / "t2"))
+    assert other is not first and other.name == first.name == "basic_service"
+
+    first.info("to t1")
+    other.info("to t2")
+    registry.stop()
+    (t1_file,) = (tmp_path / "t1").glob("*/*.log")
+    (t2_file,) = (tmp_path / "t2").glob("*/*.log")
+    assert "to t1" in t1_file.read_text() and "to t2" not in t1_file.read_text()
+    assert "to t2" in t2_file.read_text()
+    # Records still propagate to the root logger's handlers (console, pytest capture).
+    assert [r.getMessage() for r in caplog.records if r.name == "basic_service"] == ["to t1", "to t2"]
+
+
+def test_daily_file_handler_rolls_over_and_prunes_old_days(tmp_path):
+    (tmp_path / "20260101").mkdir()
+    (tmp_path / "spill").mkdir()
+    handler = DailyFileHandler(str(tmp_path), "svc", retain_days=14)
+    for day in (datetime(2026, 3, 1, 23, 59), datetime(2026, 3, 2, 0, 1)):
+        record = logging.LogRecord("api", logging.INFO, __file__, 1, f"on {day:%d}", None, None)
+        record.created = day.timestamp()
+        handler.handle(record)
+    handler.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["20260301", "20260302", "spill"]
+    assert (tmp_path / "20260302" / "svc_20260302.log").read_text().strip() == "on 02"
+
+
+class _FakeLogCursor:
+    def __init__(self, executed: list, rows: list):
+        self.executed = executed
+        self.rows = rows
+        self.itersize = 100
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, params):
+        self.executed.append((query.as_string(None), params))
+
+    async def fetchall(self):
+        return self.rows
+
+    async def __aiter__(self):
+        for row in self.rows:
+            yield row
+
+
+def _log_service(monkeypatch, rows: list) -> tuple[SystemService, list]:
+    """`SystemService` over a fake log database that returns `rows` and records executed queries."""
+    executed: list = []
+
+    @asynccontextmanager
+    async def transaction():
+        yield
+
+    conn = SimpleNamespace(
+        cursor=lambda row_factory=None, name=None: _FakeLogCursor(executed, rows),
+        transaction=transaction,
+        commit=lambda: asyncio.sleep(0),
+    )
+
+    class _LogDb:
+        @asynccontextmanager
+        async def get_db(self):
+            yield conn
+
+    async def fake_targets(db_manager):
+        return LogTargets("gwapi", "http_logs", "db_logs")
+
+    monkeypatch.setattr(system_service, "resolve_log_targets", fake_targets)
+    tenant = SimpleNamespace(id="acme", db_manager=SimpleNamespace(log_db=_LogDb()))
+    return SystemService(tenant), executed
+
+
+def test_log_stats_aggregate_in_sql_over_a_bounded_window(monkeypatch):
+    executed: list = []
+    rows = [
+        {
+            "key": None,
+            "is_total": True,
+            "count": 3,
+            "p50": 20.0,
+            "p90": 84.0,
+            "p99": 98.4,
+            "max_ms": 100,
+            "avg_ms": 43.333,
+            "errors": 1,
+            "error_rate": 1 / 3,
+        },
+        {
+            "key": "/basic/getinfofromid",
+            "is_total": False,
+            "count": 2,
+            "p50": 55.0,
+            "p90": 91.0,
+            "p99": 99.1,
+            "max_ms": 100,
+            "avg_ms": 55.0,
+            "errors": 1,
+            "error_rate": 0.5,
+        },
+    ]
+    service, executed = _log_service(monkeypatch, rows)
+    to = datetime(2026, 3, 2, tzinfo=timezone.utc)
+    result = asyncio.run(service.get_log_stats(to=to, method="get", limit=10))
+
+    text, params = executed[0]
+    assert "percentile_cont(0.99)" in text and "GROUPING SETS" in text and '"gwapi"."http_logs"' in text
+    assert "ts >= %s AND ts < %s AND method = %s" in text
+    assert params == (datetime(2026, 3, 1, tzinfo=timezone.utc), to, "GET", 11)
+    assert result["group_by"] == "endpoint"
+    assert result["total"]["count"] == 3 and result["total"]["error_rate"] == 0.3333
+    assert result["items"] == [{**rows[1], "avg_ms": 55.0}]
+
+    with pytest.raises(ValueError):
+        asyncio.run(service.get_log_stats(group_by="client_ip"))
+    with pytest.raises(ValueError):
+        asyncio.run(service.get_db_log_stats(from_=to, to=to))
+
+
+def test_logs_page_with_a_keyset_cursor_and_one_semi_join(monkeypatch):
+    ts = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+    rows = [{"ts": ts, "id": 42, "endpoint": "/a", "has_db_logs": True}, {"ts": ts, "id": 41, "endpoint": "/b"}]
+    service, executed = _log_service(monkeypatch, rows)
+
+    page = asyncio.run(service.get_logs(limit=2, cursor=encode_log_cursor(ts, 50), offset=300))
+    text, params = executed[0]
+    assert "EXISTS" not in text and "(ts, id) < (%s, %s)" in text and "ORDER BY ts DESC, id DESC" in text
+    assert params == (ts, 50, 2, 0)
+    assert decode_log_cursor(page["next_cursor"]) == (ts, 41)
+    assert "id" not in page["items"][0]
+
+    short_page, _ = _log_service(monkeypatch, [{"ts": ts, "id": 7}])
+    assert asyncio.run(short_page.get_logs(limit=5))["next_cursor"] is None
+    with pytest.raises(ValueError):
+        decode_log_cursor("not-a-cursor")
+
+
+def test_log_export_streams_csv_and_ndjson_from_a_server_side_cursor(monkeypatch):
+    ts = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+    row = (ts, "POST", "/a", 500, 12, "bob", None, None, {"q": 1}, 3, 4, {}, 'say "hi"', None, None, {"db": 1.5})
+    service, executed = _log_service(monkeypatch, [row, row])
+
+    async def collect(fmt):
+        return [chunk async for chunk in service.export_logs(fmt=fmt, from_=ts, to=ts + timedelta(days=1))]
+
+    csv_chunks = asyncio.run(collect("csv"))
+    assert csv_chunks[0] == "" and csv_chunks[1].startswith("ts,method,endpoint")
+    assert len(csv_chunks) == 4 and '"{""q"": 1}"' in csv_chunks[2] and '"say ""hi"""' in csv_chunks[2]
+    ndjson_chunks = asyncio.run(collect("ndjson"))
+    assert json.loads(ndjson_chunks[1])["query_params"] == {"q": 1}
+    assert "ORDER BY ts, id" in executed[0][0]
+
+
+def test_replay_paces_logged_requests_and_compares_latencies(monkeypatch):
+    t0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def row(offset_ms, method="GET", endpoint="/giswater/v1/basic/getinfofromid", **extra):
+        return {
+            "ts": t0 + timedelta(milliseconds=offset_ms),
+            "method": method,
+            "endpoint": endpoint,
+            "status": 200,
+            "duration_ms": 40,
+            "query_params": {"id": "7"},
+            "body_size": None,
+            "request_headers": {"x-lang": "es_ES", "x-request-id": "old", "content-length": "0"},
+            "request_body": None,
+            **extra,
+        }
+
+    rows = [
+        row(0),
+        row(30, endpoint="/giswater/v1/routing/getobjectoptimalpathorder"),
+        row(60, query_params={"token": "***REDACTED***"}),
+        row(90, method="POST", body_size=10, request_body='{"a": 1}'),
+        row(120, method="POST", body_size=10),
+        row(150, method="PUT", body_size=10, request_body='{"password": "***REDACTED***"}'),
+    ]
+    sent = []
+
+    def handler(request):
+        sent.append((request.method, request.url.path, dict(request.url.params), request.headers))
+        return httpx.Response(500 if "routing" in request.url.path else 200)
+
+    def run(speed, include_writes=False):
+        sent.clear()
+        return asyncio.run(
+            replay_service.replay_requests(
+                rows,
+                target="http://target",
+                speed=speed,
+                headers={"Authorization": "Bearer t"},
+                include_writes=include_writes,
+                transport=httpx.MockTransport(handler),
+            )
+        )
+
+    report = run(None)
+    assert report["replayed"] == 2
+    assert report["skipped"] == {"redacted_params": 1, "write_method": 3}
+    assert report["status"] == {"2xx": 1, "5xx": 1} and report["error_rate"] == 0.5
+    assert report["status_mismatches"] == 1
+    assert report["latency_ms"]["original"]["p50"] == 40
+    assert {e["endpoint"] for e in report["endpoints"]} == {r["endpoint"] for r in rows[:2]}
+    method, path, params, headers = sent[0]
+    assert (method, path, params) == ("GET", "/giswater/v1/basic/getinfofromid", {"id": "7"})
+    assert headers["authorization"] == "Bearer t" and headers["x-lang"] == "es_ES"
+    assert headers.get("x-request-id") is None
+
+    report = run(1.0, include_writes=True)
+    assert report["replayed"] == 3 and report["wall_seconds"] >= 0.09
+    assert report["skipped"] == {"redacted_params": 1, "body_not_captured": 1, "body_incomplete": 1}
+    assert ("POST", "/giswater/v1/basic/getinfofromid", {"id": "7"}) == sent[-1][:3]
+
+    service, executed = _log_service(monkeypatch, rows)
+    assert asyncio.run(service.get_logged_requests(from_=t0, to=t0 + timedelta(hours=1), limit=5)) == rows
+    query, params = executed[0]
+    assert "ORDER BY ts, id" in query and params == (t0, t0 + timedelta(hours=1), 5)
+
+    assert replay_service.parse_speed("real") == 1.0 and replay_service.parse_speed("max") is None
+    with pytest.raises(ValueError):
+        replay_service.parse_speed("fast")
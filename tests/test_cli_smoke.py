@@ -33,7 +33,12 @@ def test_cli_db_history():
 
     assert result.exit_code == 0, result.output
     revisions = {r["revision"] for r in json.loads(result.output)}
-    assert revisions == {"0001_gwapi_initial"}
+    assert revisions == {
+        "0001_gwapi_initial",
+        "0002_audit_log_indexes",
+        "0003_audit_log_lz4",
+        "0004_http_log_timings",
+    }
 
 
 def test_cli_db_current():
@@ -156,6 +156,7 @@ def test_alembic_fresh_install():
             assert targets.schema == GWAPI_SCHEMA
             assert targets.http_table == HTTP_LOG_TABLE
             assert targets.db_table == DB_LOG_TABLE
+            assert targets.has_timings
         finally:
             await _reset_api_objects(db)
             await db.close()
@@ -253,6 +254,7 @@ def test_legacy_log_schema_without_migrate():
             assert targets.schema == LEGACY_LOG_SCHEMA
             assert targets.http_table == LEGACY_HTTP_LOG_TABLE
             assert targets.db_table == LEGACY_DB_LOG_TABLE
+            assert not targets.has_timings
 
             await insert_api_log(
                 db,
@@ -297,6 +299,112 @@ def test_resolver_switches_after_upgrade():
             assert targets.schema == GWAPI_SCHEMA
             assert targets.http_table == HTTP_LOG_TABLE
             assert targets.db_table == DB_LOG_TABLE
+            assert targets.has_timings
+        finally:
+            await _reset_api_objects(db)
+            await db.close()
+
+    _run(scenario())
+
+
+def test_alembic_replaces_single_column_log_indexes():
+    tid = f"mig-idx-{uuid.uuid4().hex[:8]}"
+
+    async def scenario():
+        db = _db_manager(tid)
+        try:
+            await _reset_api_objects(db)
+            invalidate_log_schema_cache(tid)
+            # A legacy log with one partition: indexes are built per partition and attached.
+            await _exec(db, _LEGACY_LOG_DDL)
+
+            await run_alembic_upgrade(db)
+
+            async with db.get_db() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        "SELECT tablename, indexname FROM pg_indexes WHERE schemaname = %s", (GWAPI_SCHEMA,)
+                    )
+                    indexes = {(table, name) for table, name in await cur.fetchall()}
+                    await cur.execute(
+                        "SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                        "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = %s",
+                        (GWAPI_SCHEMA,),
+                    )
+                    valid = dict(await cur.fetchall())
+            assert (HTTP_LOG_TABLE, "http_logs_ts_brin") in indexes
+            assert (HTTP_LOG_TABLE, "http_logs_endpoint_ts_idx") in indexes
+            assert (HTTP_LOG_TABLE, "http_logs_request_id_idx") in indexes
+            assert (DB_LOG_TABLE, "db_logs_function_ts_idx") in indexes
+            assert (HTTP_LOG_TABLE, "http_logs_method_idx") not in indexes
+            assert (HTTP_LOG_TABLE, "http_logs_ts_idx") not in indexes
+            assert ("http_logs_2026_06", "http_logs_2026_06_endpoint_ts_idx") in indexes
+            assert valid["http_logs_endpoint_ts_idx"] and valid["http_logs_ts_brin"]
+        finally:
+            await _reset_api_objects(db)
+            await db.close()
+
+    _run(scenario())
+
+
+def test_alembic_compresses_log_payloads_with_lz4():
+    tid = f"mig-lz4-{uuid.uuid4().hex[:8]}"
+
+    async def scenario():
+        db = _db_manager(tid)
+        try:
+            await _reset_api_objects(db)
+            invalidate_log_schema_cache(tid)
+
+            await run_alembic_upgrade(db)
+
+            async with db.get_db() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute("SHOW server_version_num")
+                    if int((await cur.fetchone())[0]) < 140000:
+                        pytest.skip("lz4 TOAST compression needs PostgreSQL 14+")
+                    await cur.execute(
+                        """
+                        SELECT c.relname, a.attname, a.attcompression
+                        FROM pg_attribute a
+                        JOIN pg_class c ON c.oid = a.attrelid
+                        JOIN pg_namespace n ON n.oid = c.relnamespace
+                        WHERE n.nspname = %s AND c.relname IN (%s, %s)
+                          AND a.attname IN ('request_body', 'response_body', 'response_json')
+                        """,
+                        (GWAPI_SCHEMA, HTTP_LOG_TABLE, DB_LOG_TABLE),
+                    )
+                    methods = {(table, column): method for table, column, method in await cur.fetchall()}
+            assert methods[(HTTP_LOG_TABLE, "response_body")] == "l"
+            assert methods[(DB_LOG_TABLE, "response_json")] == "l"
+        finally:
+            await _reset_api_objects(db)
+            await db.close()
+
+    _run(scenario())
+
+
+def test_alembic_adds_http_log_timings_column():
+    tid = f"mig-timings-{uuid.uuid4().hex[:8]}"
+
+    async def scenario():
+        db = _db_manager(tid)
+        try:
+            await _reset_api_objects(db)
+            invalidate_log_schema_cache(tid)
+
+            await run_alembic_upgrade(db)
+
+            async with db.get_db() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        """
+                        SELECT data_type FROM information_schema.columns
+                        WHERE table_schema = %s AND table_name = %s AND column_name = 'timings'
+                        """,
+                        (GWAPI_SCHEMA, HTTP_LOG_TABLE),
+                    )
+                    assert await cur.fetchone() == ("jsonb",)
         finally:
             await _reset_api_objects(db)
             await db.close()
@@ -0,0 +1,107 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Offline tests for the Prometheus metrics (no DB).
+"""
+
+import os
+import subprocess
+import sys
+from dataclasses import replace
+from pathlib import Path
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+from app.middleware.metrics import MetricsMiddleware
+from app.utils import metrics
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _enable(monkeypatch) -> None:
+    monkeypatch.setattr(metrics, "global_settings", replace(metrics.global_settings, metrics_enabled=True))
+
+
+def test_requests_are_counted_per_tenant_and_route_template(monkeypatch):
+    _enable(monkeypatch)
+
+    async def item(request):
+        request.state.tenant = SimpleNamespace(id="acme")
+        return PlainTextResponse("ok", status_code=201)
+
+    app = Starlette(routes=[Mount("/api/v1", routes=[Route("/items/{item_id}", item)])])
+    app.add_middleware(MetricsMiddleware)
+    labels = {"tenant": "acme", "method": "GET", "route": "/api/v1/items/{item_id}", "status": "201"}
+    before = REGISTRY.get_sample_value("gwapi_http_requests_total", labels) or 0
+
+    client = TestClient(app)
+    client.get("/api/v1/items/1")
+    client.get("/api/v1/items/2")
+    client.get("/nowhere")
+
+    assert REGISTRY.get_sample_value("gwapi_http_requests_total", labels) == before + 2
+    duration = {key: labels[key] for key in ("tenant", "method", "route")}
+    assert REGISTRY.get_sample_value("gwapi_http_request_duration_seconds_count", duration) >= 2
+    unmatched = {"tenant": "-", "method": "GET", "route": "unmatched", "status": "404"}
+    assert REGISTRY.get_sample_value("gwapi_http_requests_total", unmatched) >= 1
+
+
+def test_helpers_are_noops_when_metrics_are_disabled(monkeypatch):
+    monkeypatch.setattr(metrics, "global_settings", replace(metrics.global_settings, metrics_enabled=False))
+    labels = {"cache": "disabled-test", "result": "hit"}
+    metrics.count_cache_lookup("disabled-test", True)
+    assert REGISTRY.get_sample_value("gwapi_cache_lookups_total", labels) is None
+    _enable(monkeypatch)
+    metrics.count_cache_lookup("disabled-test", True)
+    assert REGISTRY.get_sample_value("gwapi_cache_lookups_total", labels) == 1
+
+
+def test_pool_and_queue_gauges_are_sampled_from_each_tenant(monkeypatch):
+    pool = SimpleNamespace(get_stats=lambda: {"pool_size": 4, "pool_available": 1, "requests_waiting": 2})
+    writer = SimpleNamespace(stats=lambda: {"queued": 7})
+    db_manager = SimpleNamespace(connection_pool=pool, dbname="gis", has_separate_log_db=False, log_writer=writer)
+    db_manager.log_db = db_manager
+    registry = SimpleNamespace(all=lambda: [SimpleNamespace(id="gauge-tenant", db_manager=db_manager)])
+
+    body, content_type = metrics.render_metrics(registry)
+
+    assert content_type.startswith("text/plain")
+    text = body.decode()
+    assert 'gwapi_db_pool_size{database="gis",tenant="gauge-tenant"} 4.0' in text
+    assert 'gwapi_db_pool_waiting{database="gis",tenant="gauge-tenant"} 2.0' in text
+    assert 'gwapi_audit_log_queue_depth{tenant="gauge-tenant"} 7.0' in text
+
+
+_WORKER = """
+from app.utils import metrics
+metrics.observe_request("acme", "GET", "/v1/x", 200, 0.02)
+metrics.observe_procedure("acme", "gw_fct_getinfofromid", "Accepted", 0.01)
+"""
+
+_SCRAPER = """
+from app.utils import metrics
+print(metrics.render_metrics()[0].decode())
+"""
+
+
+def test_multiprocess_scrape_returns_totals_of_all_workers(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "METRICS_ENABLED": "true"}
+    for _ in range(3):
+        subprocess.run([sys.executable, "-c", _WORKER], cwd=ROOT, env=env, check=True)
+    output = subprocess.run(
+        [sys.executable, "-c", _SCRAPER], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+
+    assert 'gwapi_http_requests_total{method="GET",route="/v1/x",status="200",tenant="acme"} 3.0' in output
+    assert (
+        'gwapi_db_procedure_duration_seconds_count{function="gw_fct_getinfofromid",status="Accepted",tenant="acme"} 3.0'
+        in output
+    )
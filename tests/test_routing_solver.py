@@ -0,0 +1,417 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Offline tests for the local routing solver and backend selection (no Valhalla, no DB).
+"""
+
+import asyncio
+import time
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from app.core.config import TenantSettings
+from app.core.exceptions import RoutingProviderError
+from app.schemas.routing.routing_models import Location, OptimalPathParams
+from app.services import routing_backends
+from app.utils.cache_generation import SharedGeneration
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.geo import get_transformer, transform_points
+from app.utils import routing_cache
+from app.utils.network_points import NetworkPointCache, NetworkPointSet, changes_signature
+from app.utils.polyline import decode_array, encode
+from app.utils.routing import decode, get_encoded_legs, get_geojson_from_optimized_route, get_maneuvers
+from app.utils.routing_cache import RouteCache, route_cache_key
+from app.utils.routing_chunks import plan_chunks
+from app.utils.routing_matrix import MatrixCache, points_fingerprint
+from app.utils.routing_solver import (
+    _or_opt_move,
+    haversine_matrix,
+    nearest_neighbor_order,
+    path_cost,
+    solve_optimized_route,
+    solve_path_order,
+    two_opt,
+)
+
+
+def _random_points(n: int, seed: int = 7) -> tuple[list[float], list[float]]:
+    rng = np.random.default_rng(seed)
+    lons = (2.10 + rng.random(n) * 0.05).tolist()
+    lats = (41.35 + rng.random(n) * 0.05).tolist()
+    return lons, lats
+
+
+def test_haversine_matrix_known_distance():
+    # Barcelona -> Madrid is ~505 km great-circle.
+    dist = haversine_matrix([2.1734, -3.7038], [41.3851, 40.4168])
+    assert dist.shape == (2, 2)
+    assert dist[0, 0] == 0.0
+    assert dist[0, 1] == pytest.approx(505, abs=5)
+    assert dist[0, 1] == dist[1, 0]
+
+
+def test_solver_keeps_endpoints_and_visits_every_point():
+    lons, lats = _random_points(40)
+    order = solve_path_order(haversine_matrix(lons, lats))
+    assert order[0] == 0
+    assert order[-1] == len(lons) - 1
+    assert sorted(order) == list(range(len(lons)))
+
+
+def test_solver_improves_on_nearest_neighbor():
+    lons, lats = _random_points(60, seed=3)
+    dist = haversine_matrix(lons, lats)
+    greedy = path_cost(nearest_neighbor_order(dist), dist)
+    improved = path_cost(solve_path_order(dist), dist)
+    assert improved <= greedy
+
+
+def test_solver_finds_optimal_order_on_a_line():
+    # Points on a line, shuffled: the optimum visits them left to right.
+    xs = [0.0, 5.0, 2.0, 8.0, 1.0, 6.0, 3.0, 7.0, 4.0, 9.0]
+    cost = np.abs(np.subtract.outer(xs, xs))
+    order = solve_path_order(cost)
+    assert [xs[i] for i in order] == sorted(xs)
+
+
+def test_moves_are_priced_on_asymmetric_costs():
+    # Valhalla time matrices are asymmetric (one-way streets, turn costs): reversing a
+    # segment changes the cost of its interior edges too.
+    for seed in range(100):
+        rng = np.random.default_rng(seed)
+        cost = rng.uniform(1.0, 100.0, (9, 9))
+        np.fill_diagonal(cost, 0.0)
+        route = np.concatenate(([0], rng.permutation(np.arange(1, 8)), [8]))
+        start = path_cost(route, cost)
+        for seg_len in (1, 2, 3):
+            for i in range(1, 9 - seg_len):
+                moved = _or_opt_move(route, cost, i, seg_len)
+                assert moved is None or path_cost(moved, cost) < start
+        reordered, _ = two_opt(route, cost, time.monotonic() + 1.0)
+        assert path_cost(reordered, cost) <= start + 1e-9
+        assert path_cost(solve_path_order(cost), cost) <= path_cost(nearest_neighbor_order(cost), cost) + 1e-9
+
+    # One-way street: 1 -> 2 is cheap, 2 -> 1 is not; a symmetric delta would reverse it.
+    cost = np.array([[0, 1, 9, 9], [9, 0, 1, 9], [1, 50, 0, 1], [9, 9, 9, 0]], dtype=np.float64)
+    assert solve_path_order(cost) == [0, 1, 2, 3]
+
+
+def test_optimized_route_matches_valhalla_shape():
+    lons, lats = _random_points(8)
+    response = solve_optimized_route(lons, lats, costing="pedestrian", units="miles")
+    trip = response["trip"]
+    assert len(trip["legs"]) == len(lons) - 1
+    assert trip["units"] == "miles"
+    assert trip["summary"]["length"] == pytest.approx(sum(leg["summary"]["length"] for leg in trip["legs"]), 1e-3)
+    assert [loc["original_index"] for loc in trip["locations"]][0] == 0
+
+    first_leg = decode(trip["legs"][0]["shape"])
+    assert first_leg[0] == pytest.approx([lons[0], lats[0]], abs=1e-6)
+
+    geojson = get_geojson_from_optimized_route(trip, "pedestrian")
+    assert len(geojson["features"]) == len(lons) - 1
+    maneuvers = get_maneuvers(response)
+    assert maneuvers[0]["travel_mode"] == "pedestrian"
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=0.0)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()  # single probe
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_circuit_probe_is_released_when_cancelled_or_timed_out(monkeypatch):
+    breaker = CircuitBreaker("valhalla", failure_threshold=1, reset_seconds=0.0, probe_timeout_seconds=3600)
+    breaker.record_failure()
+
+    def cancelled_fetch(params):
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(routing_backends.ValhallaBackend(breaker)._request(cancelled_fetch, {}))
+    assert breaker.allow_request()  # the cancelled probe did not keep the circuit half-open forever
+    assert not breaker.allow_request()
+
+    breaker.probe_timeout_seconds = 0.0
+    assert breaker.allow_request()  # a probe that never reported back is replaced
+
+
+def test_open_circuit_falls_back_to_local_solver(monkeypatch):
+    breaker = CircuitBreaker("valhalla", failure_threshold=1, reset_seconds=3600)
+    breaker.record_failure()
+    monkeypatch.setattr(routing_backends, "valhalla_circuit", breaker)
+    lons, lats = _random_points(5)
+    params = {
+        "locations": [{"lon": lon, "lat": lat} for lon, lat in zip(lons, lats, strict=True)],
+        "costing": "auto",
+        "units": "kilometers",
+        "language": "en-US",
+    }
+
+    settings = TenantSettings(routing_fallback_local=True)
+    response, backend = asyncio.run(routing_backends.optimized_route(settings, params))
+    assert backend == "local"
+    assert len(response["trip"]["legs"]) == 4
+
+    # Opt-in: by default an unavailable provider is an error, not a straight-line route.
+    assert not TenantSettings().routing_fallback_local
+    with pytest.raises(RoutingProviderError):
+        asyncio.run(routing_backends.optimized_route(TenantSettings(), params))
+
+
+def test_tenant_routing_backend_is_validated():
+    with pytest.raises(ValueError):
+        TenantSettings(routing_backend="osrm").validate()  # type: ignore[arg-type]
+
+
+def test_transformer_is_cached_per_epsg_pair():
+    assert get_transformer(25831, 4326) is get_transformer(25831, 4326)
+    assert get_transformer(25831, 4326) is not get_transformer(4326, 25831)
+
+
+def test_batch_transform_matches_per_point_transform():
+    xs = [419436.50, 418777.3, 2.17]
+    ys = [4576993.97, 4576692.9, 41.38]
+    epsgs = [25831, 25831, 4326]
+    lons, lats = transform_points(xs, ys, epsgs)
+    for x, y, epsg, lon, lat in zip(xs, ys, epsgs, lons, lats, strict=True):
+        expected = Location(x=x, y=y, epsg=epsg).to_dict()
+        assert (lon, lat) == pytest.approx((expected["lon"], expected["lat"]), abs=1e-9)
+
+    params = OptimalPathParams(locations=[Location(x=x, y=y, epsg=e) for x, y, e in zip(xs, ys, epsgs, strict=True)])
+    assert params.valhalla_locations() == [
+        Location(x=x, y=y, epsg=e).to_dict() for x, y, e in zip(xs, ys, epsgs, strict=True)
+    ]
+
+
+def test_vectorized_decode_round_trips_and_rounds_to_six_decimals():
+    lons, lats = _random_points(500, seed=11)
+    coords = [[round(lon, 6), round(lat, 6)] for lon, lat in zip(lons, lats, strict=True)]
+    coords.append([-179.999999, -89.5])
+    shape = encode(coords)
+    assert decode(shape) == coords
+    assert decode_array(shape).shape == (len(coords), 2)
+    assert decode("") == []
+    with pytest.raises(ValueError):
+        decode_array(shape[:-1])
+
+
+def test_encoded_legs_passthrough():
+    lons, lats = _random_points(4)
+    trip = solve_optimized_route(lons, lats)["trip"]
+    legs = get_encoded_legs(trip)
+    assert [leg["shape"] for leg in legs] == [leg["shape"] for leg in trip["legs"]]
+    assert legs[0]["fromIndex"] == 0 and legs[0]["toIndex"] == 1
+
+
+def _cache_key(start_lon: float, grid_meters: float = 25.0) -> str:
+    locations = [{"lon": start_lon, "lat": 41.38}, {"lon": 2.18, "lat": 41.39}, {"lon": 2.19, "lat": 41.40}]
+    return route_cache_key(
+        "t1",
+        locations,
+        backend="valhalla",
+        costing="auto",
+        units="kilometers",
+        language="en-US",
+        grid_meters=grid_meters,
+    )
+
+
+def test_route_cache_key_snaps_only_endpoints():
+    assert _cache_key(2.170000) == _cache_key(2.170001)
+    assert _cache_key(2.170000) != _cache_key(2.171)
+    assert _cache_key(2.170000, grid_meters=0) != _cache_key(2.170001, grid_meters=0)
+
+
+def test_route_cache_lru_ttl_and_disk_store(tmp_path, monkeypatch):
+    path = str(tmp_path / "routes.sqlite3")
+    cache = RouteCache(max_entries=2, ttl_seconds=60, path=path)
+    cache.set("a", {"trip": {"n": 1}})
+    cache.set("b", {"trip": {"n": 2}})
+    assert cache.get("a") == {"trip": {"n": 1}}
+    cache.set("c", {"trip": {"n": 3}})  # evicts "b" (least recently used) from memory
+    assert list(cache._entries) == ["a", "c"]
+
+    # A fresh cache (new worker) reads surviving entries from the SQLite store.
+    assert RouteCache(max_entries=2, ttl_seconds=60, path=path).get("c") == {"trip": {"n": 3}}
+
+    now = time.time()
+    monkeypatch.setattr(routing_cache.time, "time", lambda: now + 120)
+    assert cache.get("a") is None
+    assert RouteCache(max_entries=0, ttl_seconds=60).get("a") is None
+
+
+def test_matrix_cache_recomputes_when_point_set_changes():
+    lons, lats = _random_points(6)
+    points = [{"lon": lon, "lat": lat} for lon, lat in zip(lons, lats, strict=True)]
+    scope = ("t1", "ws", "EXPL", "1", "HYDRANT", "auto")
+    cache = MatrixCache()
+    matrix = haversine_matrix(lons, lats)
+    cache.set(scope, points_fingerprint(points), matrix)
+    assert cache.get(scope, points_fingerprint(points)) is matrix
+    assert cache.get(scope, points_fingerprint(points[:-1])) is None
+    assert cache.get(scope, points_fingerprint(points)) is None  # stale entry was dropped
+    cache.set(scope, points_fingerprint(points), matrix)
+    assert cache.invalidate("t2") == 0
+    assert cache.invalidate("t1") == 1
+
+
+def test_matrix_backend_orders_with_cached_network_matrix(monkeypatch):
+    lons, lats = _random_points(7)
+    locations = [{"lon": lon, "lat": lat} for lon, lat in zip(lons, lats, strict=True)]
+    calls = []
+
+    def fake_matrix(params):
+        calls.append(len(params["sources"]) * len(params["targets"]))
+        src = [(p["lon"], p["lat"]) for p in params["sources"]]
+        dst = [(p["lon"], p["lat"]) for p in params["targets"]]
+        dist = haversine_matrix([p[0] for p in src + dst], [p[1] for p in src + dst])[: len(src), len(src) :]
+        return {"sources_to_targets": [[{"time": float(d)} for d in row] for row in dist]}, []
+
+    def fake_route(params):
+        trip = solve_optimized_route([p["lon"] for p in params["locations"]], [p["lat"] for p in params["locations"]])
+        return trip, []
+
+    monkeypatch.setattr(routing_backends, "get_valhalla_matrix", fake_matrix)
+    monkeypatch.setattr(routing_backends, "get_valhalla_route", fake_route)
+    monkeypatch.setattr(routing_backends, "matrix_cache", MatrixCache())
+    backend = routing_backends.ValhallaBackend(CircuitBreaker("test", failure_threshold=0, reset_seconds=0))
+    params = {"locations": locations, "costing": "auto", "units": "kilometers", "language": "en-US"}
+    scope = ("t1", "ws", "EXPL", "1", "HYDRANT", "auto")
+
+    response = asyncio.run(backend.matrix_optimized_route(params, scope))
+    order = [loc["original_index"] for loc in response["trip"]["locations"]]
+    assert order[0] == 0 and order[-1] == len(locations) - 1
+    assert sorted(order) == list(range(len(locations)))
+    assert max(calls) == 25  # full 5x5 network matrix on the first call
+
+    calls.clear()
+    asyncio.run(backend.matrix_optimized_route(params, scope))
+    assert calls == [6, 5]  # only the start row and end column afterwards
+
+
+def test_plan_chunks_covers_every_point_once():
+    lons, lats = _random_points(230, seed=5)
+    chunks = plan_chunks(lons, lats, max_points=40)
+    assert chunks[0][0] == 0 and chunks[-1][-1] == len(lons) - 1
+    assert all(len(chunk) - 2 <= 40 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:], strict=False):
+        assert current[0] == previous[-1]
+    visited = [chunks[0][0]] + [i for chunk in chunks for i in chunk[1:]]
+    assert sorted(visited) == list(range(len(lons)))
+
+
+def test_chunked_route_is_stitched_into_one_trip(monkeypatch):
+    lons, lats = _random_points(30, seed=9)
+    locations = [{"lon": lon, "lat": lat} for lon, lat in zip(lons, lats, strict=True)]
+
+    async def fake_valhalla(self, params):
+        chunk = params["locations"]
+        return solve_optimized_route([p["lon"] for p in chunk], [p["lat"] for p in chunk])
+
+    monkeypatch.setattr(routing_backends.ValhallaBackend, "optimized_route", fake_valhalla)
+    monkeypatch.setattr(routing_backends, "valhalla_circuit", CircuitBreaker("test", 0, 0))
+    monkeypatch.setattr(
+        routing_backends, "global_settings", replace(routing_backends.global_settings, routing_chunk_size=8)
+    )
+    params = {"locations": locations, "costing": "auto", "units": "kilometers", "language": "en-US"}
+
+    response, backend = asyncio.run(routing_backends.optimized_route(TenantSettings(), params))
+    trip = response["trip"]
+    assert backend == "valhalla"
+    assert len(trip["legs"]) == len(locations) - 1
+    order = [loc["original_index"] for loc in trip["locations"]]
+    assert order[0] == 0 and order[-1] == len(locations) - 1
+    assert sorted(order) == list(range(len(locations)))
+    assert trip["summary"]["length"] == pytest.approx(sum(leg["summary"]["length"] for leg in trip["legs"]), 1e-3)
+    assert len(get_maneuvers(response)) == 2 * len(trip["legs"])
+
+
+def test_chunked_route_keeps_a_matrix_scope_per_chunk(monkeypatch):
+    lons, lats = _random_points(30, seed=9)
+    locations = [{"lon": lon, "lat": lat} for lon, lat in zip(lons, lats, strict=True)]
+    scopes = []
+
+    async def fake_matrix_route(self, params, scope):
+        scopes.append(scope)
+        chunk = params["locations"]
+        return solve_optimized_route([p["lon"] for p in chunk], [p["lat"] for p in chunk])
+
+    monkeypatch.setattr(routing_backends.ValhallaBackend, "matrix_optimized_route", fake_matrix_route)
+    monkeypatch.setattr(routing_backends, "valhalla_circuit", CircuitBreaker("test", 0, 0))
+    monkeypatch.setattr(
+        routing_backends, "global_settings", replace(routing_backends.global_settings, routing_chunk_size=8)
+    )
+    params = {"locations": locations, "costing": "auto", "units": "kilometers", "language": "en-US"}
+    scope = ("t1", "ws", "EXPL", "1", "HYDRANT", "auto")
+
+    asyncio.run(routing_backends.optimized_route(TenantSettings(routing_matrix_cache=True), params, scope=scope))
+    first = list(scopes)
+    assert len(first) == len(set(first)) > 1
+    assert all(chunk_scope[:-1] == scope for chunk_scope in first)
+
+    scopes.clear()
+    asyncio.run(routing_backends.optimized_route(TenantSettings(routing_matrix_cache=True), params, scope=scope))
+    assert sorted(scopes) == sorted(first)  # same chunks -> same cached matrices
+
+
+def _getfeatures_result(xs: list[float]) -> dict:
+    features = [{"nodeId": i, "coordinates": {"x": x, "y": 4576692.9, "epsg": 25831}} for i, x in enumerate(xs)]
+    return {"status": "Accepted", "body": {"data": {"features": features}}}
+
+
+def test_network_point_set_is_array_backed_and_reprojected():
+    point_set = NetworkPointSet.from_result(_getfeatures_result([418777.3, 419436.5]))
+    assert len(point_set) == 2
+    assert point_set.epsg.tolist() == [25831, 25831]
+    expected = Location(x=418777.3, y=4576692.9, epsg=25831).to_dict()
+    assert point_set.valhalla_locations()[0] == pytest.approx(expected)
+
+
+def test_network_point_cache_invalidates_on_new_change_set():
+    cache = NetworkPointCache(ttl_seconds=3600, check_seconds=3600)
+    key = ("t1", "ws", "HYDRANT", "EXPL", "1")
+    cache.set(key, NetworkPointSet.from_result(_getfeatures_result([418777.3])))
+    assert cache.changes_due("t1") is not None  # baseline poll after the first fill
+    assert not cache.record_changes("t1", changes_signature([{"body": {"feature": []}}]))
+    assert cache.changes_due("t1") is None  # next poll not due yet
+    assert cache.get(key) is not None
+
+    assert cache.record_changes("t1", changes_signature([{"body": {"feature": [{"id": 7}]}}]))
+    assert cache.get(key) is None
+    assert NetworkPointCache(ttl_seconds=0, check_seconds=60).get(key) is None
+
+
+def test_invalidation_marker_reaches_every_worker(tmp_path):
+    generations = SharedGeneration(str(tmp_path / "generations"))
+    # Two cache instances stand in for two workers sharing the marker directory.
+    workers = [
+        (NetworkPointCache(3600, 0, generations=generations), MatrixCache(generations=generations)) for _ in range(2)
+    ]
+    key = ("t1", "ws", "HYDRANT", "EXPL", "1")
+    scope = ("t1", "ws", "EXPL", "1", "HYDRANT", "auto")
+    other = ("t2", "ws", "EXPL", "1", "HYDRANT", "auto")
+    point_set = NetworkPointSet.from_result(_getfeatures_result([418777.3]))
+    matrix = np.zeros((1, 1))
+    for points, matrices in workers:
+        points.set(key, point_set)
+        matrices.set(scope, "f", matrix)
+        matrices.set(other, "f", matrix)
+
+    assert generations.bump("t1") > 0
+    for points, matrices in workers:
+        assert points.get(key) is None and matrices.get(scope, "f") is None
+        assert matrices.get(other, "f") is matrix
+        points.set(key, point_set)
+        assert points.get(key) is point_set  # refilled under the new generation
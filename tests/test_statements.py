@@ -0,0 +1,178 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Offline tests for the pg_stat_statements snapshot/diff report (no DB).
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.exceptions import DatabaseUnavailableError
+from app.db.statements import (
+    StatementSnapshot,
+    StatementStats,
+    called_function,
+    diff_snapshots,
+    rank_statements,
+    take_snapshot,
+)
+from app.services.system_service import SystemService
+
+T0 = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+INFO = 'SELECT "ws"."gw_fct_getinfofromid"($1)'
+FEATURES = 'SELECT "ws"."gw_fct_getfeatures"($1)'
+
+
+def _stats(queryid: int, query: str, calls: int, total_ms: float, **counters) -> StatementStats:
+    values = {"rows": calls, "shared_blks_hit": 0, "shared_blks_read": 0, "temp_blks_read": 0, "temp_blks_written": 0}
+    return StatementStats(userid=10, queryid=queryid, query=query, calls=calls, total_ms=total_ms, **values | counters)
+
+
+def _snapshot(offset_s: int, *statements: StatementStats) -> StatementSnapshot:
+    return StatementSnapshot("gis", T0 + timedelta(seconds=offset_s), statements)
+
+
+def test_diff_subtracts_counters_and_restarts_after_a_reset():
+    before = _snapshot(
+        0,
+        _stats(1, INFO, 100, 500.0, shared_blks_read=10),
+        _stats(2, FEATURES, 50, 900.0),
+        _stats(3, "SELECT 1", 7, 1.0),
+    )
+    after = _snapshot(
+        60,
+        _stats(1, INFO, 130, 800.0, shared_blks_read=40, temp_blks_written=5),
+        _stats(2, FEATURES, 4, 80.0),  # reset in between: counted from zero
+        _stats(3, "SELECT 1", 7, 1.0),  # idle: left out
+        _stats(4, "SELECT now()", 2, 0.5),  # new
+    )
+
+    deltas = {stats.queryid: stats for stats in diff_snapshots(before, after)}
+
+    assert set(deltas) == {1, 2, 4}
+    assert (deltas[1].calls, deltas[1].total_ms, deltas[1].shared_blks_read) == (30, 300.0, 30)
+    assert deltas[2].calls == 4 and deltas[2].total_ms == 80.0
+    with pytest.raises(ValueError):
+        diff_snapshots(after, before)
+    assert StatementSnapshot.from_dict(after.to_dict()) == after
+
+
+def test_rank_orders_by_the_requested_counter():
+    statements = [
+        _stats(1, INFO, 30, 300.0, shared_blks_hit=90, shared_blks_read=10),
+        _stats(2, FEATURES, 4, 800.0, temp_blks_read=3, temp_blks_written=9),
+        _stats(4, "SELECT now()", 200, 2.0),
+    ]
+
+    by_time = rank_statements(statements, "total_time", limit=2)
+    assert [item["queryid"] for item in by_time["items"]] == [2, 1]
+    assert by_time["count"] == 3 and by_time["total"]["calls"] == 234 and by_time["total"]["total_ms"] == 1102.0
+    first = by_time["items"][0]
+    assert first["function"] == "gw_fct_getfeatures" and first["mean_ms"] == 200.0
+    assert by_time["items"][1]["hit_ratio"] == 0.9
+    assert [item["queryid"] for item in rank_statements(statements, "calls")["items"]] == [4, 1, 2]
+    assert rank_statements(statements, "temp_blks")["items"][0]["queryid"] == 2
+    with pytest.raises(ValueError):
+        rank_statements(statements, "p99")
+    assert called_function("select ws.gw_fct_setvisit($1, $2)") == "gw_fct_setvisit"
+    assert called_function("SELECT now()") is None
+
+
+def test_compare_attaches_db_log_latency_per_function(monkeypatch):
+    service = SystemService(SimpleNamespace(id="acme"))
+    requested = {}
+
+    async def db_log_stats(**kwargs):
+        requested.update(kwargs)
+        return {
+            "items": [{"key": "gw_fct_getinfofromid", "count": 29, "p50": 8.0, "p99": 40.0, "max_ms": 55, "errors": 1}]
+        }
+
+    monkeypatch.setattr(service, "get_db_log_stats", db_log_stats)
+    before = _snapshot(0, _stats(1, INFO, 100, 500.0))
+    after = _snapshot(60, _stats(1, INFO, 130, 800.0), _stats(2, FEATURES, 3, 30.0))
+
+    report = asyncio.run(service.compare_statements(before, after))
+
+    assert (requested["from_"], requested["to"]) == (before.taken_at, after.taken_at)
+    assert report["window_seconds"] == 60.0 and report["database"] == "gis"
+    info, features = report["items"]
+    assert info["api"] == {"count": 29, "p50": 8.0, "p99": 40.0, "max_ms": 55, "errors": 1}
+    assert features["api"] is None
+
+    async def log_db_down(**kwargs):
+        raise DatabaseUnavailableError()
+
+    monkeypatch.setattr(service, "get_db_log_stats", log_db_down)
+    report = asyncio.run(service.compare_statements(before, after))
+    assert "api_stats_error" in report and report["count"] == 2
+
+
+class _FakeCursor:
+    def __init__(self, executed: list, results: list):
+        self.executed = executed
+        self.results = results
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, params=None):
+        self.executed.append(query if isinstance(query, str) else query.as_string(None))
+
+    async def fetchone(self):
+        return self.results.pop(0)
+
+    async def fetchall(self):
+        return self.results.pop(0)
+
+
+def _db_manager(results: list) -> tuple[SimpleNamespace, list]:
+    executed: list = []
+    conn = SimpleNamespace(
+        cursor=lambda row_factory=None: _FakeCursor(executed, results),
+        commit=lambda: asyncio.sleep(0),
+        rollback=lambda: asyncio.sleep(0),
+    )
+
+    @asynccontextmanager
+    async def get_db():
+        yield conn
+
+    return SimpleNamespace(dbname="gis", get_db=get_db), executed
+
+
+def test_snapshot_reads_the_installed_extension_version():
+    row = {
+        "userid": 10,
+        "queryid": 1,
+        "query": INFO,
+        "calls": 3,
+        "total_ms": 9.0,
+        "rows": 3,
+        "shared_blks_hit": 5,
+        "shared_blks_read": 1,
+        "temp_blks_read": 0,
+        "temp_blks_written": 0,
+    }
+    db_manager, executed = _db_manager([{"schema": "public", "version": "1.7"}, [row]])
+    snapshot = asyncio.run(take_snapshot(db_manager))
+    assert snapshot.database == "gis" and snapshot.statements == (StatementStats(**row),)
+    assert '"public".pg_stat_statements' in executed[1] and 'sum("total_time")' in executed[1]
+
+    db_manager, executed = _db_manager([{"schema": "ext", "version": "1.10"}, []])
+    asyncio.run(take_snapshot(db_manager))
+    assert 'sum("total_exec_time")' in executed[1]
+
+    db_manager, _ = _db_manager([None])
+    with pytest.raises(LookupError, match="not installed"):
+        asyncio.run(take_snapshot(db_manager))
@@ -0,0 +1,131 @@
+"""
+Copyright © 2026 by BGEO. All rights reserved.
+The program is free software: you can redistribute it and/or modify it under the terms of the GNU
+General Public License as published by the Free Software Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+Offline tests for request tracing and the OTLP-JSON file export (no DB).
+"""
+
+import json
+import os
+import time
+import uuid
+from dataclasses import replace
+
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware import request_logging
+from app.middleware.request_logging import RequestLoggingMiddleware
+from app.utils import tracing
+from app.utils.trace_export import TraceFileExporter
+
+INCOMING = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+def _traced_app(monkeypatch, routes, **settings) -> tuple[TestClient, list[list]]:
+    settings = {"tracing_enabled": True, "trace_sample_rate": 0.0, "trace_slow_ms": 0, **settings}
+    monkeypatch.setattr(tracing, "global_settings", replace(tracing.global_settings, **settings))
+    exported: list[list] = []
+    monkeypatch.setattr(tracing, "_export", lambda spans: exported.append(list(spans)))
+    monkeypatch.setattr(request_logging, "_resolve_api_logger", lambda request: None)
+    app = Starlette(routes=routes)
+    app.add_middleware(RequestLoggingMiddleware)
+    return TestClient(app, raise_server_exceptions=False), exported
+
+
+def test_request_trace_continues_incoming_traceparent(monkeypatch):
+    outbound = []
+
+    async def item(request):
+        with tracing.span("db", {"db.operation": "gw_fct_getinfofromid"}):
+            outbound.append(tracing.traceparent())
+        return JSONResponse({"ok": True})
+
+    client, exported = _traced_app(monkeypatch, [Route("/items/{item_id}", item)])
+    client.get("/items/7", headers={"traceparent": INCOMING})
+
+    [spans] = exported
+    child, root = spans
+    assert root.trace.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert root.parent_id == "00f067aa0ba902b7" and child.parent_id == root.span_id
+    assert root.name == "GET /items/{item_id}" and root.attributes["http.response.status_code"] == 200
+    assert child.attributes == {"db.operation": "gw_fct_getinfofromid"}
+    assert outbound == [f"00-4bf92f3577b34da6a3ce929d0e0e4736-{child.span_id}-01"]
+    assert tracing.CURRENT_SPAN_CTX.get() is None
+
+
+def test_unsampled_traces_are_kept_only_when_slow_or_failed(monkeypatch):
+    async def fast(request):
+        return JSONResponse({})
+
+    async def slow(request):
+        time.sleep(0.06)
+        return JSONResponse({})
+
+    async def missing(request):
+        with tracing.span("lookup"):
+            raise HTTPException(status_code=404)
+
+    async def broken(request):
+        return JSONResponse({}, status_code=503)
+
+    routes = [Route("/fast", fast), Route("/slow", slow), Route("/missing", missing), Route("/broken", broken)]
+    client, exported = _traced_app(monkeypatch, routes, trace_slow_ms=50)
+
+    client.get("/fast")
+    client.get("/missing")
+    assert exported == []
+
+    response = client.get("/slow")
+    [root] = exported.pop()
+    assert root.trace.trace_id == uuid.UUID(response.headers["x-request-id"]).hex
+    assert root.duration_ms >= 50
+
+    client.get("/broken")
+    [root] = exported.pop()
+    assert root.error == "HTTP 503"
+
+
+def test_file_exporter_writes_otlp_json_lines_and_rotates(tmp_path):
+    exporter = TraceFileExporter(str(tmp_path), max_bytes=600, keep=2, flush_seconds=0.01)
+    trace = tracing.Trace("ab" * 16, sampled=True)
+    for n in range(6):
+        span = tracing.Span(trace, f"op-{n}", parent_id="cd" * 8, attributes={"rows": n, "ok": True, "ms": 1.5})
+        span.end_ns = span.start_ns + 1000
+        span.error = "boom" if n == 0 else None
+        exporter.export([span])
+        time.sleep(0.05)
+    exporter.stop()
+
+    files = sorted(tmp_path.iterdir(), key=lambda path: path.stat().st_mtime_ns)
+    assert len(files) == 3 and files[-1].name == f"traces-{os.getpid()}.jsonl"  # + the 2 newest rotated files
+    lines = [json.loads(line) for path in files for line in path.read_text().splitlines()]
+    encoded = [s for line in lines for s in line["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+    assert {s["name"] for s in encoded} <= {f"op-{n}" for n in range(6)} and len(encoded) >= 3
+    resource = {a["key"]: a["value"] for a in lines[0]["resourceSpans"][0]["resource"]["attributes"]}
+    assert resource["service.name"] == {"stringValue": "giswater-api"}
+    sample = encoded[-1]
+    assert sample["traceId"] == "ab" * 16 and sample["parentSpanId"] == "cd" * 8
+    assert int(sample["endTimeUnixNano"]) - int(sample["startTimeUnixNano"]) == 1000
+    attributes = {a["key"]: a["value"] for a in sample["attributes"]}
+    assert attributes == {"rows": {"intValue": "5"}, "ok": {"boolValue": True}, "ms": {"doubleValue": 1.5}}
+    assert sample["status"] == {"code": 0}
+
+
+def test_helpers_are_noops_without_a_trace(monkeypatch):
+    monkeypatch.setattr(tracing, "global_settings", replace(tracing.global_settings, tracing_enabled=False))
+    assert tracing.start_trace("GET", request_id=uuid.uuid4()) is None
+    with tracing.span("db") as span:
+        span.set("x", 1)
+    assert span is tracing.NOOP_SPAN and tracing.trace_headers() == {}
+    assert tracing.parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert tracing.parse_traceparent(INCOMING) == (
+        "4bf92f3577b34da6a3ce929d0e0e4736",
+        "00f067aa0ba902b7",
+        True,
+    )